@@ -0,0 +1,266 @@
+"""Local stand-in for the parts of the Notion API the pipeline uses.
+
+Serves the endpoints called by ``notion_api.py`` and ``file_operations.py``:
+
+    GET   /v1/databases/{id}
+    POST  /v1/data_sources/{id}/query     (subject lookup and summary index)
+    GET   /v1/blocks/{id}/children
+    POST  /v1/file_uploads
+    POST  /v1/file_uploads/{id}/send
+    POST  /v1/file_uploads/{id}/complete
+    POST  /v1/pages
+    PATCH /v1/pages/{id}
+
+Every subject resolves to one page holding one "Performance Summaries" child
+database, optionally pre-filled with ``history_pages`` entries so index loading
+has to paginate. Queries honor title and ``last_edited_time`` filters and
+last_edited_time sorts, as used by the local mirror's incremental sync. ``latency`` adds a fixed delay to every response and
+``rate_limit_every`` answers every N-th request with a 429 and Retry-After.
+"""
+
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+LAB_DB_ID = "1ab0000000000000000000000000db01"
+OLD_PAGES_EPOCH = 1_577_836_800  # 2020-01-01
+
+
+def _new_id() -> str:
+    return str(uuid.uuid4())
+
+
+def _timestamp(seconds: float | None = None) -> str:
+    """A time (default now) in Notion's last_edited_time format (minute precision)."""
+    return time.strftime("%Y-%m-%dT%H:%M:00.000Z", time.gmtime(seconds))
+
+
+def _endpoint(method: str, path: str) -> str:
+    """Collapse IDs so counts group by endpoint, e.g. 'POST /pages'."""
+    parts = path.split("?", 1)[0].removeprefix("/v1").split("/")
+    return f"{method} " + "/".join(
+        "{id}" if len(p) >= 32 or p.startswith("ds-") else p for p in parts
+    )
+
+
+class FakeNotion:
+    """In-memory Notion workspace plus request counters."""
+
+    def __init__(
+        self,
+        subjects,
+        history_pages: int = 0,
+        page_size: int = 100,
+        latency: float = 0.0,
+        rate_limit_every: int = 0,
+    ):
+        self.page_size = page_size
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.counts: Counter = Counter()
+        self.rate_limited = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._requests = 0
+        # subject -> page id, page id -> perf db id, db id -> data source id
+        self.subject_pages = {s: _new_id() for s in subjects}
+        self.child_dbs = {page: _new_id() for page in self.subject_pages.values()}
+        self.data_sources = {db: f"ds-{db}" for db in self.child_dbs.values()}
+        self.data_sources[LAB_DB_ID] = f"ds-{LAB_DB_ID}"
+        # data source id -> {page id: (title, last_edited_time)}
+        self.pages = {ds: {} for ds in self.data_sources.values()}
+        # Pre-existing pages were last edited long ago, one minute apart
+        lab_entries = self.pages[self.data_sources[LAB_DB_ID]]
+        for i, (subject, page) in enumerate(self.subject_pages.items()):
+            lab_entries[page] = (subject, _timestamp(OLD_PAGES_EPOCH + 60 * i))
+        for db in self.child_dbs.values():
+            entries = self.pages[self.data_sources[db]]
+            for i in range(history_pages):
+                edited = _timestamp(OLD_PAGES_EPOCH + 60 * i)
+                entries[_new_id()] = (f"2000{i:04d}", edited)
+
+    def count(self, method: str, path: str) -> bool:
+        """Count a request; return True if it should be rate limited."""
+        with self._lock:
+            self._requests += 1
+            self.counts[_endpoint(method, path)] += 1
+            if self.rate_limit_every and self._requests % self.rate_limit_every == 0:
+                self.rate_limited += 1
+                return True
+        return False
+
+    def query(self, ds_id: str, body: dict):
+        entries = self.pages.get(ds_id)
+        if entries is None:
+            return None
+        title_prop = "ID" if ds_id == self.data_sources[LAB_DB_ID] else "Session ID"
+        items = list(entries.items())
+        where = body.get("filter", {})
+        if "title" in where:
+            items = [(k, v) for k, v in items if v[0] == where["title"]["equals"]]
+        if "last_edited_time" in where:
+            since = where["last_edited_time"]["on_or_after"]
+            items = [(k, v) for k, v in items if v[1] >= since]
+        if body.get("sorts"):
+            items.sort(key=lambda item: item[1][1])
+        start = int(body.get("start_cursor") or 0)
+        size = min(int(body.get("page_size", 100)), self.page_size)
+        chunk = items[start : start + size]
+        more = start + size < len(items)
+        return {
+            "results": [
+                {
+                    "id": k,
+                    "last_edited_time": edited,
+                    "properties": {title_prop: {"title": [{"plain_text": title}]}},
+                }
+                for k, (title, edited) in chunk
+            ],
+            "has_more": more,
+            "next_cursor": str(start + size) if more else None,
+        }
+
+    def create_page(self, body: dict):
+        ds_id = body["parent"]["data_source_id"]
+        if ds_id not in self.pages:
+            return None
+        page_id = _new_id()
+        title = body["properties"]["Session ID"]["title"][0]["text"]["content"]
+        edited = _timestamp()
+        with self._lock:
+            self.pages[ds_id][page_id] = (title, edited)
+        return {"id": page_id, "last_edited_time": edited}
+
+    def archive_page(self, page_id: str):
+        with self._lock:
+            for entries in self.pages.values():
+                entries.pop(page_id, None)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FakeNotionServer"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, obj, status=200, headers=None):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0))
+        data = self.rfile.read(length) if length else b""
+        self.server.notion.bytes_received += len(data)
+        return data
+
+    def _json(self) -> dict:
+        data = self._body()
+        return json.loads(data) if data else {}
+
+    def _begin(self) -> bool:
+        notion = self.server.notion
+        if notion.latency:
+            time.sleep(notion.latency)
+        if notion.count(self.command, self.path):
+            self._body()
+            self._send(
+                {"object": "error", "code": "rate_limited"},
+                429,
+                {"Retry-After": "0.05"},
+            )
+            return False
+        return True
+
+    def _not_found(self):
+        self._send({"object": "error", "code": "object_not_found"}, 404)
+
+    def do_GET(self):
+        if not self._begin():
+            return
+        notion = self.server.notion
+        url = urlsplit(self.path)
+        parts = url.path.split("/")
+        if url.path.startswith("/v1/databases/"):
+            ds_id = notion.data_sources.get(parts[3])
+            if ds_id is None:
+                return self._not_found()
+            return self._send({"data_sources": [{"id": ds_id}]})
+        if url.path.startswith("/v1/blocks/") and parts[-1] == "children":
+            db_id = notion.child_dbs.get(parts[3])
+            if db_id is None:
+                return self._not_found()
+            # Two pages of children so block pagination is exercised
+            if "start_cursor" not in parse_qs(url.query):
+                block = {"type": "paragraph", "id": _new_id()}
+                return self._send(
+                    {"results": [block], "has_more": True, "next_cursor": "1"}
+                )
+            child = {
+                "type": "child_database",
+                "id": db_id,
+                "child_database": {"title": "Performance Summaries"},
+            }
+            return self._send({"results": [child], "has_more": False})
+        self._not_found()
+
+    def do_POST(self):
+        if not self._begin():
+            return
+        notion = self.server.notion
+        path = urlsplit(self.path).path
+        parts = path.split("/")
+        if path.startswith("/v1/data_sources/") and parts[-1] == "query":
+            result = notion.query(parts[3], self._json())
+            return self._send(result) if result is not None else self._not_found()
+        if path == "/v1/file_uploads":
+            self._json()
+            return self._send({"id": _new_id(), "status": "pending"})
+        if path.startswith("/v1/file_uploads/") and parts[-1] in ("send", "complete"):
+            self._body()
+            return self._send({"id": parts[3], "status": "uploaded"})
+        if path == "/v1/pages":
+            result = notion.create_page(self._json())
+            return self._send(result) if result is not None else self._not_found()
+        self._not_found()
+
+    def do_PATCH(self):
+        if not self._begin():
+            return
+        path = urlsplit(self.path).path
+        page_id = path.split("/")[-1]
+        if self._json().get("archived"):
+            self.server.notion.archive_page(page_id)
+        self._send({"id": page_id})
+
+
+class FakeNotionServer(ThreadingHTTPServer):
+    """Threaded HTTP server serving a FakeNotion on 127.0.0.1."""
+
+    daemon_threads = True
+
+    def __init__(self, notion: FakeNotion, port: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.notion = notion
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
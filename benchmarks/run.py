@@ -0,0 +1,270 @@
+"""Run end-to-end benchmarks of ``notion_summaries`` against local stand-ins.
+
+Each scenario gets a throwaway HOME with its own preferences.json pointing at a
+FakeNotionServer, and a PATH where ``labdata``, ``matlab`` and ``rclone`` are
+the shims in ``benchmarks/shims``. The CLI runs in a subprocess so wall time and
+peak RSS cover the whole pipeline. Usage:
+
+    python benchmarks/run.py                      # all scenarios
+    python benchmarks/run.py small large_png      # selected scenarios
+    python benchmarks/run.py --json results.json  # save results
+    python benchmarks/run.py --baseline results.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from fake_notion import LAB_DB_ID, FakeNotion, FakeNotionServer
+
+BENCH_DIR = Path(__file__).resolve().parent
+SHIMS_DIR = BENCH_DIR / "shims"
+DATE = "20250820"
+CLI = "from notion_performance_summaries.notion_summaries import cli; cli()"
+
+
+@dataclass
+class Scenario:
+    name: str
+    dates: str = DATE
+    subjects: int = 2
+    sessions_back: int = 5
+    sessions_listed: int = 30
+    png_bytes: int = 200_000
+    history_pages: int = 0
+    latency: float = 0.0
+    rate_limit_every: int = 0
+    jobs: int = 1
+    runs: int = 1  # >1 re-runs in the same HOME to measure warm caches
+    args: list = field(default_factory=list)
+    shim_env: dict = field(default_factory=dict)
+
+
+SCENARIOS = {
+    s.name: s
+    for s in [
+        Scenario("small"),
+        Scenario("warm_rerun", subjects=4, runs=2),
+        Scenario("many_subjects", subjects=12, jobs=4),
+        Scenario("long_history", subjects=4, history_pages=1500, runs=2),
+        Scenario("large_png", subjects=2, png_bytes=45_000_000),
+        Scenario("backfill_week", subjects=4, dates="20250814..20250820"),
+        Scenario(
+            "optimize_png", subjects=4, png_bytes=5_000_000, args=["--optimize-png"]
+        ),
+        Scenario("slow_notion", subjects=4, jobs=4, latency=0.05, rate_limit_every=7),
+        Scenario(
+            "matlab_worker",
+            subjects=6,
+            args=["--matlab-worker"],
+            shim_env={"BENCH_MATLAB_STARTUP": "1.0", "BENCH_MATLAB_DELAY": "0.2"},
+        ),
+    ]
+}
+
+
+def write_preferences(home: Path, scenario: Scenario, base_url: str, rps: float):
+    app_dir = home / ".notion_performance_summaries"
+    app_dir.mkdir(parents=True, exist_ok=True)
+    prefs = {
+        "paths": {
+            "input_loc": str(home / "data"),
+            "output_loc": str(home / "summaries"),
+            "remote": "bench:summaries",
+        },
+        "subjects": [f"BENCH{i:03d}" for i in range(scenario.subjects)],
+        "notion": {
+            "version": "2025-09-03",
+            "base_url": base_url,
+            "requests_per_second": rps,
+        },
+    }
+    with open(app_dir / "preferences.json", "w", encoding="utf-8") as f:
+        json.dump(prefs, f, indent=2)
+    return prefs
+
+
+def run_once(scenario: Scenario, home: Path, notion: FakeNotion):
+    """Run the CLI once and return its metrics."""
+    shim_log = home / "shims.log"
+    shim_log.unlink(missing_ok=True)
+    env = {
+        **os.environ,
+        "HOME": str(home),
+        "PATH": f"{SHIMS_DIR}{os.pathsep}{os.environ.get('PATH', '')}",
+        "NOTION_TOKEN": "benchmark",
+        "LAB_ANIMALS_DB_ID": LAB_DB_ID,
+        "BENCH_INPUT_LOC": str(home / "data"),
+        "BENCH_LAST_DATE": DATE,
+        "BENCH_SESSIONS": str(scenario.sessions_listed),
+        "BENCH_PNG_BYTES": str(scenario.png_bytes),
+        "BENCH_SHIM_LOG": str(shim_log),
+        **scenario.shim_env,
+    }
+    cmd = [sys.executable, "-c", CLI, scenario.dates, str(scenario.sessions_back)]
+    cmd += ["--jobs", str(scenario.jobs), *scenario.args]
+
+    notion.counts.clear()
+    notion.rate_limited = 0
+    notion.bytes_received = 0
+    with open(home / "run.log", "w", encoding="utf-8") as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, rusage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    tools = Counter()
+    if shim_log.exists():
+        tools.update(
+            line.split(" ", 1)[0] for line in shim_log.read_text().splitlines()
+        )
+    return {
+        "wall_s": round(wall, 2),
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        "peak_rss_mb": round(
+            rusage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1
+        ),
+        "notion_requests": sum(notion.counts.values()),
+        "rate_limited": notion.rate_limited,
+        "upload_mb": round(notion.bytes_received / 1e6, 1),
+        "labdata_calls": tools["labdata"],
+        "matlab_starts": tools["matlab"],
+        "rclone_calls": tools["rclone"],
+        "exit_code": proc.returncode,
+        "endpoints": dict(sorted(notion.counts.items())),
+    }
+
+
+def run_scenario(scenario: Scenario, rps: float, keep: bool):
+    """Run all passes of a scenario and return one result per pass."""
+    results = []
+    home = Path(tempfile.mkdtemp(prefix=f"bench_{scenario.name}_"))
+    notion = FakeNotion(
+        [f"BENCH{i:03d}" for i in range(scenario.subjects)],
+        history_pages=scenario.history_pages,
+        latency=scenario.latency,
+        rate_limit_every=scenario.rate_limit_every,
+    )
+    with FakeNotionServer(notion) as server:
+        write_preferences(home, scenario, server.base_url, rps)
+        for i in range(scenario.runs):
+            metrics = run_once(scenario, home, notion)
+            name = scenario.name if scenario.runs == 1 else f"{scenario.name}#{i + 1}"
+            results.append({"scenario": name, **metrics})
+            if metrics["exit_code"] != 0:
+                print(f"❌ {name} failed; log: {home / 'run.log'}")
+                keep = True
+    if keep:
+        print(f"📁 Kept {home}")
+    else:
+        shutil.rmtree(home, ignore_errors=True)
+    return results
+
+
+def print_results(results):
+    columns = [
+        ("scenario", "Scenario", "<"),
+        ("wall_s", "Wall s", ">"),
+        ("notion_requests", "Requests", ">"),
+        ("rate_limited", "429s", ">"),
+        ("upload_mb", "Sent MB", ">"),
+        ("labdata_calls", "labdata", ">"),
+        ("matlab_starts", "matlab", ">"),
+        ("rclone_calls", "rclone", ">"),
+        ("peak_rss_mb", "RSS MB", ">"),
+        ("exit_code", "Exit", ">"),
+    ]
+    widths = [
+        max(len(title), *(len(str(r[key])) for r in results))
+        for key, title, _ in columns
+    ]
+    print("  ".join(f"{t:{a}{w}}" for (_, t, a), w in zip(columns, widths)))
+    for r in results:
+        print("  ".join(f"{r[k]!s:{a}{w}}" for (k, _, a), w in zip(columns, widths)))
+
+
+def compare(results, baseline_path: Path, tolerance: float) -> list:
+    """Return regressions of wall time, request count or RSS beyond tolerance."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        old = baseline.get(r["scenario"])
+        if old is None:
+            continue
+        for key in ("wall_s", "notion_requests", "peak_rss_mb"):
+            if old[key] and r[key] > old[key] * (1 + tolerance):
+                regressions.append(
+                    f"{r['scenario']}: {key} {old[key]} -> {r[key]} "
+                    f"(+{100 * (r[key] / old[key] - 1):.0f}%)"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "scenarios", nargs="*", help=f"Scenarios to run: {', '.join(SCENARIOS)}"
+    )
+    parser.add_argument(
+        "--rps",
+        type=float,
+        default=50.0,
+        help="notion.requests_per_second for the client (Notion's real limit is 3)",
+    )
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    parser.add_argument("--baseline", type=Path, help="Results file to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed relative slowdown before --baseline reports a regression",
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep each scenario's temporary HOME"
+    )
+    args = parser.parse_args(argv)
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    selected = [SCENARIOS[n] for n in args.scenarios or SCENARIOS]
+
+    results = []
+    for scenario in selected:
+        print(f"🏁 {scenario.name}")
+        results.extend(run_scenario(scenario, args.rps, args.keep))
+    print()
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "scenarios": [asdict(s) for s in selected],
+                    "rps": args.rps,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    failed = any(r["exit_code"] != 0 for r in results)
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"⚠️ Regression: {line}")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
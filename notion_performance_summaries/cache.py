@@ -0,0 +1,73 @@
+"""Persistent on-disk cache for Notion ID lookups."""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+
+class JsonCache:
+    """Small JSON file of namespaced key/value entries with a shared TTL.
+
+    Entries are stored as ``{"value": ..., "ts": <epoch seconds>}`` and are
+    treated as missing once they are older than ``ttl`` seconds. The file is
+    rewritten atomically on every change so a crash never leaves it half written.
+    """
+
+    def __init__(self, path: Path, ttl: float):
+        self.path = Path(path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Dict[str, Any]]] | None = None
+
+    def _load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        if self._data is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._data = {}
+        return self._data
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, namespace: str, key: str):
+        """Return a cached value, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._load().get(namespace, {}).get(key)
+            if entry is None:
+                return None
+            if time.time() - entry.get("ts", 0) > self.ttl:
+                return None
+            return entry["value"]
+
+    def set(self, namespace: str, key: str, value):
+        """Store a value and persist the cache file."""
+        with self._lock:
+            data = self._load()
+            data.setdefault(namespace, {})[key] = {"value": value, "ts": time.time()}
+            self._save()
+
+    def delete(self, namespace: str, key: str):
+        """Remove a single entry if present."""
+        with self._lock:
+            data = self._load()
+            if data.get(namespace, {}).pop(key, None) is not None:
+                self._save()
+
+    def items(self, namespace: str):
+        """Return (key, value) pairs for all unexpired entries in a namespace."""
+        with self._lock:
+            now = time.time()
+            return [
+                (key, entry["value"])
+                for key, entry in self._load().get(namespace, {}).items()
+                if now - entry.get("ts", 0) <= self.ttl
+            ]
@@ -0,0 +1,112 @@
+"""On-disk catalog of each subject's labdata sessions.
+
+``labdata sessions <subject> --files`` is slow for long-running animals, so the
+session IDs it reports are kept sorted in
+``~/.notion_performance_summaries/catalog/<subject>.json`` together with the
+time they were fetched. Lookups use binary search; labdata is only called again
+when the catalog is missing or expired, when the requested date is at or past
+the newest known session (new sessions may have appeared), or when forced; a
+forced refresh rebuilds the catalog instead of merging into it.
+"""
+
+import bisect
+import json
+import os
+import re
+import time
+from typing import Callable, List
+
+from .preferences import get_app_dir, get_preference  # type: ignore
+
+SESSION_RE = re.compile(r"[0-9]{8}_[0-9]{6}")
+
+
+def catalog_path(subject: str):
+    return get_app_dir() / "catalog" / f"{subject}.json"
+
+
+def load_catalog(subject: str) -> dict:
+    """Return ``{"fetched_at": float, "sessions": [ascending IDs]}`` (empty if absent)."""
+    try:
+        with open(catalog_path(subject), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {"fetched_at": data["fetched_at"], "sessions": data["sessions"]}
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return {"fetched_at": 0.0, "sessions": []}
+
+
+def save_catalog(subject: str, catalog: dict):
+    path = catalog_path(subject)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(catalog, f)
+    os.replace(tmp, path)
+
+
+def merge_sessions(sessions: List[str], new_ids) -> int:
+    """Insert unseen IDs into the sorted list in place; return how many were added."""
+    added = 0
+    for sess in sorted(set(new_ids)):
+        i = bisect.bisect_left(sessions, sess)
+        if i == len(sessions) or sessions[i] != sess:
+            sessions.insert(i, sess)
+            added += 1
+    return added
+
+
+def select_sessions(sessions: List[str], pattern: str, sessions_back: int) -> List[str]:
+    """Newest session starting with ``pattern`` plus ``sessions_back`` older ones.
+
+    ``sessions`` must be sorted ascending; the result is newest first.
+    """
+    hi = bisect.bisect_right(sessions, pattern + "\uffff")
+    if hi == 0 or not sessions[hi - 1].startswith(pattern):
+        return []
+    lo = max(0, hi - 1 - sessions_back)
+    return sessions[lo:hi][::-1]
+
+
+def needs_refresh(catalog: dict, patterns: List[str], now: float | None = None) -> bool:
+    """Decide whether labdata must be asked again for these date patterns."""
+    now = time.time() if now is None else now
+    age = now - catalog["fetched_at"]
+    sessions = catalog["sessions"]
+    if not sessions or age > float(get_preference("catalog.max_age_hours", 24)) * 3600:
+        return True
+    # Dates at the frontier may have gained sessions since the last fetch
+    recent = float(get_preference("catalog.frontier_refresh_minutes", 15)) * 60
+    newest = sessions[-1]
+    return age > recent and any(newest[: len(p)] <= p for p in patterns)
+
+
+def get_sessions(
+    subject: str,
+    patterns: List[str],
+    fetch: Callable[[], str],
+    force_refresh: bool = False,
+) -> List[str]:
+    """Return the subject's sorted session IDs, calling ``fetch`` only if needed.
+
+    ``fetch`` returns raw ``labdata sessions --files`` output, i.e. every
+    session of the subject; ``force_refresh`` therefore rebuilds the catalog
+    from it, dropping sessions that were deleted or renamed upstream.
+    """
+    catalog = load_catalog(subject)
+    if force_refresh:
+        sessions = sorted(set(SESSION_RE.findall(fetch())))
+        removed = len(set(catalog["sessions"]) - set(sessions))
+        catalog = {"fetched_at": time.time(), "sessions": sessions}
+        save_catalog(subject, catalog)
+        print(
+            f"🗃️ Session catalog for {subject} rebuilt "
+            f"({len(sessions)} sessions, -{removed} gone)"
+        )
+    elif needs_refresh(catalog, patterns):
+        added = merge_sessions(catalog["sessions"], SESSION_RE.findall(fetch()))
+        catalog["fetched_at"] = time.time()
+        save_catalog(subject, catalog)
+        print(f"🗃️ Session catalog for {subject} refreshed (+{added} sessions)")
+    else:
+        print(f"🗃️ Using cached session catalog for {subject}")
+    return catalog["sessions"]
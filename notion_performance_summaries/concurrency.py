@@ -0,0 +1,194 @@
+"""Per-stage concurrency limits, per-subject log prefixes and the render -> publish pipeline."""
+
+import queue
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable
+
+from .preferences import get_preference  # type: ignore
+
+# Default number of subjects allowed inside each pipeline stage at once
+DEFAULT_STAGE_LIMITS = {"download": 4, "matlab": 1, "notion": 1}
+
+_STAGE_SEMAPHORES: Dict[str, threading.BoundedSemaphore] = {}
+_local = threading.local()
+
+
+def configure_stages(limits: Dict[str, int] | None = None):
+    """(Re)build the stage semaphores from preferences, optionally overridden."""
+    _STAGE_SEMAPHORES.clear()
+    for name, default in DEFAULT_STAGE_LIMITS.items():
+        value = get_preference(f"concurrency.{name}", default)
+        if limits and name in limits:
+            value = limits[name]
+        _STAGE_SEMAPHORES[name] = threading.BoundedSemaphore(max(1, int(value)))
+
+
+@contextmanager
+def stage(name: str):
+    """Hold one slot of a pipeline stage (download, matlab, notion)."""
+    if not _STAGE_SEMAPHORES:
+        configure_stages()
+    semaphore = _STAGE_SEMAPHORES[name]
+    with semaphore:
+        yield
+
+
+def current_subject() -> str | None:
+    """Return the subject the calling thread is working on, if any."""
+    return getattr(_local, "subject", None)
+
+
+@contextmanager
+def subject_context(subject: str):
+    """Tag output written by the current thread with the subject ID."""
+    previous = current_subject()
+    _local.subject = subject
+    try:
+        yield
+    finally:
+        _local.subject = previous
+
+
+class _SubjectPrefixWriter:
+    """stdout wrapper that prefixes each complete line with ``[subject]``.
+
+    Partial writes are buffered per thread so lines from concurrent subjects
+    never interleave mid-line.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._lock = threading.Lock()
+        self._pending: Dict[int, str] = {}
+
+    def write(self, text):
+        subject = current_subject()
+        if subject is None:
+            with self._lock:
+                return self._stream.write(text)
+        key = threading.get_ident()
+        pending = self._pending.get(key, "") + text
+        *lines, rest = pending.split("\n")
+        self._pending[key] = rest
+        if lines:
+            with self._lock:
+                for line in lines:
+                    self._stream.write(f"[{subject}] {line}\n")
+        return len(text)
+
+    def flush(self):
+        with self._lock:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+@contextmanager
+def prefixed_output():
+    """Temporarily route sys.stdout through the per-subject prefix writer."""
+    original = sys.stdout
+    sys.stdout = _SubjectPrefixWriter(original)
+    try:
+        yield
+    finally:
+        sys.stdout = original
+
+
+_DONE = object()
+
+
+def run_pipeline(
+    items: Iterable,
+    produce: Callable,
+    consume: Callable,
+    producers: int = 1,
+    consumers: int = 1,
+    queue_size: int = 1,
+    on_produced: Callable | None = None,
+    on_interrupt: Callable | None = None,
+):
+    """Stream ``items`` through ``produce`` threads into ``consume`` threads.
+
+    Each ``produce(item)`` result that is not None is passed to
+    ``consume(item, result)`` through a queue of at most ``queue_size`` entries:
+    a producer whose result does not fit waits before taking its next item, so
+    producers never run more than ``queue_size`` items ahead of the consumers.
+    ``on_produced()`` runs once every item is produced, while consumers may still
+    be busy. The first exception (including KeyboardInterrupt in the calling
+    thread) stops producers from taking new items, makes consumers drop what is
+    still queued, and is re-raised once all threads have stopped. When the
+    calling thread itself is interrupted, ``on_interrupt()`` runs before waiting
+    for the threads, so it can stop work they are blocked on.
+    """
+    todo: queue.SimpleQueue = queue.SimpleQueue()
+    for item in items:
+        todo.put(item)
+    handoff: queue.Queue = queue.Queue(maxsize=max(1, int(queue_size)))
+    stop = threading.Event()
+    errors: list = []
+
+    def fail(e: BaseException):
+        errors.append(e)
+        stop.set()
+
+    def producer():
+        while not stop.is_set():
+            try:
+                item = todo.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                result = produce(item)
+            except BaseException as e:
+                return fail(e)
+            while result is not None and not stop.is_set():
+                try:
+                    handoff.put((item, result), timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    def consumer():
+        while True:
+            entry = handoff.get()
+            if entry is _DONE:
+                return
+            if stop.is_set():
+                continue
+            try:
+                consume(*entry)
+            except BaseException as e:
+                fail(e)
+
+    def start(target, name, count):
+        threads = [
+            threading.Thread(target=target, name=f"{name}-{i}", daemon=True)
+            for i in range(max(1, count))
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    producer_threads = start(producer, "produce", producers)
+    consumer_threads = start(consumer, "consume", consumers)
+    try:
+        for thread in producer_threads:
+            thread.join()
+        if on_produced is not None and not stop.is_set():
+            on_produced()
+    except BaseException as e:
+        fail(e)
+        if on_interrupt is not None:
+            on_interrupt()
+        for thread in producer_threads:
+            thread.join()
+    finally:
+        for _ in consumer_threads:
+            handoff.put(_DONE)
+        for thread in consumer_threads:
+            thread.join()
+    if errors:
+        raise errors[0]
@@ -1,39 +1,106 @@
-"""Configuration constants and headers for Notion Performance Summaries."""
+"""Configuration and headers for Notion Performance Summaries.
+
+Nothing is validated or read at import time: the first call to get_settings()
+validates preferences.json and the required environment variables. Path and
+subject settings are read through get_preference on every access, so they
+follow edits to preferences.json.
+"""
 
 import os
-from typing import Dict
-from .preferences import get_preference, validate_preferences  # type: ignore
-
-# Validate preferences before loading configuration
-validate_preferences()
-
-# === CONFIG ===
-NOTION_TOKEN = os.environ.get("NOTION_TOKEN")
-if not NOTION_TOKEN:
-    raise RuntimeError(
-        "NOTION_TOKEN environment variable is not set. Export your Notion integration token as NOTION_TOKEN."
-    )
-LAB_DB_ID = os.environ.get("LAB_ANIMALS_DB_ID")
-if not LAB_DB_ID:
-    raise RuntimeError(
-        "LAB_DB_ID environment variable is not set. Export your Notion lab database ID as LAB_ANIMALS_DB_ID."
-    )
-
-# Load configuration from preferences.json (validation ensures these are not empty)
-OUTPUT_LOC = get_preference("paths.output_loc")
-REMOTE = get_preference("paths.remote")
-SUBJECTS = get_preference("subjects")
-
-# Notion API headers
-NOTION_VERSION = get_preference("notion.version", "2025-09-03")
-base_headers = {
-    "Authorization": f"Bearer {NOTION_TOKEN}",
-    "Notion-Version": NOTION_VERSION,
-}
-json_headers = {
-    **base_headers,
-    "Content-Type": "application/json",
+import threading
+from functools import cached_property
+
+from .cache import JsonCache  # type: ignore
+from .preferences import get_app_dir, get_preference, validate_preferences  # type: ignore
+
+
+def _require_env(name: str, message: str) -> str:
+    value = os.environ.get(name)
+    if not value:
+        raise RuntimeError(message)
+    return value
+
+
+class Settings:
+    """Validated configuration, built on first use by get_settings()."""
+
+    def __init__(self):
+        # Validate preferences before loading configuration
+        validate_preferences()
+        self.notion_token = _require_env(
+            "NOTION_TOKEN",
+            "NOTION_TOKEN environment variable is not set. Export your Notion integration token as NOTION_TOKEN.",
+        )
+        self.lab_db_id = _require_env(
+            "LAB_ANIMALS_DB_ID",
+            "LAB_DB_ID environment variable is not set. Export your Notion lab database ID as LAB_ANIMALS_DB_ID.",
+        )
+
+    @property
+    def output_loc(self) -> str:
+        return get_preference("paths.output_loc")
+
+    @property
+    def remote(self) -> str:
+        return get_preference("paths.remote")
+
+    @property
+    def subjects(self) -> list:
+        return get_preference("subjects")
+
+    @property
+    def notion_version(self) -> str:
+        return get_preference("notion.version", "2025-09-03")
+
+    @property
+    def base_headers(self) -> dict:
+        """Notion API headers."""
+        return {
+            "Authorization": f"Bearer {self.notion_token}",
+            "Notion-Version": self.notion_version,
+        }
+
+    @property
+    def json_headers(self) -> dict:
+        return {**self.base_headers, "Content-Type": "application/json"}
+
+    @cached_property
+    def resolver_cache(self) -> JsonCache:
+        """Persistent cache for subject -> page_id -> perf_db_id and database_id -> data_source_id."""
+        return JsonCache(
+            get_app_dir() / "resolver_cache.json",
+            ttl=float(get_preference("cache.ttl_hours", 168)) * 3600,
+        )
+
+
+_settings: Settings | None = None
+_settings_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    """Return the process-wide Settings, validating configuration on first use."""
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            _settings = Settings()
+        return _settings
+
+
+# Module-level names kept for scripts that still do ``from config import ...``
+_LEGACY_NAMES = {
+    "NOTION_TOKEN": "notion_token",
+    "LAB_DB_ID": "lab_db_id",
+    "OUTPUT_LOC": "output_loc",
+    "REMOTE": "remote",
+    "SUBJECTS": "subjects",
+    "NOTION_VERSION": "notion_version",
+    "base_headers": "base_headers",
+    "json_headers": "json_headers",
+    "RESOLVER_CACHE": "resolver_cache",
 }
 
-# Simple cache for database_id -> data_source_id lookups
-_DATA_SOURCE_CACHE: Dict[str, str] = {}
+
+def __getattr__(name):
+    if name in _LEGACY_NAMES:
+        return getattr(get_settings(), _LEGACY_NAMES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,62 +1,307 @@
 """Data processing functions for lab data sessions and MATLAB operations."""
 
 import os
-import re
+import queue
+import signal
 import subprocess
-from typing import List
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Set
+from .catalog import SESSION_RE, get_sessions, select_sessions  # type: ignore
+from .concurrency import stage  # type: ignore
+from .matlab_worker import MatlabWorkerDied  # type: ignore
+from .preferences import get_preference  # type: ignore
+from .tracing import span  # type: ignore
 
 
-def run_cmd(cmd, dry_run=False):
-    """Execute a shell command and return stdout, or print for dry run."""
+# Written into <session>/chipmunk once labdata get has finished successfully
+DOWNLOAD_MARKER = ".download_complete"
+
+
+class CommandIdle(subprocess.TimeoutExpired):
+    """Raised when a command writes no output for ``timeout`` seconds."""
+
+    def __str__(self):
+        return f"Command '{self.cmd}' wrote no output for {self.timeout} seconds"
+
+
+# Longest chunk read as one line; longer lines arrive in pieces
+MAX_LINE = 64 * 1024
+# Seconds between SIGTERM and SIGKILL when a command is killed
+KILL_GRACE = 5.0
+# Wall-clock limits (seconds) for tools without a ``<tool>.timeout`` preference
+DEFAULT_TIMEOUTS = {"labdata": 600, "matlab": 6 * 3600, "rclone": 4 * 3600}
+
+# Commands started by run_cmd that are still running. They run in their own
+# session, so the terminal's Ctrl-C does not reach them: kill_running_commands()
+# stops them when the run is interrupted.
+_running: Set[subprocess.Popen] = set()
+_running_lock = threading.Lock()
+
+
+class _Tail:
+    """The most recent lines of a stream, up to ``max_bytes`` characters."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.lines: deque = deque()
+        self.size = 0
+
+    def add(self, line: str):
+        self.lines.append(line)
+        self.size += len(line)
+        while self.size > self.max_bytes and len(self.lines) > 1:
+            self.size -= len(self.lines.popleft())
+
+    def text(self) -> str:
+        return "".join(self.lines)
+
+
+def _pump(pipe, name, lines: queue.Queue):
+    """Forward a pipe to ``lines`` as ``(name, line)`` and ``(name, None)`` at EOF."""
+    with pipe:
+        for line in iter(lambda: pipe.readline(MAX_LINE), ""):
+            lines.put((name, line))
+    lines.put((name, None))
+
+
+def _kill_group(proc: subprocess.Popen):
+    """Stop a command and every process it started."""
+    if os.name != "posix":
+        proc.kill()
+        proc.wait()
+        return
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(proc.pid, sig)
+        except ProcessLookupError:
+            break
+        try:
+            proc.wait(timeout=KILL_GRACE)
+        except subprocess.TimeoutExpired:
+            continue
+    proc.wait()
+
+
+def kill_running_commands():
+    """Kill every command run_cmd is waiting on, with the processes they started."""
+    with _running_lock:
+        procs = list(_running)
+    for proc in procs:
+        _kill_group(proc)
+
+
+def _stream_cmd(cmd, timeout, idle_timeout, on_line, echo, tags) -> str:
+    """Run ``cmd`` reading its output line by line; return the tail of stdout."""
+    max_bytes = int(get_preference("commands.max_output_bytes", 4 * 1024 * 1024))
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+        start_new_session=os.name == "posix",  # own process group for killpg
+    )
+    with _running_lock:
+        _running.add(proc)
+    # Bounded so a chatty command waits for us instead of filling memory
+    lines: queue.Queue = queue.Queue(maxsize=1024)
+    tails = {"stdout": _Tail(max_bytes), "stderr": _Tail(max_bytes)}
+    for name in tails:
+        threading.Thread(
+            target=_pump, args=(getattr(proc, name), name, lines), daemon=True
+        ).start()
+    start = last_output = time.monotonic()
+    open_streams = len(tails)
+    try:
+        while open_streams:
+            now = time.monotonic()
+            if timeout and now - start > timeout:
+                raise subprocess.TimeoutExpired(
+                    cmd, timeout, tails["stdout"].text(), tails["stderr"].text()
+                )
+            if idle_timeout and now - last_output > idle_timeout:
+                raise CommandIdle(
+                    cmd, idle_timeout, tails["stdout"].text(), tails["stderr"].text()
+                )
+            try:
+                name, line = lines.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if line is None:
+                open_streams -= 1
+                continue
+            last_output = time.monotonic()
+            tags["bytes"] += len(line)
+            tails[name].add(line)
+            text = line.rstrip("\r\n")
+            if echo:
+                print(f"   {text}")
+            if on_line is not None:
+                on_line(text)
+        remaining = max(0.0, timeout - (time.monotonic() - start)) if timeout else None
+        returncode = proc.wait(timeout=remaining)
+    except BaseException:
+        _kill_group(proc)
+        raise
+    finally:
+        with _running_lock:
+            _running.discard(proc)
+    if returncode:
+        raise subprocess.CalledProcessError(
+            returncode, cmd, tails["stdout"].text(), tails["stderr"].text()
+        )
+    return tails["stdout"].text()
+
+
+def run_cmd(
+    cmd, dry_run=False, timeout=None, idle_timeout=None, on_line=None, echo=False
+):
+    """Execute a command and return its stdout, or print it for a dry run.
+
+    Output is read as it is written: each stdout/stderr line is passed to
+    ``on_line`` (in the calling thread) and printed if ``echo`` is set. Only the
+    last ``commands.max_output_bytes`` of stdout are returned. A command that
+    runs longer than ``timeout`` seconds, or writes nothing for
+    ``idle_timeout`` seconds, is killed together with the processes it started
+    and TimeoutExpired (CommandIdle) is raised. Both default to the
+    ``<tool>.timeout`` and ``<tool>.idle_timeout`` preferences, then to
+    DEFAULT_TIMEOUTS.
+    """
     print("▶", " ".join(cmd))
     if dry_run:
         print("DRY RUN: Command not executed")
         return "DRY RUN"
-    return subprocess.run(
-        cmd, capture_output=True, text=True, check=True
-    ).stdout.strip()
+    tool = os.path.basename(cmd[0])
+    timeout = timeout or get_preference(f"{tool}.timeout", DEFAULT_TIMEOUTS.get(tool))
+    idle_timeout = idle_timeout or get_preference(f"{tool}.idle_timeout")
+    with span(f"cmd.{tool}", cmd=" ".join(cmd)[:200], bytes=0) as tags:
+        out = _stream_cmd(cmd, timeout, idle_timeout, on_line, echo, tags)
+    return out.strip()
+
+
+def list_sessions(subject) -> str:
+    """Run ``labdata sessions`` and return only the session IDs it printed."""
+    found: List[str] = []
+    run_cmd(
+        ["labdata", "sessions", subject, "--files"],
+        on_line=lambda line: found.extend(SESSION_RE.findall(line)),
+    )
+    return "\n".join(found)
+
+
+def _mark_complete(session_dir):
+    """Atomically create the download completion marker for a session."""
+    os.makedirs(session_dir, exist_ok=True)
+    marker = os.path.join(session_dir, DOWNLOAD_MARKER)
+    tmp = f"{marker}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(f"{time.time()}\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, marker)
+
+
+def downloaded_sessions(subject, input_loc, sessions: Iterable[str]) -> Set[str]:
+    """Return which of ``sessions`` finished downloading, with one stat per session.
+
+    Only the candidate sessions are checked, never every session folder the
+    subject has ever had. A session only counts once its completion marker
+    exists, so a partially downloaded chipmunk/ folder is downloaded again.
+    """
+    return {
+        sess
+        for sess in sessions
+        if os.path.exists(f"{input_loc}/{subject}/{sess}/chipmunk/{DOWNLOAD_MARKER}")
+    }
+
+
+def download_session(subject, sess, input_loc, timeout=None, retries=2):
+    """Download one session's chipmunk .mat files, retrying on failure or timeout."""
+    cmd = ["labdata", "get", subject, "-s", sess, "-d", "chipmunk", "-i", "*.mat"]
+    for attempt in range(retries + 1):
+        try:
+            with stage("download"), span("stage.download", session=sess):
+                print(f"⬇️ Downloading: {subject} {sess}")
+                run_cmd(cmd, timeout=timeout)
+            _mark_complete(f"{input_loc}/{subject}/{sess}/chipmunk")
+            return
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            if attempt == retries:
+                raise
+            print(f"🔁 Download of {subject} {sess} failed ({e}); retrying")
+
+
+def as_patterns(pattern) -> List[str]:
+    """Accept one date pattern or a list of them."""
+    return [pattern] if isinstance(pattern, str) else list(pattern)
 
 
 def ensure_sessions(
-    subject, pattern, sessions_back, input_loc, dry_run=False
+    subject, pattern, sessions_back, input_loc, dry_run=False, refresh_catalog=False
 ) -> List[str]:
-    """Mimics labdata session checking/downloading logic."""
-    # Get list of sessions
-    out = run_cmd(["labdata", "sessions", subject, "--files"], dry_run=dry_run)
+    """Mimics labdata session checking/downloading logic.
+
+    ``pattern`` may be a list of dates: the sessions needed by every date are
+    merged and downloaded once. Session IDs come from the on-disk session
+    catalog; ``labdata sessions`` is only called when the catalog cannot answer
+    (or ``refresh_catalog`` is set). Missing sessions are downloaded
+    concurrently; each download holds a slot of the shared "download" stage, so
+    the limit applies across all subjects.
+    """
+    patterns = as_patterns(pattern)
+    list_cmd = ["labdata", "sessions", subject, "--files"]
     if dry_run:
+        run_cmd(list_cmd, dry_run=dry_run)
         print("DRY RUN: Skipping session discovery, returning mock session list")
-        return [f"{pattern}_000000"]
-    sessions = sorted(list(set(re.findall(r"[0-9]{8}_[0-9]{6}", out))), reverse=True)
-    # Find pattern match
-    match_index = next((i for i, s in enumerate(sessions) if s.startswith(pattern)), -1)
-    if match_index < 0:
-        print(f"❌ No session found for {subject} with {pattern}")
+        return [f"{p}_000000" for p in patterns]
+    with span("stage.list_sessions"):
+        sessions = get_sessions(
+            subject,
+            patterns,
+            lambda: list_sessions(subject),
+            force_refresh=refresh_catalog,
+        )
+    to_download: List[str] = []
+    for p in patterns:
+        selected = select_sessions(sessions, p, sessions_back)
+        if not selected:
+            print(f"❌ No session found for {subject} with {p}")
+        to_download.extend(sess for sess in selected if sess not in to_download)
+    if not to_download:
         return []
-    end_index = min(match_index + sessions_back + 1, len(sessions))
-    to_download = sessions[match_index:end_index]
+    to_download.sort(reverse=True)
 
+    done = downloaded_sessions(subject, input_loc, to_download)
+    missing = []
     for sess in to_download:
-        session_dir = f"{input_loc}/{subject}/{sess}/chipmunk"
-        if os.path.exists(session_dir) and any(
-            f.endswith(".mat") for f in os.listdir(session_dir)
-        ):
+        if sess in done:
             print(f"✅ Already downloaded: {subject} {sess}")
         else:
-            print(f"⬇️ Downloading: {subject} {sess}")
-            run_cmd(
-                [
-                    "labdata",
-                    "get",
-                    subject,
-                    "-s",
-                    sess,
-                    "-d",
-                    "chipmunk",
-                    "-i",
-                    "*.mat",
-                ],
-                dry_run=dry_run,
-            )
+            missing.append(sess)
+
+    if missing:
+        timeout = get_preference("labdata.download_timeout", 1800)
+        retries = int(get_preference("labdata.download_retries", 2))
+        workers = int(get_preference("concurrency.download", 4))
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {
+                sess: pool.submit(
+                    download_session, subject, sess, input_loc, timeout, retries
+                )
+                for sess in missing
+            }
+        failed = []
+        for sess, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                print(f"❌ Download failed: {subject} {sess}: {e}")
+                failed.append(sess)
+        if failed:
+            raise RuntimeError(f"Could not download sessions: {', '.join(failed)}")
     return to_download
 
 
@@ -68,13 +313,33 @@ def run_matlab(
     sessions_back,
     pattern,
     dry_run=False,
+    worker=None,
 ):
-    """Execute MATLAB script for generating performance visualizations."""
+    """Execute MATLAB script for generating performance visualizations.
+
+    ``pattern`` may be a list of dates; they are all plotted in one MATLAB
+    call so MATLAB starts once per subject. If a MatlabWorkerPool is passed as
+    ``worker`` the job runs in an already started MATLAB; if that worker dies we
+    fall back to a one-shot ``matlab -batch``.
+    """
     os.makedirs(subject_output, exist_ok=True)
-    matlab_cmd = (
+    patterns = as_patterns(pattern)
+    matlab_cmd = "; ".join(
         f"batchCopyPlot({{'{subject}'}}, '{input_loc}', '{labdata_loc}', "
-        f"'{subject_output}', {sessions_back}, '{pattern}')"
+        f"'{subject_output}', {sessions_back}, '{p}')"
+        for p in patterns
     )
+    pattern = ",".join(patterns)
     print("⚙️ Running MATLAB for", subject)
-    run_cmd(["matlab", "-batch", matlab_cmd], dry_run=dry_run)
+    if worker is not None and not dry_run and not worker.disabled:
+        try:
+            print("▶ [worker]", matlab_cmd)
+            with span("stage.matlab", mode="worker", pattern=pattern):
+                worker.run(matlab_cmd)
+            print("✔️ Finished MATLAB for", subject)
+            return
+        except MatlabWorkerDied as e:
+            print(f"⚠️ {e}; falling back to one-shot MATLAB for {subject}")
+    with span("stage.matlab", mode="batch", pattern=pattern):
+        run_cmd(["matlab", "-batch", matlab_cmd], dry_run=dry_run, echo=True)
     print("✔️ Finished MATLAB for", subject)
@@ -2,25 +2,87 @@
 
 import os
 import json
+import mmap
+import re
+import tempfile
+import threading
+import time
 import requests
-from .config import OUTPUT_LOC, REMOTE, base_headers, json_headers  # type: ignore
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Set
+from .config import get_settings  # type: ignore
 from .data_processing import run_cmd  # type: ignore
+from .notion_http import get_client  # type: ignore
+from .preferences import get_preference  # type: ignore
+from .tracing import record_span  # type: ignore
 
 
-def upload_to_notion_and_get_file_id(filepath):
+# Notion accepts single-part uploads up to 20 MB; larger files must be sent in
+# parts of 5-20 MB (the last part may be smaller).
+SINGLE_PART_LIMIT = 20 * 1024 * 1024
+PART_SIZE = 10 * 1024 * 1024
+
+
+def _send_part(file_id, file_name, mime_type, data, part_number=None):
+    """POST one chunk of bytes to /file_uploads/{id}/send."""
+    files = {"file": (file_name, data, mime_type)}
+    form = {"part_number": str(part_number)} if part_number is not None else None
+    # Resending a part only replaces it, so sends are safe to retry
+    r_send = get_client().post(
+        f"/file_uploads/{file_id}/send", files=files, data=form, idempotent=True
+    )
+    r_send.raise_for_status()
+
+
+def _send_multi_part(filepath, file_id, file_name, mime_type, number_of_parts):
+    """Send every part concurrently from a memory-mapped file, then complete.
+
+    Each part is its own request, so a failed part is retried (by the shared
+    client) without resending the rest of the file.
+    """
+    workers = int(get_preference("notion.upload_workers", 4))
+    with open(filepath, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+
+                def send(part_number):
+                    start = (part_number - 1) * PART_SIZE
+                    with view[start : start + PART_SIZE] as chunk:
+                        _send_part(file_id, file_name, mime_type, chunk, part_number)
+
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    # list() re-raises the first failed part
+                    list(pool.map(send, range(1, number_of_parts + 1)))
+            finally:
+                view.release()
+
+    r_complete = get_client().post(f"/file_uploads/{file_id}/complete", json={})
+    r_complete.raise_for_status()
+
+
+def upload_to_notion_and_get_file_id(filepath, file_name=None):
     """Upload a file using ONLY the 2025-09-03 Notion file upload flow.
 
+    ``file_name`` is the name shown in Notion (defaults to the file's basename).
+
     Flow:
-      1) POST /v1/file_uploads  { filename, content_type, mode=single_part }
+      1) POST /v1/file_uploads  { filename, content_type, mode }
       2) POST /v1/file_uploads/{id}/send (multipart form field "file")
+         - multi_part mode: one send per part (with "part_number"), sent
+           concurrently, then POST /v1/file_uploads/{id}/complete
       3) Reference returned id in Files & media property as type file_upload.
     """
     try:
-        file_name = os.path.basename(filepath)
+        file_name = file_name or os.path.basename(filepath)
         mime_type = "image/png"
         file_size = os.path.getsize(filepath)
+        multi_part = file_size > SINGLE_PART_LIMIT
+        number_of_parts = -(-file_size // PART_SIZE)
         print(
-            f"📤 Starting direct Notion upload for {file_name} ({file_size} bytes)..."
+            f"📤 Starting direct Notion upload for {file_name} ({file_size} bytes"
+            + (f", {number_of_parts} parts" if multi_part else "")
+            + ")..."
         )
 
         # Step 1: Create file upload descriptor
@@ -29,11 +91,10 @@ def upload_to_notion_and_get_file_id(filepath):
             "content_type": mime_type,
             "mode": "single_part",
         }
-        r_create = requests.post(
-            "https://api.notion.com/v1/file_uploads",
-            headers=json_headers,
-            json=create_payload,
-        )
+        if multi_part:
+            create_payload["mode"] = "multi_part"
+            create_payload["number_of_parts"] = number_of_parts
+        r_create = get_client().post("/file_uploads", json=create_payload)
         r_create.raise_for_status()
         meta = r_create.json()
         file_id = meta.get("id") or (
@@ -46,11 +107,11 @@ def upload_to_notion_and_get_file_id(filepath):
             raise RuntimeError("Notion did not return file upload id")
 
         # Step 2: Send file bytes
-        send_url = f"https://api.notion.com/v1/file_uploads/{file_id}/send"
-        with open(filepath, "rb") as f:
-            files = {"file": (file_name, f, mime_type)}
-            r_send = requests.post(send_url, headers=base_headers, files=files)
-        r_send.raise_for_status()
+        if multi_part:
+            _send_multi_part(filepath, file_id, file_name, mime_type, number_of_parts)
+        else:
+            with open(filepath, "rb") as f:
+                _send_part(file_id, file_name, mime_type, f)
 
         print(f"✅ Uploaded to Notion (file id: {file_id})")
         return file_id
@@ -67,39 +128,171 @@ def upload_to_notion_and_get_file_id(filepath):
         raise
 
 
+_ANSI_RE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+
+def rclone_progress(interval: float = 10.0):
+    """Return an on_line callback that prints rclone's transfer totals every ``interval`` s."""
+    last = [0.0]
+
+    def on_line(line: str):
+        line = _ANSI_RE.sub("", line).strip()
+        if not (line.startswith("Transferred:") and "%" in line):
+            return
+        if time.monotonic() - last[0] >= interval:
+            last[0] = time.monotonic()
+            print(f"📁 {line}")
+
+    return on_line
+
+
 def backup_subject(subject: str, overwrite: bool = False, dry_run: bool = False):
     """Perform a single backup operation for a subject directory."""
-    subject_dir = f"{OUTPUT_LOC}/{subject}"
+    subject_dir = f"{get_settings().output_loc}/{subject}"
     if not os.path.isdir(subject_dir):
         print(f"⚠️ Subject directory missing, skipping backup: {subject_dir}")
         return
-    remote_path = f"{REMOTE}/{subject}"
+    remote_path = f"{get_settings().remote}/{subject}"
     cmd = ["rclone", "copy", "--progress", subject_dir, remote_path]
     if not overwrite:
         cmd.append("--ignore-existing")
-    run_cmd(cmd, dry_run=dry_run)
+    run_cmd(cmd, dry_run=dry_run, on_line=rclone_progress())
     print(f"✅ Backup complete: {remote_path}")
 
 
+class BackupBatch:
+    """Back up one run's PNGs for all subjects with a single rclone call.
+
+    Files are collected with add(); start() writes a ``--files-from`` manifest
+    (paths relative to paths.output_loc) and runs rclone through run_cmd on a
+    background thread so it overlaps with Notion uploads; wait() collects the
+    result. rclone therefore only checks the files this run produced, not every
+    subject folder, and is bound by the ``rclone.timeout`` and
+    ``rclone.idle_timeout`` limits like any other command.
+    """
+
+    def __init__(self, overwrite: bool = False, dry_run: bool = False):
+        self.overwrite = overwrite
+        self.dry_run = dry_run
+        self.files: Set[str] = set()
+        self.subjects: Set[str] = set()
+        self._thread: threading.Thread | None = None
+        # Set when rclone is done; unlike Thread.join, still reliable after a
+        # join interrupted by Ctrl-C
+        self._finished = threading.Event()
+        self._error: BaseException | None = None
+        self._started_at = 0.0
+        self._manifest: str | None = None
+
+    def add(self, subject: str, fname: str):
+        self.files.add(f"{subject}/{fname}")
+        self.subjects.add(subject)
+
+    def command(self, manifest: str) -> List[str]:
+        cmd = [
+            "rclone",
+            "copy",
+            "--progress",
+            "--files-from",
+            manifest,
+            "--transfers",
+            str(get_preference("rclone.transfers", 8)),
+            "--checkers",
+            str(get_preference("rclone.checkers", 16)),
+            get_settings().output_loc,
+            get_settings().remote,
+        ]
+        if not self.overwrite:
+            cmd.append("--ignore-existing")
+        return cmd
+
+    def _remove_manifest(self):
+        if self._manifest and os.path.exists(self._manifest):
+            os.remove(self._manifest)
+
+    def _run(self, cmd: List[str]):
+        try:
+            run_cmd(cmd, on_line=rclone_progress())
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._remove_manifest()  # only once rclone no longer reads it
+            self._finished.set()
+
+    def start(self):
+        """Write the manifest and start rclone without waiting for it."""
+        if not self.files:
+            print("📁 No new files to back up")
+            return
+        fd, self._manifest = tempfile.mkstemp(prefix="rclone_files_", suffix=".txt")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(sorted(self.files)) + "\n")
+        cmd = self.command(self._manifest)
+        print(f"📁 Backing up {len(self.files)} files in the background")
+        if self.dry_run:
+            run_cmd(cmd, dry_run=True)
+            for path in sorted(self.files):
+                print(f"DRY RUN: would back up {path}")
+            self._remove_manifest()
+            return
+        self._started_at = time.time()
+        self._thread = threading.Thread(
+            target=self._run, args=(cmd,), name="backup", daemon=True
+        )
+        self._thread.start()
+
+    def join(self, timeout: float | None = None):
+        """Wait for the rclone thread to end without reporting its result."""
+        if self._thread is not None:
+            self._finished.wait(timeout)
+
+    def wait(self) -> bool:
+        """Wait for rclone; return False (after printing its output) on failure."""
+        if self._thread is None:
+            return True
+        self._finished.wait()
+        error = self._error
+        tags = {"files": len(self.files)}
+        if error is not None:
+            tags["error"] = type(error).__name__
+        record_span(
+            "stage.backup", self._started_at, time.time() - self._started_at, **tags
+        )
+        if error is not None:
+            output = getattr(error, "stderr", None) or getattr(error, "output", None)
+            print(f"❌ Backup failed ({error}):\n{(output or '')[-2000:]}")
+            return False
+        print(f"✅ Backup complete: {len(self.files)} files to {get_settings().remote}")
+        return True
+
+
 def upload_to_drive(
-    subject, fname, overwrite=False, backup_already_done=True, dry_run=False
+    subject,
+    fname,
+    overwrite=False,
+    backup_already_done=True,
+    dry_run=False,
+    upload_path=None,
 ):
-    """Upload PNG to Notion (assumes backup already handled unless specified)."""
-    subject_dir = f"{OUTPUT_LOC}/{subject}"
+    """Upload PNG to Notion (assumes backup already handled unless specified).
+
+    ``upload_path`` sends another file (e.g. a recompressed copy) under ``fname``.
+    """
+    subject_dir = f"{get_settings().output_loc}/{subject}"
     file_path = f"{subject_dir}/{fname}"
     if not os.path.exists(file_path):
         raise FileNotFoundError(file_path)
     if not backup_already_done:
         # Fallback single file backup if explicitly requested (not expected in main flow)
-        remote_path = f"{REMOTE}/{subject}"
+        remote_path = f"{get_settings().remote}/{subject}"
         cmd = ["rclone", "copy", "--progress", subject_dir, remote_path]
         if not overwrite:
             cmd.append("--ignore-existing")
-        run_cmd(cmd, dry_run=dry_run)
+        run_cmd(cmd, dry_run=dry_run, on_line=rclone_progress())
         print(f"📁 On-demand backup performed for {fname}")
 
     if dry_run:
         print(f"DRY RUN: Skipping Notion upload for {fname}")
         return "dry-run-file-id"
 
-    return upload_to_notion_and_get_file_id(file_path)
+    return upload_to_notion_and_get_file_id(upload_path or file_path, file_name=fname)
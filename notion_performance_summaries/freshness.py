@@ -0,0 +1,111 @@
+"""Make-style freshness records for MATLAB renders.
+
+After MATLAB renders a date for a subject, the ``.mat`` files of the sessions
+it read (path, mtime, size) and the PNGs it produced are recorded in
+``~/.notion_performance_summaries/renders/<subject>.json`` under
+``<date>_<sessions_back>``. A later run only renders that date again when an
+input was added, removed or changed, when a recorded PNG is missing or was
+modified, or when ``--force-render`` is given.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Iterable, List
+
+from .preferences import get_app_dir  # type: ignore
+
+Fingerprint = Dict[str, List[int]]  # path -> [mtime_ns, size]
+
+_lock = threading.Lock()
+
+
+def records_path(subject: str):
+    return get_app_dir() / "renders" / f"{subject}.json"
+
+
+def _stat(path: str) -> List[int] | None:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def input_fingerprint(
+    input_loc: str, subject: str, sessions: Iterable[str]
+) -> Fingerprint:
+    """Stat every ``.mat`` file MATLAB reads for these sessions."""
+    inputs: Fingerprint = {}
+    for sess in sessions:
+        folder = f"{input_loc}/{subject}/{sess}/chipmunk"
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".mat"):
+                        st = entry.stat()
+                        inputs[entry.path] = [st.st_mtime_ns, st.st_size]
+        except FileNotFoundError:
+            continue
+    return inputs
+
+
+def output_fingerprint(subject_output: str, names: Iterable[str]) -> Fingerprint:
+    outputs: Fingerprint = {}
+    for name in names:
+        stat = _stat(os.path.join(subject_output, name))
+        if stat is not None:
+            outputs[name] = stat
+    return outputs
+
+
+def load_records(subject: str) -> dict:
+    try:
+        with open(records_path(subject), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def stale_reason(
+    subject: str,
+    date: str,
+    sessions_back: int,
+    inputs: Fingerprint,
+    subject_output: str,
+    records: dict | None = None,
+) -> str | None:
+    """Why ``date`` must be rendered again, or None if its PNGs are up to date."""
+    records = load_records(subject) if records is None else records
+    record = records.get(f"{date}_{sessions_back}")
+    if record is None:
+        return "never rendered"
+    if not inputs:
+        return "no input files"
+    if record["inputs"] != inputs:
+        return "inputs changed"
+    if not record["outputs"]:
+        return "no outputs recorded"
+    for name, stat in record["outputs"].items():
+        if _stat(os.path.join(subject_output, name)) != stat:
+            return "outputs missing or modified"
+    return None
+
+
+def record_render(
+    subject: str,
+    date: str,
+    sessions_back: int,
+    inputs: Fingerprint,
+    outputs: Fingerprint,
+):
+    """Remember the inputs and outputs of a successful render."""
+    path = records_path(subject)
+    with _lock:
+        records = load_records(subject)
+        records[f"{date}_{sessions_back}"] = {"inputs": inputs, "outputs": outputs}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".json.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(records, f)
+        os.replace(tmp, path)
@@ -0,0 +1,119 @@
+"""Append-only journal of completed pipeline steps, used by ``--resume``.
+
+Each run (date(s), sessions_back) has a JSON-lines journal in
+``~/.notion_performance_summaries/journals/``. Finished steps are appended as
+they complete: ``render`` and ``publish`` per subject, ``upload`` per file and
+``backup`` per subject. Stage boundaries are
+fsync'd, so a crash loses at most the step in progress. On resume the journal
+is read back, a torn last line is dropped, and the file is rewritten with one
+line per step before new entries are appended.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .preferences import get_app_dir  # type: ignore
+
+StepKey = Tuple[str | None, str, str | None]  # (subject, stage, file)
+
+
+def run_key(patterns: List[str], sessions_back: int) -> str:
+    """Name of the journal for a run over ``patterns`` with ``sessions_back``."""
+    if len(patterns) == 1:
+        return f"{patterns[0]}_{sessions_back}"
+    digest = hashlib.sha1(",".join(patterns).encode()).hexdigest()[:8]
+    return f"{patterns[0]}-{patterns[-1]}_{digest}_{sessions_back}"
+
+
+def journal_path(key: str) -> Path:
+    return get_app_dir() / "journals" / f"{key}.jsonl"
+
+
+class RunJournal:
+    """Completed steps of one run; ``path=None`` keeps them in memory only."""
+
+    def __init__(self, path: Path | None = None, resume: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._steps: Dict[StepKey, dict] = {}
+        self._file = None
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if resume:
+            self._load()
+        self._rewrite()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:  # type: ignore[arg-type]
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn write from a crash
+                    key = (entry.get("subject"), entry["stage"], entry.get("file"))
+                    self._steps[key] = entry
+        except FileNotFoundError:
+            pass
+
+    def _rewrite(self):
+        """Atomically replace the file with one line per known step."""
+        tmp = self.path.with_suffix(".jsonl.tmp")  # type: ignore[union-attr]
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in self._steps.values():
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)  # type: ignore[arg-type]
+
+    def done(self, subject: str | None, stage: str, file: str | None = None) -> bool:
+        with self._lock:
+            return (subject, stage, file) in self._steps
+
+    def get(self, subject: str | None, stage: str, file: str | None = None) -> dict:
+        with self._lock:
+            return self._steps.get((subject, stage, file), {})
+
+    def record(
+        self,
+        subject: str | None,
+        stage: str,
+        file: str | None = None,
+        sync: bool = False,
+        **data,
+    ):
+        """Append a finished step; ``sync=True`` fsyncs it (use at stage boundaries)."""
+        entry = {"subject": subject, "stage": stage, **data}
+        if file is not None:
+            entry["file"] = file
+        with self._lock:
+            self._steps[(subject, stage, file)] = entry
+            if self._file is None:
+                return
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+
+    def summary(self) -> str:
+        with self._lock:
+            stages = [key[1] for key in self._steps]
+        parts = [f"{stages.count(s)} {s}" for s in ("render", "upload", "publish")]
+        return ", ".join(parts)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def open_journal(patterns: List[str], sessions_back: int, resume=False) -> RunJournal:
+    """Open the run's journal, continuing it with ``resume`` or starting it afresh."""
+    return RunJournal(journal_path(run_key(patterns, sessions_back)), resume=resume)
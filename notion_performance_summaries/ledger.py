@@ -0,0 +1,96 @@
+"""Local SQLite ledger of PNGs already uploaded and attached in Notion."""
+
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .preferences import get_app_dir  # type: ignore
+
+
+def file_sha256(path) -> str:
+    """Return the SHA-256 hex digest of a file without reading it into memory."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return h.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            h.update(mm)
+    return h.hexdigest()
+
+
+class UploadLedger:
+    """Records which file content is attached to each (subject, session) page."""
+
+    def __init__(self, path: Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS uploads (
+                    subject TEXT NOT NULL,
+                    session TEXT NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    file_upload_id TEXT,
+                    page_id TEXT,
+                    uploaded_at REAL NOT NULL,
+                    PRIMARY KEY (subject, session)
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS uploads_sha256 ON uploads (sha256)"
+            )
+
+    def lookup(self, subject: str, session: str) -> dict | None:
+        """Return the ledger row for a session, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha256, file_upload_id, page_id, uploaded_at FROM uploads "
+                "WHERE subject = ? AND session = ?",
+                (subject, session),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("sha256", "file_upload_id", "page_id", "uploaded_at")
+        return dict(zip(keys, row))
+
+    def is_current(self, subject: str, session: str, sha256: str, page_id) -> bool:
+        """True if ``page_id`` already carries a file with this exact content."""
+        row = self.lookup(subject, session)
+        return (
+            row is not None
+            and page_id is not None
+            and row["sha256"] == sha256
+            and row["page_id"] == page_id
+        )
+
+    def record(self, subject, session, sha256, file_upload_id, page_id):
+        """Remember the content now attached to a session's page."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?)",
+                (subject, session, sha256, file_upload_id, page_id, time.time()),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_ledger: UploadLedger | None = None
+_ledger_lock = threading.Lock()
+
+
+def get_upload_ledger() -> UploadLedger:
+    """Return the process-wide ledger stored next to preferences.json."""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = UploadLedger(get_app_dir() / "uploads.sqlite3")
+        return _ledger
@@ -0,0 +1,234 @@
+"""Split runs across hosts that share ``paths.output_loc``.
+
+``--shard i/n`` keeps the subjects whose stable hash falls in shard ``i`` of
+``n``, so every host can be given the same preferences. On top of that each
+subject/date a run works on is claimed with an advisory lock file in
+``<output_loc>/.locks/`` (outside the subject folders, so their output indexes
+are not invalidated). A lock holds the owner's host, PID and start time, and
+its mtime is refreshed every ``locks.heartbeat_seconds`` while the run works on
+it. Locks whose mtime is older than ``locks.stale_minutes`` (a host that
+crashed), or held by a dead process on this host, are reclaimed.
+
+Render records, the upload ledger and run journals are per host, so a host
+taking a lock another host just released would render and upload that date
+again. Once every PNG of a date has a page, a run therefore leaves a done
+marker next to the lock with the session IDs it rendered; other hosts skip the
+date while their own session list for it is the same.
+"""
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from .preferences import get_preference  # type: ignore
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parse ``i/n`` (1-based) into ``(i, n)``."""
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"invalid shard {spec!r} (use i/n, e.g. 1/3)") from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"invalid shard {spec!r}: i must be between 1 and n")
+    return index, count
+
+
+def shard_of(subject: str, count: int) -> int:
+    """1-based shard of a subject; unlike hash(), stable across hosts and runs."""
+    digest = hashlib.sha1(subject.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def shard_subjects(subjects: Iterable[str], shard: Tuple[int, int]) -> List[str]:
+    index, count = shard
+    return [s for s in subjects if shard_of(s, count) == index]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class RunLocks:
+    """Lock files claimed by this process, kept fresh by a heartbeat thread."""
+
+    def __init__(self, lock_dir: str):
+        self.lock_dir = lock_dir
+        self.owner = {"host": socket.gethostname(), "pid": os.getpid()}
+        self.stale_after = float(get_preference("locks.stale_minutes", 30)) * 60
+        self.heartbeat = float(get_preference("locks.heartbeat_seconds", 60))
+        self._held: Dict[str, str] = {}  # "subject/date" -> lock path
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def path(self, subject: str, date: str) -> str:
+        return os.path.join(self.lock_dir, f"{subject}_{date}.lock")
+
+    def done_path(self, subject: str, date: str, sessions_back: int) -> str:
+        return os.path.join(self.lock_dir, f"{subject}_{date}_{sessions_back}.done")
+
+    def finished(
+        self, subject: str, date: str, sessions_back: int, sessions: List[str]
+    ) -> str | None:
+        """Which other host already rendered and published exactly these sessions.
+
+        Markers left by this host are ignored: its own render records, ledger
+        and journal already decide what to redo here.
+        """
+        try:
+            with open(
+                self.done_path(subject, date, sessions_back), "r", encoding="utf-8"
+            ) as f:
+                marker = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if marker.get("sessions") != list(sessions):
+            return None
+        if marker.get("host") == self.owner["host"]:
+            return None
+        return f"{marker.get('host', '?')} (pid {marker.get('pid', '?')})"
+
+    def mark_done(
+        self, subject: str, date: str, sessions_back: int, sessions: List[str]
+    ):
+        """Record that this host rendered and published ``sessions`` for the date."""
+        path = self.done_path(subject, date, sessions_back)
+        os.makedirs(self.lock_dir, exist_ok=True)
+        tmp = f"{path}.{self.owner['host']}.{self.owner['pid']}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({**self.owner, "finished": time.time(), "sessions": sessions}, f)
+        os.replace(tmp, path)
+
+    def _create(self, path: str) -> bool:
+        owner = {**self.owner, "started": time.time()}
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(owner, f)
+        return True
+
+    @staticmethod
+    def _read(path: str) -> Tuple[dict, int] | None:
+        """The lock's owner and mtime, or None if it vanished."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+                try:
+                    return json.load(f), mtime_ns
+                except json.JSONDecodeError:
+                    return {}, mtime_ns  # being written, or torn by a crash
+        except FileNotFoundError:
+            return None
+
+    def _is_stale(self, owner: dict, mtime_ns: int) -> bool:
+        if time.time() - mtime_ns / 1e9 > self.stale_after:
+            return True
+        if owner.get("host") == self.owner["host"] and "pid" in owner:
+            return not _pid_alive(owner["pid"])
+        return False
+
+    def _reclaim(self, path: str, seen: Tuple[dict, int]):
+        """Move a stale lock aside; put it back if another host refreshed it first."""
+        grave = f"{path}.{self.owner['host']}.{self.owner['pid']}.stale"
+        try:
+            os.rename(path, grave)
+        except FileNotFoundError:
+            return  # someone else reclaimed it, race them for a new one
+        if self._read(grave) != seen:
+            try:
+                os.link(grave, path)
+            except FileExistsError:
+                pass
+        os.remove(grave)
+
+    def acquire(self, subject: str, date: str) -> str | None:
+        """Claim subject/date; return None on success or who holds it."""
+        path = self.path(subject, date)
+        os.makedirs(self.lock_dir, exist_ok=True)
+        for _ in range(3):
+            if self._create(path):
+                with self._lock:
+                    self._held[f"{subject}/{date}"] = path
+                self._start_heartbeat()
+                return None
+            seen = self._read(path)
+            if seen is None:
+                continue
+            owner, mtime_ns = seen
+            if not self._is_stale(owner, mtime_ns):
+                return f"{owner.get('host', '?')} (pid {owner.get('pid', '?')})"
+            print(
+                f"🔓 Reclaiming stale lock on {subject} {date} from "
+                f"{owner.get('host', '?')} (pid {owner.get('pid', '?')})"
+            )
+            self._reclaim(path, seen)
+        return "another host"
+
+    def acquire_all(self, subject: str, dates: Iterable[str]) -> List[str]:
+        """Claim every date it can for a subject and return the claimed dates."""
+        claimed = []
+        for date in dates:
+            holder = self.acquire(subject, date)
+            if holder is None:
+                claimed.append(date)
+            else:
+                print(f"🔒 {subject} {date} is being processed by {holder}, skipping")
+        return claimed
+
+    def release(self, subject: str, dates: Iterable[str]):
+        for date in dates:
+            with self._lock:
+                path = self._held.pop(f"{subject}/{date}", None)
+            if path is None:
+                continue
+            seen = self._read(path)
+            if seen is None or {k: seen[0].get(k) for k in self.owner} != self.owner:
+                continue  # reclaimed by another host meanwhile
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._beat, name="lock-heartbeat", daemon=True
+            )
+            self._thread.start()
+
+    def _beat(self):
+        while not self._stop.wait(self.heartbeat):
+            with self._lock:
+                paths = list(self._held.items())
+            for key, path in paths:
+                try:
+                    os.utime(path)
+                except FileNotFoundError:
+                    print(f"⚠️ Lock on {key} disappeared; another host may take it over")
+                    with self._lock:
+                        self._held.pop(key, None)
+
+    def close(self):
+        """Stop the heartbeat and release every lock still held."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            held = [key.split("/", 1) for key in self._held]
+        for subject, date in held:
+            self.release(subject, [date])
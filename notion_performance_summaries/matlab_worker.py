@@ -0,0 +1,186 @@
+"""Long-lived MATLAB processes that run batchCopyPlot jobs fed over stdin.
+
+Starting ``matlab -batch`` costs tens of seconds (startup + license checkout) per
+subject. A worker starts MATLAB once and writes one command per line to its
+stdin; each command is wrapped in try/catch and followed by a sentinel line so
+the caller knows when the job finished and whether it failed.
+"""
+
+import itertools
+import queue
+import re
+import subprocess
+import threading
+import time
+
+# Sentinels are assembled inside MATLAB (['__JOB_' 'DONE__']) so an echoed
+# command line can never be mistaken for a completion marker.
+_SENTINEL_RE = re.compile(r"__JOB_(DONE|FAILED)__ (\d+)(?: (.*))?")
+_READY_ID = 0
+
+
+class MatlabWorkerDied(RuntimeError):
+    """Raised when the MATLAB process exits or stops responding."""
+
+
+class MatlabJobError(RuntimeError):
+    """Raised when a job raised an error inside MATLAB."""
+
+
+class MatlabWorker:
+    """A single MATLAB process reading commands from stdin."""
+
+    def __init__(self, matlab="matlab", startup_timeout=600, job_timeout=None):
+        self.matlab = matlab
+        self.startup_timeout = startup_timeout
+        self.job_timeout = job_timeout
+        self._proc: subprocess.Popen | None = None
+        self._lines: queue.Queue = queue.Queue()
+        self._ids = itertools.count(1)
+
+    def start(self):
+        """Launch MATLAB and wait until it answers a no-op job."""
+        print("🧮 Starting persistent MATLAB worker...")
+        self._proc = subprocess.Popen(
+            [self.matlab, "-nodesktop", "-nosplash", "-nodisplay"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+        )
+        threading.Thread(target=self._pump, daemon=True).start()
+        self._submit(_READY_ID, "1;")
+        self._wait(_READY_ID, self.startup_timeout)
+        print("✔️ MATLAB worker ready")
+
+    def _pump(self):
+        """Forward MATLAB output lines to the queue; None marks EOF."""
+        assert self._proc is not None and self._proc.stdout is not None
+        for line in self._proc.stdout:
+            self._lines.put(line.rstrip("\n"))
+        self._lines.put(None)
+
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _submit(self, job_id: int, command: str):
+        assert self._proc is not None and self._proc.stdin is not None
+        wrapped = (
+            f"try, {command}; disp(['__JOB_' 'DONE__ {job_id}']); "
+            f"catch err, disp(['__JOB_' 'FAILED__ {job_id} ' "
+            f"strrep(err.message, newline, ' ')]); end\n"
+        )
+        try:
+            self._proc.stdin.write(wrapped)
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise MatlabWorkerDied(f"MATLAB worker stdin closed: {e}") from e
+
+    def _wait(self, job_id: int, timeout):
+        """Read output until the sentinel for job_id; return the job's output.
+
+        ``timeout`` bounds the whole job, however much it prints meanwhile.
+        """
+        output = []
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            try:
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                line = self._lines.get(timeout=remaining)
+            except queue.Empty:
+                self.close(force=True)
+                raise MatlabWorkerDied(f"MATLAB worker timed out after {timeout}s")
+            if line is None:
+                raise MatlabWorkerDied("MATLAB worker exited unexpectedly")
+            match = _SENTINEL_RE.search(line)
+            if match and int(match.group(2)) == job_id:
+                if match.group(1) == "FAILED":
+                    raise MatlabJobError(match.group(3) or "unknown MATLAB error")
+                return "\n".join(output)
+            output.append(line)
+
+    def run(self, command: str) -> str:
+        """Run one MATLAB statement and return its printed output."""
+        if not self.alive():
+            raise MatlabWorkerDied("MATLAB worker is not running")
+        job_id = next(self._ids)
+        self._submit(job_id, command)
+        return self._wait(job_id, self.job_timeout)
+
+    def close(self, force=False):
+        """Ask MATLAB to exit, killing it if it does not go quietly."""
+        if self._proc is None:
+            return
+        if not force and self.alive():
+            try:
+                self._proc.stdin.write("exit\n")  # type: ignore[union-attr]
+                self._proc.stdin.flush()  # type: ignore[union-attr]
+                self._proc.wait(timeout=60)
+            except (BrokenPipeError, OSError, subprocess.TimeoutExpired):
+                pass
+        if self.alive():
+            self._proc.kill()
+            self._proc.wait()
+        self._proc = None
+
+
+class MatlabWorkerPool:
+    """Up to ``size`` lazily started workers shared by concurrent subjects.
+
+    A worker that dies mid-run is discarded and replaced on the next job. If a
+    replacement cannot even start, the pool disables itself and callers fall
+    back to one-shot ``matlab -batch``.
+    """
+
+    def __init__(self, size=1, **worker_kwargs):
+        self.size = max(1, size)
+        self.worker_kwargs = worker_kwargs
+        self.disabled = False
+        self._idle: queue.Queue = queue.Queue()
+        self._started = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> MatlabWorker:
+        with self._lock:
+            if self._idle.empty() and self._started < self.size:
+                self._started += 1
+                worker = MatlabWorker(**self.worker_kwargs)
+                try:
+                    worker.start()
+                except Exception:
+                    self._started -= 1
+                    self.disabled = True
+                    worker.close(force=True)
+                    raise
+                return worker
+        return self._idle.get()
+
+    def run(self, command: str) -> str:
+        """Run a command on a free worker, raising MatlabWorkerDied on failure."""
+        if self.disabled:
+            raise MatlabWorkerDied("MATLAB worker pool is disabled")
+        try:
+            worker = self._acquire()
+        except Exception as e:
+            raise MatlabWorkerDied(f"Could not start MATLAB worker: {e}") from e
+        try:
+            output = worker.run(command)
+        except MatlabWorkerDied:
+            worker.close(force=True)
+            with self._lock:
+                self._started -= 1
+            raise
+        except BaseException:
+            self._idle.put(worker)
+            raise
+        self._idle.put(worker)
+        return output
+
+    def close(self):
+        """Shut down every idle worker."""
+        while not self._idle.empty():
+            self._idle.get().close()
+        self._started = 0
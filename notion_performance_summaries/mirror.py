@@ -0,0 +1,177 @@
+"""Local SQLite mirror of the Notion data sources the pipeline looks things up in.
+
+The lab animals data source and each subject's performance summaries data
+source are mirrored as ``(page_id, title, last_edited_time)`` rows in
+``~/.notion_performance_summaries/notion_mirror.sqlite3``. notion_api keeps the
+mirror in sync (incrementally, by last_edited_time) and writes pages it creates
+or archives straight through, so lookups and ``notion_summaries status`` read
+local rows instead of paging through Notion.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from .preferences import get_app_dir  # type: ignore
+
+# (page_id, title, last_edited_time, removed)
+PageRow = Tuple[str, str, str | None, bool]
+
+
+class NotionMirror:
+    """Mirrored pages and sync state per data source."""
+
+    def __init__(self, path: Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS data_sources (
+                    data_source_id TEXT PRIMARY KEY,
+                    label TEXT,
+                    cursor TEXT,
+                    synced_at REAL NOT NULL,
+                    full_synced_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    data_source_id TEXT NOT NULL,
+                    page_id TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    last_edited_time TEXT,
+                    PRIMARY KEY (data_source_id, page_id)
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS pages_title ON pages (data_source_id, title)"
+            )
+
+    def state(self, data_source_id: str) -> dict | None:
+        """Return the sync state of a data source, or None if it was never synced."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT label, cursor, synced_at, full_synced_at FROM data_sources "
+                "WHERE data_source_id = ?",
+                (data_source_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("label", "cursor", "synced_at", "full_synced_at"), row))
+
+    def apply(
+        self,
+        data_source_id: str,
+        pages: Iterable[PageRow],
+        cursor: str | None,
+        label: str | None = None,
+        full: bool = False,
+    ):
+        """Store the result of a sync; ``full=True`` replaces all mirrored pages."""
+        now = time.time()
+        with self._lock, self._conn:
+            previous = self._conn.execute(
+                "SELECT label, full_synced_at FROM data_sources WHERE data_source_id = ?",
+                (data_source_id,),
+            ).fetchone()
+            if full:
+                self._conn.execute(
+                    "DELETE FROM pages WHERE data_source_id = ?", (data_source_id,)
+                )
+            for page_id, title, edited, removed in pages:
+                if removed:
+                    self._conn.execute(
+                        "DELETE FROM pages WHERE data_source_id = ? AND page_id = ?",
+                        (data_source_id, page_id),
+                    )
+                else:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+                        (data_source_id, page_id, title, edited),
+                    )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO data_sources VALUES (?, ?, ?, ?, ?)",
+                (
+                    data_source_id,
+                    label or (previous[0] if previous else None),
+                    cursor,
+                    now,
+                    now if full or previous is None else previous[1],
+                ),
+            )
+
+    def titles(self, data_source_id: str) -> Dict[str, str]:
+        """Return ``{title: page_id}``, preferring the most recently edited page."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, page_id FROM pages WHERE data_source_id = ? "
+                "ORDER BY last_edited_time",
+                (data_source_id,),
+            ).fetchall()
+        return dict(rows)
+
+    def find(self, data_source_id: str, title: str) -> str | None:
+        """Return the page ID with this title, if mirrored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_id FROM pages WHERE data_source_id = ? AND title = ? "
+                "ORDER BY last_edited_time DESC LIMIT 1",
+                (data_source_id, title),
+            ).fetchone()
+        return row[0] if row else None
+
+    def upsert(
+        self, data_source_id: str, page_id: str, title: str, edited: str | None = None
+    ):
+        """Write through a page created or edited by this process."""
+        edited = edited or time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+                (data_source_id, page_id, title, edited),
+            )
+
+    def remove(self, page_id: str):
+        """Forget a page archived by this process or reported missing by Notion."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages WHERE page_id = ?", (page_id,))
+
+    def summaries(self) -> List[dict]:
+        """Per labelled data source: page count, newest title and last sync time."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT d.label, d.data_source_id, d.synced_at,
+                       COUNT(p.page_id), MAX(p.title)
+                FROM data_sources d
+                LEFT JOIN pages p ON p.data_source_id = d.data_source_id
+                WHERE d.label IS NOT NULL
+                GROUP BY d.data_source_id
+                """
+            ).fetchall()
+        keys = ("label", "data_source_id", "synced_at", "pages", "latest")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_mirror: NotionMirror | None = None
+_mirror_lock = threading.Lock()
+
+
+def get_mirror() -> NotionMirror:
+    """Return the process-wide mirror stored next to preferences.json."""
+    global _mirror
+    with _mirror_lock:
+        if _mirror is None:
+            _mirror = NotionMirror(get_app_dir() / "notion_mirror.sqlite3")
+        return _mirror
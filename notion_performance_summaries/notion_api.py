@@ -6,30 +6,78 @@ This module uses ONLY the 2025-09-03 Notion API style:
     * File attachments use the file_upload object (created elsewhere) inside a Files & media property
 """
 
+import threading
+import time
+
 import requests
-from .config import LAB_DB_ID, base_headers, json_headers, _DATA_SOURCE_CACHE  # type: ignore
+from typing import Dict
+from .config import get_settings  # type: ignore
+from .mirror import get_mirror  # type: ignore
+from .notion_http import get_client  # type: ignore
+from .preferences import get_preference  # type: ignore
+
+
+class NotionNotFoundError(RuntimeError):
+    """Raised when Notion returns 404 for an object ID (usually a stale cache entry)."""
+
+
+# perf_db_id -> {Session ID -> page_id}, built once per run by load_summary_index
+_SUMMARY_INDEX: Dict[str, Dict[str, str]] = {}
+
+LAB_ANIMALS = "lab animals"  # mirror label of the lab animals data source
+_SYNC_LOCKS: Dict[str, threading.Lock] = {}
+_SYNC_LOCKS_LOCK = threading.Lock()
+
+
+def invalidate_data_source(database_id: str):
+    """Drop a cached database -> data source mapping."""
+    get_settings().resolver_cache.delete("data_sources", database_id)
+
+
+def invalidate_subject(subject: str):
+    """Drop all cached IDs for a subject so the next lookup hits Notion again."""
+    entry = get_settings().resolver_cache.get("subjects", subject)
+    if entry:
+        invalidate_data_source(entry["perf_db_id"])
+    get_settings().resolver_cache.delete("subjects", subject)
+
+
+def _invalidate_by_data_source_id(data_source_id: str):
+    """Drop cached entries that resolve to a data source Notion no longer knows."""
+    for database_id, ds_id in get_settings().resolver_cache.items("data_sources"):
+        if ds_id != data_source_id:
+            continue
+        invalidate_data_source(database_id)
+        for subject, entry in get_settings().resolver_cache.items("subjects"):
+            if entry.get("perf_db_id") == database_id:
+                get_settings().resolver_cache.delete("subjects", subject)
 
 
 def get_data_source_id(database_id: str) -> str:
     """Get data source ID for a database, using cache if available."""
-    if database_id in _DATA_SOURCE_CACHE:
-        return _DATA_SOURCE_CACHE[database_id]
-    url = f"https://api.notion.com/v1/databases/{database_id}"
-    res = requests.get(url, headers=base_headers)
+    cached = get_settings().resolver_cache.get("data_sources", database_id)
+    if cached:
+        return cached
+    res = get_client().get(f"/databases/{database_id}")
+    if res.status_code == 404:
+        raise NotionNotFoundError(f"Database {database_id} not found")
     res.raise_for_status()
     data = res.json()
     data_sources = data.get("data_sources") or []
     if not data_sources:
         raise RuntimeError(f"No data_sources found for database {database_id}")
     ds_id = data_sources[0]["id"]
-    _DATA_SOURCE_CACHE[database_id] = ds_id
+    get_settings().resolver_cache.set("data_sources", database_id, ds_id)
     return ds_id
 
 
-def _query_data_source(data_source_id: str, filter_payload: dict):
+def _query_data_source(data_source_id: str, filter_payload: dict, params=None):
     """Low-level wrapper to query a data source (new API). Returns JSON dict."""
-    url = f"https://api.notion.com/v1/data_sources/{data_source_id}/query"
-    res = requests.post(url, headers=json_headers, json=filter_payload)
+    url = f"/data_sources/{data_source_id}/query"
+    res = get_client().post(url, json=filter_payload, params=params)
+    if res.status_code == 404:
+        _invalidate_by_data_source_id(data_source_id)
+        raise NotionNotFoundError(f"Data source {data_source_id} not found")
     try:
         res.raise_for_status()
     except requests.exceptions.HTTPError as e:
@@ -40,34 +88,192 @@ def _query_data_source(data_source_id: str, filter_payload: dict):
     return res.json()
 
 
+def _title_text(prop: dict) -> str:
+    """Return the plain text of a title property value."""
+    return "".join(
+        t.get("plain_text") or t.get("text", {}).get("content", "")
+        for t in prop.get("title", [])
+    )
+
+
+def sync_data_source(data_source_id, title_property, label=None, max_age=0.0):
+    """Bring the local mirror of a data source up to date and return the mirror.
+
+    Only pages edited since the newest mirrored ``last_edited_time`` are
+    fetched. The first sync, and one every ``mirror.full_sync_hours`` (default
+    24), reads the whole data source so pages archived in Notion drop out.
+    Nothing is fetched if the last sync is less than ``max_age`` seconds old.
+    """
+    mirror = get_mirror()
+    with _SYNC_LOCKS_LOCK:
+        lock = _SYNC_LOCKS.setdefault(data_source_id, threading.Lock())
+    with lock:
+        state = mirror.state(data_source_id)
+        now = time.time()
+        if state and state["cursor"] and now - state["synced_at"] < max_age:
+            return mirror
+        full_every = float(get_preference("mirror.full_sync_hours", 24)) * 3600
+        full = (
+            not (state and state["cursor"])
+            or now - state["full_synced_at"] > full_every
+        )
+        cursor = None if full else state["cursor"]  # type: ignore[index]
+        payload: dict = {
+            "page_size": 100,
+            "sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}],
+        }
+        if cursor:
+            # last_edited_time has minute precision, so the boundary minute is re-read
+            payload["filter"] = {
+                "timestamp": "last_edited_time",
+                "last_edited_time": {"on_or_after": cursor},
+            }
+        pages = []
+        while True:
+            data = _query_data_source(
+                data_source_id, payload, params={"filter_properties": ["title"]}
+            )
+            for page in data.get("results", []):
+                edited = page.get("last_edited_time")
+                if edited and (cursor is None or edited > cursor):
+                    cursor = edited
+                title = _title_text(page.get("properties", {}).get(title_property, {}))
+                removed = bool(
+                    page.get("archived") or page.get("in_trash") or not title
+                )
+                pages.append((page["id"], title, edited, removed))
+            if not data.get("has_more") or not data.get("next_cursor"):
+                break
+            payload["start_cursor"] = data["next_cursor"]
+        mirror.apply(data_source_id, pages, cursor, label=label, full=full)
+        return mirror
+
+
 def find_subject_page(subject):
-    """Find the Notion page for a specific lab subject via data source query only."""
-    ds_id = get_data_source_id(LAB_DB_ID)
+    """Find the Notion page for a specific lab subject.
+
+    Answered from the mirror of the lab animals data source (synced at most
+    once a minute); subjects missing there are looked up with a filtered query.
+    """
+    ds_id = get_data_source_id(get_settings().lab_db_id)
+    mirror = sync_data_source(ds_id, "ID", label=LAB_ANIMALS, max_age=60)
+    page_id = mirror.find(ds_id, subject)
+    if page_id:
+        return page_id
     payload = {"filter": {"property": "ID", "title": {"equals": subject}}}
     data = _query_data_source(ds_id, payload)
     return data["results"][0]["id"] if data.get("results") else None
 
 
 def find_child_db(page_id):
-    """Find the performance summaries child database in a subject's page."""
-    url = f"https://api.notion.com/v1/blocks/{page_id}/children"
-    res = requests.get(url, headers=base_headers)
-    res.raise_for_status()
-    for b in res.json()["results"]:
-        if b["type"] == "child_database":
-            title = b["child_database"]["title"]
-            print(f"Found child DB: '{title}'")
-            if "performance summaries" in title.lower():
-                return b["id"]
-    return None
+    """Find the performance summaries child database in a subject's page.
 
+    Follows block-children pagination and stops at the first matching database.
+    """
+    url = f"/blocks/{page_id}/children"
+    params = {"page_size": 100}
+    while True:
+        res = get_client().get(url, params=params)
+        if res.status_code == 404:
+            raise NotionNotFoundError(f"Page {page_id} not found")
+        res.raise_for_status()
+        data = res.json()
+        for b in data["results"]:
+            if b["type"] == "child_database":
+                title = b["child_database"]["title"]
+                print(f"Found child DB: '{title}'")
+                if "performance summaries" in title.lower():
+                    return b["id"]
+        if not data.get("has_more") or not data.get("next_cursor"):
+            return None
+        params["start_cursor"] = data["next_cursor"]
 
-def find_existing_summary(perf_db_id, session_name):
-    """Check if a performance summary entry already exists (data source query)."""
+
+def resolve_perf_db(subject, refresh=False):
+    """Return the performance summaries database ID for a subject.
+
+    Uses the on-disk resolver cache so warm runs make no lookup calls. Pass
+    ``refresh=True`` to bypass the cache (e.g. after a 404 on a cached ID).
+    """
+    if not refresh:
+        entry = get_settings().resolver_cache.get("subjects", subject)
+        if entry:
+            return entry["perf_db_id"]
+    else:
+        invalidate_subject(subject)
+
+    page_id = find_subject_page(subject)
+    if not page_id:
+        print(f"⚠️ No Notion page for {subject}")
+        return None
+    perf_db_id = find_child_db(page_id)
+    if not perf_db_id:
+        print(f"⚠️ No child DB for {subject}")
+        return None
+    # Resolve the data source now so the first insert doesn't pay for it
+    get_data_source_id(perf_db_id)
+    get_settings().resolver_cache.set(
+        "subjects", subject, {"page_id": page_id, "perf_db_id": perf_db_id}
+    )
+    return perf_db_id
+
+
+def load_summary_index(perf_db_id, subject=None) -> Dict[str, str]:
+    """Index every entry of a performance summaries database by Session ID.
+
+    The database's mirror is synced first, which usually takes one request for
+    the pages edited since the last run; find_existing_summary then answers from
+    memory. ``subject`` labels the database in ``notion_summaries status``.
+    """
     perf_ds_id = get_data_source_id(perf_db_id)
-    payload = {"filter": {"property": "Session ID", "title": {"equals": session_name}}}
-    data = _query_data_source(perf_ds_id, payload)
-    return data["results"][0]["id"] if data.get("results") else None
+    mirror = sync_data_source(perf_ds_id, "Session ID", label=subject)
+    index = mirror.titles(perf_ds_id)
+    _SUMMARY_INDEX[perf_db_id] = index
+    print(f"🗂️ Indexed {len(index)} existing summaries")
+    return index
+
+
+def find_existing_summary(perf_db_id, session_name):
+    """Check if a performance summary entry already exists.
+
+    Answered from the in-memory index, which is loaded (and the mirror synced)
+    on first use for a database.
+    """
+    if perf_db_id not in _SUMMARY_INDEX:
+        load_summary_index(perf_db_id)
+    return _SUMMARY_INDEX[perf_db_id].get(session_name)
+
+
+def _forget_page(perf_db_id, session_name, page_id):
+    """Drop a page that is archived or gone from the index and the mirror."""
+    index = _SUMMARY_INDEX.get(perf_db_id, {})
+    if index.get(session_name) == page_id:
+        del index[session_name]
+    get_mirror().remove(page_id)
+
+
+def _archive_page(perf_db_id, session_name, page_id):
+    """Archive an existing summary page and drop it from the index."""
+    res = get_client().patch(f"/pages/{page_id}", json={"archived": True})
+    try:
+        res.raise_for_status()
+        _forget_page(perf_db_id, session_name, page_id)
+        print(f"🗑️ Archived existing entry for {session_name}")
+    except requests.exceptions.HTTPError as e:
+        print(f"⚠️ Warning: Could not archive existing entry: {e}")
+
+
+def update_summary_files(page_id, files_items) -> int:
+    """Replace the Files & media of an existing page in place.
+
+    Returns the HTTP status: 200 on success, 400 when Notion rejects the
+    property (the page's schema differs) and 404 when the page is gone.
+    """
+    payload = {"properties": {"Files & media": {"files": files_items}}}
+    res = get_client().patch(f"/pages/{page_id}", json=payload)
+    if res.status_code not in (400, 404):
+        res.raise_for_status()
+    return res.status_code
 
 
 def insert_summary(
@@ -78,40 +284,47 @@ def insert_summary(
     session_name=None,
     overwrite=False,
 ):
-    """Insert a performance summary entry into the Notion database."""
+    """Insert a performance summary entry into the Notion database.
+
+    With ``overwrite`` an existing entry is updated in place (one PATCH of its
+    Files & media property). When Notion rejects that update (e.g. the page's
+    schema differs) a new page is created and the old one is only archived once
+    the new one exists, so a failing create leaves the existing entry alone.
+    """
     if session_name is None:
         session_name = subject
 
+    # Build Files & media items
+    if notion_file_id:
+        files_items = [{"type": "file_upload", "file_upload": {"id": notion_file_id}}]
+    elif external_url:
+        files_items = [{"type": "external", "external": {"url": external_url}}]
+    else:
+        raise ValueError("insert_summary requires notion_file_id or external_url")
+
     # Check if entry already exists
     existing_page_id = find_existing_summary(perf_db_id, session_name)
+    replaced_page_id = None
     if existing_page_id:
         if not overwrite:
             print(
                 f"⚠️ Entry for {session_name} already exists. Use --overwrite to replace it."
             )
             return existing_page_id
+        print(f"🔄 Overwriting existing entry for {session_name}")
+        status = update_summary_files(existing_page_id, files_items)
+        if status < 400:
+            print(f"📎 Replaced file in 'Files & media' for {session_name}")
+            return existing_page_id
+        if status == 404:
+            print(f"⚠️ Existing entry for {session_name} is gone, creating a new one")
+            _forget_page(perf_db_id, session_name, existing_page_id)
         else:
-            print(f"🔄 Overwriting existing entry for {session_name}")
-            # Delete the existing entry
-            delete_url = f"https://api.notion.com/v1/pages/{existing_page_id}"
-            delete_payload = {"archived": True}
-            res = requests.patch(delete_url, headers=json_headers, json=delete_payload)
-            try:
-                res.raise_for_status()
-                print(f"🗑️ Archived existing entry for {session_name}")
-            except requests.exceptions.HTTPError as e:
-                print(f"⚠️ Warning: Could not archive existing entry: {e}")
-
-    create_url = "https://api.notion.com/v1/pages"
-    perf_ds_id = get_data_source_id(perf_db_id)
+            print(f"⚠️ In-place update rejected for {session_name}, replacing the page")
+            replaced_page_id = existing_page_id
 
-    # Build Files & media items
-    if notion_file_id:
-        files_items = [{"type": "file_upload", "file_upload": {"id": notion_file_id}}]
-    elif external_url:
-        files_items = [{"type": "external", "external": {"url": external_url}}]
-    else:
-        raise ValueError("insert_summary requires notion_file_id or external_url")
+    create_url = "/pages"
+    perf_ds_id = get_data_source_id(perf_db_id)
 
     create_payload = {
         "parent": {"type": "data_source_id", "data_source_id": perf_ds_id},
@@ -122,16 +335,32 @@ def insert_summary(
     }
 
     try:
-        res = requests.post(create_url, headers=json_headers, json=create_payload)
+        res = get_client().post(create_url, json=create_payload)
+        if res.status_code == 404:
+            _invalidate_by_data_source_id(perf_ds_id)
+            raise NotionNotFoundError(f"Data source {perf_ds_id} not found")
         res.raise_for_status()
-        page_id = res.json().get("id")
+        page = res.json()
+        page_id = page.get("id")
+        if page_id:
+            if perf_db_id in _SUMMARY_INDEX:
+                _SUMMARY_INDEX[perf_db_id][session_name] = page_id
+            get_mirror().upsert(
+                perf_ds_id, page_id, session_name, page.get("last_edited_time")
+            )
         print(f"📄 Created Notion page for {session_name}")
         print(f"📎 Attached file to 'Files & media' for {session_name}")
+        if replaced_page_id and page_id:
+            _archive_page(perf_db_id, session_name, replaced_page_id)
         return page_id
+    except NotionNotFoundError:
+        raise
     except requests.exceptions.HTTPError as e:
         print(f"⚠️ Error creating Notion entry: {e}")
         if hasattr(e.response, "text"):
             print(f"Response details: {e.response.text}")
+        if replaced_page_id:
+            print(f"↩️ Kept the existing entry for {session_name}")
         return None
     except Exception as e:
         print(f"⚠️ Unexpected error: {e}")
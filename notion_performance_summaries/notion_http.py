@@ -0,0 +1,245 @@
+"""Shared HTTP client for the Notion API.
+
+All Notion calls go through one NotionClient so that they share:
+    * a pooled requests.Session (keep-alive, one TLS handshake per connection)
+    * a thread-safe token bucket tuned to Notion's ~3 requests/second limit
+    * exponential backoff on 429/5xx that honors the Retry-After header
+      (non-idempotent requests are only retried when Notion cannot have acted)
+    * per-endpoint counters for calls, retries and latency
+"""
+
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .tracing import span  # type: ignore
+
+NOTION_API_URL = "https://api.notion.com/v1"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# A POST that timed out or got a 5xx may have been applied (e.g. a page created),
+# so only these are retried for non-idempotent requests
+UNSENT_RETRY_STATUSES = {429}
+_ID_SEGMENT = re.compile(r"^[0-9a-fA-F-]{32,36}$")
+
+
+class TokenBucket:
+    """Blocking token bucket: ``rate`` tokens/second, at most ``capacity`` banked."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def endpoint_key(method: str, url: str) -> str:
+    """Collapse object IDs so stats group by endpoint, e.g. 'GET /blocks/{id}/children'."""
+    path = url.split("://", 1)[-1].split("?", 1)[0]
+    path = path.split("/v1", 1)[-1] if "/v1" in path else path
+    segments = ["{id}" if _ID_SEGMENT.match(s) else s for s in path.split("/")]
+    return f"{method.upper()} {'/'.join(segments)}"
+
+
+def _retry_delay(response, attempt: int, backoff: float, max_backoff: float):
+    """Seconds to wait before the next attempt, preferring Retry-After."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), max_backoff)
+            except ValueError:
+                pass
+    delay = min(backoff * (2**attempt), max_backoff)
+    return delay * (0.5 + random.random() / 2)
+
+
+def is_idempotent(method: str, url: str) -> bool:
+    """POSTs create things except for database and data source queries."""
+    return method.upper() != "POST" or url.split("?", 1)[0].endswith("/query")
+
+
+def _rewind(files):
+    """Seek file objects back to the start so a multipart body can be resent."""
+    for value in (files or {}).values():
+        fp = value[1] if isinstance(value, tuple) else value
+        if hasattr(fp, "seek"):
+            fp.seek(0)
+
+
+class NotionClient:
+    """Pooled, rate-limited, retrying Notion API client (thread-safe)."""
+
+    def __init__(
+        self,
+        headers: dict,
+        rate: float = 3.0,
+        burst: float | None = None,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        pool_size: int = 10,
+        timeout=(10, 300),
+        base_url: str = NOTION_API_URL,
+        session: requests.Session | None = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(headers)
+        self._stats = defaultdict(
+            lambda: {"calls": 0, "retries": 0, "errors": 0, "seconds": 0.0}
+        )
+        self._stats_lock = threading.Lock()
+
+    def url(self, path: str) -> str:
+        """Turn '/pages' into a full API URL; full URLs pass through unchanged."""
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _record(self, key: str, seconds: float, retried: bool, failed: bool):
+        with self._stats_lock:
+            stats = self._stats[key]
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["retries"] += int(retried)
+            stats["errors"] += int(failed)
+
+    def request(
+        self, method: str, path: str, idempotent: bool | None = None, **kwargs
+    ) -> requests.Response:
+        """Send a request, retrying 429/5xx and connection errors with backoff.
+
+        Requests that are not ``idempotent`` (by default: POSTs other than
+        queries, see is_idempotent) are only retried on 429 and on errors
+        connecting, since a timed out or 5xx POST may already have been applied.
+        Returns the final response; callers still call ``raise_for_status()``.
+        """
+        url = self.url(path)
+        key = endpoint_key(method, url)
+        if idempotent is None:
+            idempotent = is_idempotent(method, url)
+        retry_statuses = RETRY_STATUSES if idempotent else UNSENT_RETRY_STATUSES
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            self.bucket.acquire()
+            _rewind(kwargs.get("files"))
+            start = time.monotonic()
+            try:
+                with span("http.notion", endpoint=key, attempt=attempt) as tags:
+                    response = self.session.request(method, url, **kwargs)
+                    tags["status"] = response.status_code
+                    tags["bytes"] = int(response.headers.get("Content-Length") or 0)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                unsent = isinstance(e, requests.ConnectTimeout) or not isinstance(
+                    e, requests.Timeout
+                )
+                retry = not last_attempt and (idempotent or unsent)
+                self._record(key, time.monotonic() - start, retry, True)
+                if not retry:
+                    raise
+                delay = _retry_delay(None, attempt, self.backoff, self.max_backoff)
+                print(f"🔁 {key} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            elapsed = time.monotonic() - start
+            if response.status_code in retry_statuses and not last_attempt:
+                self._record(key, elapsed, True, True)
+                delay = _retry_delay(response, attempt, self.backoff, self.max_backoff)
+                print(
+                    f"🔁 {key} returned {response.status_code}; retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
+                continue
+            self._record(key, elapsed, False, response.status_code >= 400)
+            return response
+        raise AssertionError("unreachable")
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def patch(self, path: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", path, **kwargs)
+
+    def stats(self) -> dict:
+        """Return a copy of the per-endpoint counters."""
+        with self._stats_lock:
+            return {key: dict(value) for key, value in self._stats.items()}
+
+    def print_stats(self):
+        """Print per-endpoint calls, retries, errors and latency."""
+        stats = self.stats()
+        if not stats:
+            return
+        width = max(len(key) for key in stats)
+        print("\n🌐 Notion API usage")
+        print(
+            f"{'Endpoint':<{width}}  {'Calls':>5}  {'Retries':>7}  "
+            f"{'Errors':>6}  {'Avg ms':>7}  {'Total s':>7}"
+        )
+        for key in sorted(stats):
+            s = stats[key]
+            avg_ms = 1000 * s["seconds"] / s["calls"] if s["calls"] else 0.0
+            print(
+                f"{key:<{width}}  {s['calls']:>5}  {s['retries']:>7}  "
+                f"{s['errors']:>6}  {avg_ms:>7.0f}  {s['seconds']:>7.1f}"
+            )
+
+
+_client: NotionClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> NotionClient:
+    """Return the process-wide NotionClient, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from .config import get_settings  # type: ignore
+            from .preferences import get_preference  # type: ignore
+
+            _client = NotionClient(
+                get_settings().base_headers,
+                rate=float(get_preference("notion.requests_per_second", 3.0)),
+                max_retries=int(get_preference("notion.max_retries", 5)),
+                base_url=get_preference("notion.base_url", NOTION_API_URL),
+            )
+        return _client
+
+
+def print_client_stats():
+    """Print API usage for this run if any Notion call was made."""
+    if _client is not None:
+        _client.print_stats()
@@ -1,104 +1,660 @@
 import os
 import re
+import time
+import sys
 import argparse
+import traceback
+from contextlib import nullcontext
+from datetime import datetime, timedelta
 
 # Import from organized modules
-from .config import OUTPUT_LOC, SUBJECTS  # type: ignore
-from .data_processing import ensure_sessions, run_matlab  # type: ignore
-from .notion_api import find_subject_page, find_child_db, insert_summary  # type: ignore
-from .file_operations import upload_to_drive, backup_subject  # type: ignore
+from .concurrency import (  # type: ignore
+    configure_stages,
+    prefixed_output,
+    run_pipeline,
+    stage,
+    subject_context,
+)
+from .config import get_settings  # type: ignore
+from .catalog import select_sessions  # type: ignore
+from .data_processing import (  # type: ignore
+    DEFAULT_TIMEOUTS,
+    as_patterns,
+    ensure_sessions,
+    kill_running_commands,
+    run_matlab,
+)
+from .freshness import (  # type: ignore
+    input_fingerprint,
+    load_records,
+    output_fingerprint,
+    record_render,
+    stale_reason,
+)
+from .locks import parse_shard  # type: ignore
+from .matlab_worker import MatlabWorkerPool  # type: ignore
+from .output_index import DATE_RE, file_date, get_output_index  # type: ignore
+from .planner import build_plan, print_plan, stage_limits  # type: ignore
 from .preferences import get_preference  # type: ignore
+from .tracing import finish_trace, print_profile, span, start_trace  # type: ignore
+from .watch import watch  # type: ignore
+
+
+# notion_api, file_operations and ledger pull in requests/sqlite3, so they are
+# imported where first needed to keep `notion_summaries --help` fast.
 
 
 # === MAIN PIPELINE ===
-def main(pattern, sessions_back, notion_only=False, overwrite=False, dry_run=False):
-    input_loc = get_preference("paths.input_loc")
+def prepare_perf_db(subject, refresh=False):
+    """Resolve a subject's performance DB and load its Session ID index.
+
+    A 404 on cached IDs triggers one fresh resolution. Returns None when the
+    subject has no page or no performance summaries database.
+    """
+    from .notion_api import (  # type: ignore
+        NotionNotFoundError,
+        load_summary_index,
+        resolve_perf_db,
+    )
+
+    perf_db_id = resolve_perf_db(subject, refresh=refresh)
+    if not perf_db_id:
+        return None
+    try:
+        load_summary_index(perf_db_id, subject)
+    except NotionNotFoundError as e:
+        if refresh:
+            raise
+        print(f"🔁 {e}; refreshing cached Notion IDs for {subject}")
+        return prepare_perf_db(subject, refresh=True)
+    return perf_db_id
+
+
+def select_pngs(subject_output, pattern):
+    """Return ``[(fname, session_name)]`` for PNGs matching the EXACT pattern date(s).
+
+    PNGs without a date in their name are always included.
+    """
+    selected = []
+    for fname in sorted(get_output_index(subject_output).files(as_patterns(pattern))):
+        file_date = DATE_RE.search(fname)
+        # Extract a cleaner session name from the filename
+        session_name = (
+            file_date.group(1) if file_date else fname.replace("_summary.png", "")
+        )
+        selected.append((fname, session_name))
+    return selected
+
+
+def render_subject(
+    subject,
+    pattern,
+    sessions_back,
+    input_loc,
+    notion_only=False,
+    dry_run=False,
+    matlab_worker=None,
+    refresh_catalog=False,
+    force_render=False,
+    done_elsewhere=None,
+):
+    """Run the download and MATLAB stages for one subject.
+
+    MATLAB only renders the dates whose input ``.mat`` files changed or whose
+    recorded PNGs are missing since their last render, unless ``force_render``.
+    ``done_elsewhere(date, sessions)`` may name another host that already
+    rendered and published the date from the same sessions; such dates are
+    skipped entirely.
+    Returns ``(status, produced)``: status is None when the subject should go on
+    to the Notion stage, and produced lists the PNGs MATLAB wrote or changed.
+    """
     labdata_loc = input_loc
+    print(f"\n⏳ Processing {subject}")
+    subject_output = f"{get_settings().output_loc}/{subject}"
 
-    for subject in SUBJECTS:
-        print(f"\n⏳ Processing {subject}")
+    if notion_only:
+        if not os.path.exists(subject_output):
+            print(f"⚠️ No output directory for {subject}, skipping Notion upload")
+            return "no output", []
+        return None, []
 
-        if not notion_only:
-            sessions = ensure_sessions(
-                subject, pattern, sessions_back, input_loc, dry_run=dry_run
-            )
-            if not sessions:
+    sessions = ensure_sessions(
+        subject,
+        pattern,
+        sessions_back,
+        input_loc,
+        dry_run=dry_run,
+        refresh_catalog=refresh_catalog,
+    )
+    if not sessions:
+        return "no sessions", []
+    # Only plot dates that have a session of their own
+    pattern = [
+        p for p in as_patterns(pattern) if any(s.startswith(p) for s in sessions)
+    ]
+    index = get_output_index(subject_output)
+    inputs = {}
+    if not dry_run:
+        # Make-style check: re-render only dates whose inputs or PNGs changed
+        records = load_records(subject)
+        ordered = sorted(sessions)
+        stale = []
+        for p in list(pattern):
+            selected = select_sessions(ordered, p, sessions_back)
+            holder = done_elsewhere(p, selected) if done_elsewhere else None
+            if holder:
+                print(f"✅ {subject} {p} was already processed by {holder}, skipping")
+                pattern.remove(p)
                 continue
-            subject_output = f"{OUTPUT_LOC}/{subject}"
-            run_matlab(
+            inputs[p] = input_fingerprint(input_loc, subject, selected)
+            reason = "--force-render" if force_render else None
+            reason = reason or stale_reason(
+                subject, p, sessions_back, inputs[p], subject_output, records
+            )
+            if reason:
+                print(f"🖌️ Rendering {subject} {p}: {reason}")
+                stale.append(p)
+        if not stale:
+            if pattern:
+                print(f"✅ Summaries for {subject} are up to date, skipping MATLAB")
+            return None, []
+        pattern = stale
+    before = index.files(pattern)
+    with stage("matlab"):
+        run_matlab(
+            subject,
+            input_loc,
+            labdata_loc,
+            subject_output,
+            sessions_back,
+            pattern,
+            dry_run=dry_run,
+            worker=matlab_worker,
+        )
+    if not os.path.exists(subject_output):
+        return "no output", []
+    after = index.files(pattern)
+    produced = [fname for fname, mtime in after.items() if before.get(fname) != mtime]
+    for p, fingerprint in inputs.items():
+        if p in pattern:
+            names = [fname for fname in after if file_date(fname) == p]
+            record_render(
                 subject,
-                input_loc,
-                labdata_loc,
-                subject_output,
+                p,
                 sessions_back,
-                pattern,
-                dry_run=dry_run,
+                fingerprint,
+                output_fingerprint(subject_output, names),
             )
-        else:
-            subject_output = f"{OUTPUT_LOC}/{subject}"
-            if not os.path.exists(subject_output):
-                print(f"⚠️ No output directory for {subject}, skipping Notion upload")
-                continue
+    return None, sorted(produced)
 
-        # Find PNGs that match the EXACT pattern date only
-        subject_output = f"{OUTPUT_LOC}/{subject}"
-        if not os.path.exists(subject_output):
-            continue
 
-        # Perform a single backup per subject (copy vs sync) before per-file Notion uploads
-        backup_subject(subject, overwrite=overwrite, dry_run=dry_run)
+def publish_subject(
+    subject, pngs, overwrite=False, dry_run=False, optimizer=None, journal=None
+):
+    """Upload a subject's selected PNGs to Notion and create/replace entries.
 
-        processed = set()
-        for fname in sorted(os.listdir(subject_output)):
-            if fname.endswith(".png"):
-                # Extract date from filename to check if it matches the exact pattern
-                match = re.search(r"(\d{8})", fname)
-                file_date = match.group(1) if match else None
+    ``pngs`` is the output of select_pngs. PNGs that will be uploaded are first
+    recompressed by ``optimizer`` (a PngOptimizer) when one is given. Files
+    already handled according to ``journal`` (a RunJournal) are skipped without
+    asking Notion, and each handled file is recorded there. Returns
+    ``(status, uploaded)``; the status is a failure when any page could not be
+    created, so the publish step is not journaled and ``--resume`` retries it.
+    """
+    from .file_operations import upload_to_drive  # type: ignore
+    from .ledger import file_sha256, get_upload_ledger  # type: ignore
+    from .notion_api import (  # type: ignore
+        NotionNotFoundError,
+        find_existing_summary,
+        insert_summary,
+    )
+
+    subject_output = f"{get_settings().output_loc}/{subject}"
+    if journal is not None:
+        done = [fname for fname, _ in pngs if journal.done(subject, "upload", fname)]
+        if done:
+            print(f"↩️ {len(done)} file(s) already handled in the interrupted run")
+            pngs = [(f, session) for f, session in pngs if f not in done]
+        if not pngs:
+            return "ok", 0
+
+    # Resolve subject page -> perf DB -> data source once (cached on disk across runs)
+    # and index its existing entries so per-file existence checks are local
+    perf_db_id = None
+    if not dry_run:
+        with stage("notion"), span("stage.resolve"):
+            perf_db_id = prepare_perf_db(subject)
+        if not perf_db_id:
+            return "no notion db", 0
+
+    ledger = None if dry_run else get_upload_ledger()
+    to_upload = []
+    for fname, session_name in pngs:
+        # Existing entries are known from the index and attached content from the
+        # ledger: don't upload a file we won't attach or that is already there
+        content_hash = None
+        if not dry_run:
+            existing_page_id = find_existing_summary(perf_db_id, session_name)
+            content_hash = file_sha256(f"{subject_output}/{fname}")
+            if existing_page_id and ledger.is_current(
+                subject, session_name, content_hash, existing_page_id
+            ):
+                print(f"⏭️ {fname} unchanged since last upload, skipping")
+                if journal is not None:
+                    journal.record(subject, "upload", fname, skipped="unchanged")
+                continue
+            if existing_page_id and not overwrite:
+                print(
+                    f"⚠️ Entry for {session_name} already exists. Use --overwrite to replace it."
+                )
+                if journal is not None:
+                    journal.record(subject, "upload", fname, skipped="exists")
+                continue
+        to_upload.append((fname, session_name, content_hash))
 
-                # Skip files that don't match the exact pattern date
-                if file_date and file_date != pattern:
-                    print(f"⏭️ Skipping {fname} - not matching pattern date {pattern}")
-                    continue
+    upload_paths = {}
+    if optimizer is not None and to_upload and not dry_run:
+        with span("stage.optimize", files=len(to_upload)):
+            upload_paths = optimizer.optimize(
+                [f"{subject_output}/{fname}" for fname, _, _ in to_upload],
+                digests={
+                    f"{subject_output}/{fname}": content_hash
+                    for fname, _, content_hash in to_upload
+                },
+            )
 
-                if fname in processed:
-                    continue
-                # Upload only to Notion; backup already done for the subject
+    uploaded = 0
+    missing = 0
+    for fname, session_name, content_hash in to_upload:
+        with stage("notion"):
+            # Upload only to Notion; backup is handled by the run's BackupBatch
+            upload_path = upload_paths.get(f"{subject_output}/{fname}")
+            with span("stage.upload", session=session_name) as tags:
+                tags["bytes"] = os.path.getsize(
+                    upload_path or f"{subject_output}/{fname}"
+                )
                 notion_file_id = upload_to_drive(
                     subject,
                     fname,
                     overwrite=overwrite,
                     backup_already_done=True,
                     dry_run=dry_run,
+                    upload_path=upload_path,
                 )
-                if dry_run:
-                    print("DRY RUN: Skipping Notion API calls")
-                    continue
-
-                page_id = find_subject_page(subject)
-                if not page_id:
-                    print(f"⚠️ No Notion page for {subject}")
-                    continue
-                perf_db_id = find_child_db(page_id)
-                if not perf_db_id:
-                    print(f"⚠️ No child DB for {subject}")
-                    continue
-
-                # Extract a cleaner session name from the filename
-                session_name = (
-                    file_date if file_date else fname.replace("_summary.png", "")
-                )
+            if dry_run:
+                print("DRY RUN: Skipping Notion API calls")
+                continue
 
-                insert_summary(
+            try:
+                with span("stage.insert", session=session_name):
+                    page_id = insert_summary(
+                        perf_db_id,
+                        subject,
+                        notion_file_id=notion_file_id,
+                        session_name=session_name,
+                        overwrite=overwrite,
+                    )
+            except NotionNotFoundError as e:
+                # Cached IDs went stale (page/DB moved or deleted): re-resolve once
+                print(f"🔁 {e}; refreshing cached Notion IDs for {subject}")
+                perf_db_id = prepare_perf_db(subject, refresh=True)
+                if not perf_db_id:
+                    return "no notion db", uploaded
+                page_id = insert_summary(
                     perf_db_id,
                     subject,
                     notion_file_id=notion_file_id,
                     session_name=session_name,
                     overwrite=overwrite,
                 )
-                processed.add(fname)
+            if not page_id:
+                missing += 1
+                continue
+            ledger.record(subject, session_name, content_hash, notion_file_id, page_id)
+            if journal is not None:
+                journal.record(subject, "upload", fname, page_id=page_id)
+        uploaded += 1
+    if missing:
+        return f"failed: {missing} page(s) not created", uploaded
+    return "ok", uploaded
+
+
+def _guarded(subject, fn, *args, **kwargs):
+    """Run one stage for a subject, capturing failures so other subjects keep going.
+
+    Returns ``(result, error_status, elapsed)``.
+    """
+    start = time.monotonic()
+    with subject_context(subject):
+        try:
+            return fn(subject, *args, **kwargs), None, time.monotonic() - start
+        except Exception as e:
+            traceback.print_exc()
+            return None, f"failed: {e}", time.monotonic() - start
+
+
+def print_status_table(results):
+    """Print a per-subject summary of the run."""
+    width = max([len("Subject")] + [len(r[0]) for r in results])
+    print("\n📋 Run summary")
+    print(f"{'Subject':<{width}}  {'Uploaded':>8}  {'Time (s)':>8}  Status")
+    for subject, status, uploaded, elapsed in results:
+        print(f"{subject:<{width}}  {uploaded:>8}  {elapsed:>8.1f}  {status}")
 
 
-def parse_arguments():
+def make_worker_pool():
+    """Create a MATLAB worker pool sized to the MATLAB stage limit."""
+    return MatlabWorkerPool(
+        size=get_preference("concurrency.matlab", 1),
+        job_timeout=get_preference("matlab.job_timeout", DEFAULT_TIMEOUTS["matlab"]),
+    )
+
+
+def main(
+    pattern,
+    sessions_back,
+    notion_only=False,
+    overwrite=False,
+    dry_run=False,
+    jobs=1,
+    matlab_worker=False,
+    refresh_catalog=False,
+    subjects=None,
+    profile=False,
+    optimize_png=False,
+    max_width=None,
+    resume=False,
+    force_render=False,
+    shard=None,
+):
+    """Render, publish and back up every configured subject for the given dates.
+
+    Subjects stream through a render -> publish pipeline (run_pipeline) and one
+    background rclone call backs up the run's PNGs; the README describes each
+    step and its preferences in detail.
+
+    What to process: ``pattern`` is one date, a date spec understood by
+    expand_dates (e.g. ``20250814..20250820``) or a list of dates; all dates
+    share one download, one MATLAB call and one Notion phase per subject.
+    ``subjects`` overrides the configured list and ``shard=(i, n)`` keeps only
+    shard ``i`` of ``n`` (see locks).
+
+    How to run: ``jobs`` threads render and ``jobs`` publish, within the
+    ``concurrency`` stage limits; ``matlab_worker`` (True or a MatlabWorkerPool)
+    keeps MATLAB running between subjects. ``notion_only`` skips downloads and
+    MATLAB, ``force_render`` re-renders dates whose PNGs are up to date (see
+    freshness) and ``refresh_catalog`` re-lists sessions with labdata.
+    ``overwrite``, ``optimize_png`` and ``max_width`` control the Notion upload.
+
+    Reporting and recovery: ``dry_run`` prints the plan (planner.build_plan) and
+    the commands without running them, ``profile`` prints timing tables and
+    ``resume`` skips steps journaled by an interrupted run with the same dates
+    and sessions_back.
+
+    Returns ``[(subject, status, uploaded, seconds)]``.
+    """
+    from .file_operations import BackupBatch  # type: ignore
+    from .journal import RunJournal, open_journal  # type: ignore
+    from .locks import RunLocks, shard_subjects  # type: ignore
+    from .notion_http import print_client_stats  # type: ignore
+    from .png_optimize import make_png_optimizer  # type: ignore
+
+    started = time.monotonic()
+    settings = get_settings()
+    input_loc = get_preference("paths.input_loc")
+    subjects = settings.subjects if subjects is None else subjects
+    if shard is not None:
+        total = len(subjects)
+        subjects = shard_subjects(subjects, shard)
+        print(f"🧩 Shard {shard[0]}/{shard[1]}: {len(subjects)} of {total} subjects")
+    patterns = expand_dates(pattern) if isinstance(pattern, str) else list(pattern)
+    if len(patterns) > 1:
+        print(f"📅 Processing {len(patterns)} dates: {patterns[0]} to {patterns[-1]}")
+    configure_stages()
+    run_name = patterns[0] if len(patterns) == 1 else f"{patterns[0]}-{patterns[-1]}"
+    trace_path = start_trace(f"{run_name}_{sessions_back}", write=not dry_run)
+    worker_pool = None
+    owns_pool = False
+    if isinstance(matlab_worker, MatlabWorkerPool):
+        worker_pool = matlab_worker
+    elif matlab_worker and not notion_only and not dry_run:
+        worker_pool = make_worker_pool()
+        owns_pool = True
+    optimizer = None if dry_run else make_png_optimizer(optimize_png, max_width)
+    journal = RunJournal() if dry_run else open_journal(patterns, sessions_back, resume)
+    if resume:
+        print(f"↩️ Resuming from {journal.path} ({journal.summary()} done)")
+    plan = None
+    order = subjects
+    if dry_run or jobs > 1 or profile:
+        with span("stage.plan"):
+            plan = build_plan(
+                subjects,
+                patterns,
+                sessions_back,
+                input_loc,
+                settings.output_loc,
+                journal=journal,
+                notion_only=notion_only,
+                overwrite=overwrite,
+                refresh_catalog=refresh_catalog,
+                force_render=force_render,
+            )
+        if dry_run:
+            print_plan(plan, stage_limits(jobs))
+        if jobs > 1:
+            # Longest subjects first so the last ones to finish are short
+            order = sorted(subjects, key=plan.subject_cost, reverse=True)
+
+    def render(subject, *args, **kwargs):
+        step = journal.get(subject, "render")
+        if step:
+            print(f"↩️ {subject} already rendered in the interrupted run")
+            return step["status"], step["files"]
+        result = render_subject(subject, *args, **kwargs)
+        journal.record(subject, "render", sync=True, status=result[0], files=result[1])
+        return result
+
+    def publish(subject, pngs, **kwargs):
+        step = journal.get(subject, "publish")
+        if step:
+            print(f"↩️ {subject} already published in the interrupted run")
+            return step["status"], step["uploaded"]
+        result = publish_subject(subject, pngs, **kwargs)
+        if result[0] == "ok":
+            journal.record(
+                subject, "publish", sync=True, status=result[0], uploaded=result[1]
+            )
+        return result
+
+    status = {}
+    elapsed = dict.fromkeys(subjects, 0.0)
+    uploaded = dict.fromkeys(subjects, 0)
+    backup = BackupBatch(overwrite=overwrite, dry_run=dry_run)
+    locks = None if dry_run else RunLocks(f"{settings.output_loc}/.locks")
+    claimed = dict.fromkeys(subjects, patterns)
+    rendered_sessions: dict = {subject: {} for subject in subjects}
+    finished_elsewhere: dict = {subject: set() for subject in subjects}
+
+    def done_elsewhere(subject):
+        """Check a date against the done markers other hosts left on output_loc."""
+
+        def check(date, sessions):
+            rendered_sessions[subject][date] = sessions
+            holder = locks.finished(subject, date, sessions_back, sessions)
+            if holder and not force_render:
+                finished_elsewhere[subject].add(date)
+                return holder
+            return None
+
+        return None if locks is None else check
+
+    def rendered(subject):
+        """Render one subject and return the PNGs to publish, or None if it failed."""
+        if locks is not None:
+            with subject_context(subject):
+                claimed[subject] = locks.acquire_all(subject, patterns)
+            if not claimed[subject]:
+                status[subject] = "locked by another host"
+                return None
+        result, error, seconds = _guarded(
+            subject,
+            render,
+            claimed[subject],
+            sessions_back,
+            input_loc,
+            notion_only=notion_only,
+            dry_run=dry_run,
+            matlab_worker=worker_pool,
+            refresh_catalog=refresh_catalog,
+            force_render=force_render,
+            done_elsewhere=done_elsewhere(subject),
+        )
+        elapsed[subject] += seconds
+        if error or result[0]:
+            status[subject] = error or result[0]
+            if locks is not None:
+                locks.release(subject, claimed[subject])
+            return None
+        if finished_elsewhere[subject]:
+            locks.release(subject, finished_elsewhere[subject])  # type: ignore[union-attr]
+            claimed[subject] = [
+                d for d in claimed[subject] if d not in finished_elsewhere[subject]
+            ]
+            if not claimed[subject]:
+                status[subject] = "done by another host"
+                return None
+        with subject_context(subject):
+            pngs = select_pngs(f"{settings.output_loc}/{subject}", claimed[subject])
+        if not journal.done(subject, "backup"):
+            for fname in set(result[1]) | {fname for fname, _ in pngs}:
+                backup.add(subject, fname)
+        return pngs
+
+    def published(subject, pngs):
+        result, error, seconds = _guarded(
+            subject,
+            publish,
+            pngs,
+            overwrite=overwrite,
+            dry_run=dry_run,
+            optimizer=optimizer,
+            journal=journal,
+        )
+        elapsed[subject] += seconds
+        status[subject] = error or result[0]
+        uploaded[subject] = result[1] if result else 0
+        if locks is None:
+            return
+        # A date is done once each of its PNGs got a page or was skipped on
+        # purpose (journaled as an upload); a failed page leaves it to be retried
+        for date in claimed[subject]:
+            if date in rendered_sessions[subject] and all(
+                journal.done(subject, "upload", fname)
+                for fname, _ in pngs
+                if file_date(fname) == date
+            ):
+                locks.mark_done(
+                    subject, date, sessions_back, rendered_sessions[subject][date]
+                )
+        locks.release(subject, claimed[subject])
+
+    try:
+        with prefixed_output() if len(subjects) > 1 else nullcontext():
+            # Each subject is published as soon as it is rendered, while the next
+            # ones render; the bounded queue holds renders back when Notion lags.
+            # The backup needs every subject's files, so it starts once the last
+            # render is done and runs alongside the remaining uploads.
+            run_pipeline(
+                order,
+                rendered,
+                published,
+                producers=jobs,
+                consumers=jobs,
+                queue_size=get_preference("pipeline.queue_size", jobs),
+                on_produced=backup.start,
+                on_interrupt=kill_running_commands,
+            )
+            if not backup.wait():
+                for subject in backup.subjects:
+                    if not status[subject].startswith("failed"):
+                        status[subject] = "failed: backup"
+            else:
+                for subject in backup.subjects:
+                    journal.record(subject, "backup", sync=True)
+    except BaseException:
+        # Commands run in their own session, so Ctrl-C never reaches them
+        kill_running_commands()
+        backup.join(timeout=10)
+        raise
+    finally:
+        if locks is not None:
+            locks.close()
+        if owns_pool:
+            worker_pool.close()
+        if optimizer is not None:
+            optimizer.close()
+        journal.close()
+        finish_trace()
+
+    results = [
+        (subject, status[subject], uploaded[subject], elapsed[subject])
+        for subject in subjects
+    ]
+    print_status_table(results)
+    if optimizer is not None:
+        optimizer.print_summary()
+    print_client_stats()
+    if profile:
+        print_profile()
+        print(
+            f"⏱️ Planned {plan.wall_time(stage_limits(jobs)):.1f}s, "  # type: ignore[union-attr]
+            f"took {time.monotonic() - started:.1f}s"
+        )
+        if trace_path:
+            print(f"🧾 Trace written to {trace_path}")
+    return results
+
+
+def _expand_token(token: str) -> list:
+    if ".." not in token:
+        if not re.fullmatch(r"\d{1,8}", token):
+            raise ValueError(f"invalid date pattern: {token!r}")
+        return [token]
+    first, last = token.split("..", 1)
+    try:
+        start = datetime.strptime(first, "%Y%m%d")
+        end = datetime.strptime(last, "%Y%m%d")
+    except ValueError:
+        raise ValueError(
+            f"invalid date range: {token!r} (use YYYYMMDD..YYYYMMDD)"
+        ) from None
+    if end < start:
+        raise ValueError(f"date range ends before it starts: {token!r}")
+    return [
+        (start + timedelta(days=i)).strftime("%Y%m%d")
+        for i in range((end - start).days + 1)
+    ]
+
+
+def expand_dates(spec: str) -> list:
+    """Expand ``20250820``, ``20250814..20250820`` or comma/space separated lists.
+
+    Returns the sorted, de-duplicated list of date patterns.
+    """
+    dates = set()
+    for token in re.split(r"[,\s]+", spec.strip()):
+        if token:
+            dates.update(_expand_token(token))
+    return sorted(dates)
+
+
+def read_dates_file(path) -> list:
+    """Read dates/ranges from a file, one or more per line; '#' starts a comment."""
+    with open(path, "r", encoding="utf-8") as f:
+        return expand_dates(" ".join(line.split("#", 1)[0] for line in f))
+
+
+def parse_arguments(argv=None):
     """Parse command line arguments using argparse."""
     parser = argparse.ArgumentParser(
         description="Generate performance summaries for chipmunk lab data and upload them to Notion.",
@@ -109,11 +665,20 @@ def parse_arguments():
             notion_summaries 20250820 9 --notion-only
             notion_summaries 20250820 9 --overwrite
             notion_summaries 20250820 9 --notion-only --overwrite
+            notion_summaries 20250820 9 --jobs 4
+            notion_summaries 20250814..20250820 9
+            notion_summaries 20250814,20250818 9
+            notion_summaries 9 --dates-file backfill.txt
+            notion_summaries watch 9
+            notion_summaries status --date 20250820
                     """,
     )
 
     parser.add_argument(
-        "date_pattern", help="Date pattern in YYYYMMDD format (e.g., 20250820)"
+        "date_pattern",
+        nargs="?",
+        help="Date pattern in YYYYMMDD format (e.g., 20250820), a range "
+        "(20250814..20250820) or a comma-separated list",
     )
 
     parser.add_argument(
@@ -137,22 +702,253 @@ def parse_arguments():
     parser.add_argument(
         "--dry-run",
         action="store_true",
-        help="Print commands that would be executed without running them",
+        help="Print the run's plan with its estimated wall time, then the commands "
+        "that would be executed, without running them",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of subjects to process concurrently (default: 1)",
     )
 
-    return parser.parse_args()
+    parser.add_argument(
+        "--matlab-worker",
+        action="store_true",
+        help="Start MATLAB once per run and feed it jobs instead of one matlab -batch per subject",
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print per-stage and per-subject timing tables at the end of the run",
+    )
+
+    parser.add_argument(
+        "--refresh-catalog",
+        action="store_true",
+        help="Re-list every subject's sessions with labdata instead of using the cached catalog",
+    )
+
+    parser.add_argument(
+        "--force-render",
+        action="store_true",
+        help="Run MATLAB for every date even if its PNGs are newer than its session files",
+    )
+
+    parser.add_argument(
+        "--optimize-png",
+        action="store_true",
+        help="Losslessly recompress PNGs before uploading them (needs Pillow)",
+    )
+
+    parser.add_argument(
+        "--max-width",
+        type=int,
+        help="Downscale PNGs wider than this many pixels before uploading (implies --optimize-png)",
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run with the same dates, skipping steps it finished",
+    )
+
+    parser.add_argument(
+        "--shard",
+        metavar="I/N",
+        help="Only process the subjects in shard i of n (e.g. 1/3), chosen by a stable "
+        "hash of the subject ID, to split a run across hosts",
+    )
+
+    parser.add_argument(
+        "--dates-file",
+        help="File with more dates or date ranges to process, one or more per line",
+    )
+
+    args = parser.parse_args(argv)
+    if args.date_pattern is None and not args.dates_file:
+        # With date_pattern optional, `notion_summaries 20250820` parses the date
+        # as sessions_back: the argument that is really missing is sessions_back
+        parser.error("the following arguments are required: sessions_back")
+    try:
+        dates = expand_dates(args.date_pattern) if args.date_pattern else []
+        if args.dates_file:
+            dates = sorted(set(dates) | set(read_dates_file(args.dates_file)))
+        args.shard = parse_shard(args.shard) if args.shard else None
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not dates:
+        parser.error("a date_pattern or --dates-file is required")
+    args.dates = dates
+    return args
+
+
+def parse_watch_arguments(argv=None):
+    """Parse arguments for ``notion_summaries watch``."""
+    parser = argparse.ArgumentParser(
+        prog="notion_summaries watch",
+        description="Watch input_loc for new session data and process it as it arrives.",
+    )
+    parser.add_argument(
+        "sessions_back",
+        type=int,
+        help="Number of sessions to go back from each new session's date",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=30.0,
+        help="Seconds without new .mat writes before a session is processed (default: 30)",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=10.0,
+        help="Seconds between scans when inotify is unavailable (default: 10)",
+    )
+    parser.add_argument(
+        "--polling",
+        action="store_true",
+        help="Always use the polling watcher, even if inotify_simple is installed",
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Overwrite existing entries in the database instead of skipping them",
+    )
+    parser.add_argument(
+        "--matlab-worker",
+        action="store_true",
+        help="Keep a MATLAB worker running between events",
+    )
+    return parser.parse_args(argv)
+
+
+def watch_cli(argv):
+    """Run the pipeline for each subject/date as new data appears."""
+    args = parse_watch_arguments(argv)
+    worker_pool = make_worker_pool() if args.matlab_worker else None
+
+    def run(subject, date):
+        # The catalog may have been listed minutes ago, before this session
+        # existed, and would not be listed again within frontier_refresh_minutes
+        main(
+            date,
+            args.sessions_back,
+            overwrite=args.overwrite,
+            matlab_worker=worker_pool or False,
+            refresh_catalog=True,
+            subjects=[subject],
+        )
+
+    try:
+        watch(
+            get_preference("paths.input_loc"),
+            get_settings().subjects,
+            run,
+            debounce=args.debounce,
+            poll_interval=args.poll_interval,
+            use_inotify=not args.polling,
+        )
+    finally:
+        if worker_pool is not None:
+            worker_pool.close()
+
+
+def parse_status_arguments(argv=None):
+    """Parse arguments for ``notion_summaries status``."""
+    parser = argparse.ArgumentParser(
+        prog="notion_summaries status",
+        description="Report what each subject has in Notion from the local mirror.",
+    )
+    parser.add_argument(
+        "--date",
+        help="Also show whether each subject has a summary for this date (YYYYMMDD)",
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Sync the mirror with Notion first (needs NOTION_TOKEN)",
+    )
+    return parser.parse_args(argv)
+
+
+def _ago(seconds):
+    """Format an age in seconds as e.g. '42s ago', '5m ago' or '3h ago'."""
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{int(seconds // size)}{unit} ago"
+    return f"{int(seconds)}s ago"
+
+
+def print_mirror_status(subjects, mirror, date=None):
+    """Print each subject's mirrored summary count, newest session and sync age."""
+    latest = {}
+    for row in sorted(mirror.summaries(), key=lambda r: r["synced_at"]):
+        latest[row["label"]] = row  # a re-resolved database replaces the old one
+    now = time.time()
+    rows = []
+    for subject in subjects:
+        row = latest.get(subject)
+        if row is None:
+            rows.append([subject, "-", "-", "never"] + (["-"] if date else []))
+            continue
+        cells = [subject, str(row["pages"]), row["latest"] or "-"]
+        cells.append(_ago(now - row["synced_at"]))
+        if date:
+            has_date = mirror.find(row["data_source_id"], date)
+            cells.append("yes" if has_date else "no")
+        rows.append(cells)
+    header = ["Subject", "Summaries", "Latest", "Synced"] + ([date] if date else [])
+    widths = [max(len(r[i]) for r in [header] + rows) for i in range(len(header))]
+    print(f"🪞 Notion mirror ({len(rows)} subjects)")
+    for cells in [header] + rows:
+        print("  ".join(f"{c:<{w}}" for c, w in zip(cells, widths)).rstrip())
+
+
+def status_cli(argv):
+    """Report Notion contents per subject from the local mirror."""
+    from .mirror import get_mirror  # type: ignore
+
+    args = parse_status_arguments(argv)
+    subjects = get_preference("subjects", [])
+    if args.sync:
+        for subject in subjects:
+            print(f"🔄 Syncing {subject}")
+            prepare_perf_db(subject)
+    print_mirror_status(subjects, get_mirror(), date=args.date)
 
 
 def cli():
     """Entry point for the console script."""
+    if sys.argv[1:2] == ["watch"]:
+        watch_cli(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["status"]:
+        status_cli(sys.argv[2:])
+        return
     args = parse_arguments()
-    main(
-        args.date_pattern,
+    results = main(
+        args.dates,
         args.sessions_back,
         notion_only=args.notion_only,
         overwrite=args.overwrite,
         dry_run=args.dry_run,
+        jobs=args.jobs,
+        matlab_worker=args.matlab_worker,
+        refresh_catalog=args.refresh_catalog,
+        profile=args.profile,
+        optimize_png=args.optimize_png,
+        max_width=args.max_width,
+        resume=args.resume,
+        force_render=args.force_render,
+        shard=args.shard,
     )
+    if any(status.startswith("failed") for _, status, _, _ in results):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
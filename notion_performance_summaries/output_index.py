@@ -0,0 +1,134 @@
+"""Index of the PNGs in each subject's output folder, keyed by date.
+
+Output folders gain a PNG per session forever, so listing them and matching a
+date regex on every name each run gets slower with every session. Each folder's
+index is kept in ``~/.notion_performance_summaries/output_index/<subject>.json``
+as ``{date: {fname: mtime}}`` together with the folder's mtime. The folder is
+only listed again when its mtime changes (a PNG was added, removed or renamed),
+and then only new names are parsed. PNGs overwritten in place do not change the
+folder's mtime, so the files of the requested dates are always stat'ed afresh.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable
+
+from .preferences import get_app_dir  # type: ignore
+
+DATE_RE = re.compile(r"(\d{8})")
+UNDATED = ""  # key for PNGs without a date in their name
+
+# A folder modified this close to its scan may change again within the same
+# mtime tick, so its mtime is not trusted on the next refresh
+RACY_NS = 2_000_000_000
+
+
+def index_path(folder: str):
+    return get_app_dir() / "output_index" / f"{os.path.basename(folder)}.json"
+
+
+def file_date(fname: str) -> str:
+    """The first 8-digit run in a file name, or UNDATED."""
+    match = DATE_RE.search(fname)
+    return match.group(1) if match else UNDATED
+
+
+class OutputIndex:
+    """PNGs of one output folder grouped by date, refreshed by folder mtime."""
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.path = index_path(folder)
+        self.dir_mtime_ns: int | None = None
+        self.dates: Dict[str, Dict[str, float]] = {}
+        self.scans = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data["folder"] != os.path.abspath(self.folder):
+                return
+            self.dir_mtime_ns = data["dir_mtime_ns"]
+            self.dates = data["dates"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "folder": os.path.abspath(self.folder),
+                    "dir_mtime_ns": self.dir_mtime_ns,
+                    "dates": self.dates,
+                },
+                f,
+            )
+        os.replace(tmp, self.path)
+
+    def refresh(self) -> bool:
+        """List the folder again if its mtime changed; return True if it was listed."""
+        with self._lock:
+            try:
+                mtime_ns = os.stat(self.folder).st_mtime_ns
+            except FileNotFoundError:
+                self.dir_mtime_ns, self.dates = None, {}
+                return False
+            if self.dir_mtime_ns is not None and mtime_ns == self.dir_mtime_ns:
+                return False
+            scanned_at = time.time_ns()
+            known = {
+                fname: date for date, files in self.dates.items() for fname in files
+            }
+            dates: Dict[str, Dict[str, float]] = {}
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(".png"):
+                        continue
+                    date = known.get(entry.name)
+                    if date is None:
+                        date = file_date(entry.name)
+                    dates.setdefault(date, {})[entry.name] = entry.stat().st_mtime
+            self.dates = dates
+            racy = scanned_at - mtime_ns < RACY_NS
+            self.dir_mtime_ns = None if racy else mtime_ns
+            self.scans += 1
+            self._save()
+            return True
+
+    def files(self, dates: Iterable[str]) -> Dict[str, float]:
+        """Return ``{fname: mtime}`` for the PNGs of ``dates`` plus undated PNGs."""
+        self.refresh()
+        with self._lock:
+            names = [
+                fname
+                for date in {*dates, UNDATED}
+                for fname in self.dates.get(date, {})
+            ]
+        mtimes = {}
+        for fname in names:
+            try:
+                mtimes[fname] = os.stat(os.path.join(self.folder, fname)).st_mtime
+            except FileNotFoundError:
+                continue
+        return mtimes
+
+
+_indexes: Dict[str, OutputIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_output_index(folder: str) -> OutputIndex:
+    """Return the process-wide OutputIndex for ``folder``."""
+    key = os.path.abspath(folder)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = OutputIndex(folder)
+        return _indexes[key]
@@ -0,0 +1,383 @@
+"""Plan a run before executing it: its tasks, what is already done and what it costs.
+
+build_plan() expands subjects x dates into a DAG of tasks per subject,
+``list_sessions -> download (per session) -> render -> resolve -> upload ->
+insert (per date)``, plus one ``backup`` task after every render. It only reads
+local state (session catalog, downloaded sessions, render records, output index,
+run journal and Notion mirror), so planning needs no network, labdata or MATLAB.
+Satisfied tasks are kept in the plan with the reason they will be skipped.
+
+Task costs are medians of the matching spans in the most recent traces
+(``planner.history_traces``, default 10), falling back to DEFAULT_COSTS.
+Plan.wall_time() simulates the DAG under the run's stage limits (the
+``concurrency`` preferences and ``--jobs``) to estimate how long it will take.
+"""
+
+import heapq
+import json
+import math
+import statistics
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+from .catalog import load_catalog, needs_refresh, select_sessions  # type: ignore
+from .concurrency import DEFAULT_STAGE_LIMITS  # type: ignore
+from .data_processing import downloaded_sessions  # type: ignore
+from .freshness import input_fingerprint, load_records, stale_reason  # type: ignore
+from .output_index import file_date, get_output_index  # type: ignore
+from .preferences import get_app_dir, get_preference  # type: ignore
+
+# Seconds per task when no trace has timed that kind of task yet
+DEFAULT_COSTS = {
+    "list_sessions": 10.0,
+    "download": 30.0,
+    "render": 60.0,  # per date
+    "resolve": 1.0,
+    "upload": 2.0,
+    "insert": 1.0,
+    "backup": 15.0,
+}
+
+# Stage limit each kind of task holds while it runs
+RESOURCES = {
+    "list_sessions": "jobs",
+    "download": "download",
+    "render": "matlab",
+    "resolve": "notion",
+    "upload": "notion",
+    "insert": "notion",
+    "backup": "rclone",  # one call per run, not limited
+}
+
+
+class CostModel:
+    """Per-task cost estimates learned from past traces."""
+
+    def __init__(self, samples: Dict[str, List[float]] | None = None):
+        self.samples = samples or {}
+
+    @classmethod
+    def from_traces(cls, trace_dir: Path | None = None, limit: int | None = None):
+        """Collect task timings from the newest ``limit`` trace files."""
+        trace_dir = trace_dir or get_app_dir() / "traces"
+        if limit is None:
+            limit = int(get_preference("planner.history_traces", 10))
+        samples: Dict[str, List[float]] = {}
+        files = sorted(trace_dir.glob("*.jsonl")) if trace_dir.is_dir() else []
+        for path in files[-limit:] if limit > 0 else []:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    kind, seconds = cls._sample(entry)
+                    if kind is not None:
+                        samples.setdefault(kind, []).append(seconds)
+        return cls(samples)
+
+    @staticmethod
+    def _sample(entry: dict):
+        """Map one span to ``(task kind, seconds)``, or ``(None, 0)`` if unrelated."""
+        name, seconds = entry.get("name"), entry.get("seconds", 0.0)
+        if entry.get("error"):
+            return None, 0.0
+        if name == "cmd.labdata" and entry.get("cmd", "").startswith(
+            "labdata sessions"
+        ):
+            return "list_sessions", seconds
+        if name == "stage.matlab":
+            dates = max(1, len(str(entry.get("pattern", "")).split(",")))
+            return "render", seconds / dates
+        kind = name.removeprefix("stage.") if name else None
+        if kind in DEFAULT_COSTS and kind not in ("list_sessions", "render"):
+            return kind, seconds
+        return None, 0.0
+
+    def cost(self, kind: str) -> float:
+        values = self.samples.get(kind)
+        return statistics.median(values) if values else DEFAULT_COSTS[kind]
+
+    def source(self, kind: str) -> str:
+        values = self.samples.get(kind)
+        return f"{len(values)} traced" if values else "default"
+
+
+@dataclass
+class Task:
+    kind: str
+    subject: str | None
+    name: str
+    cost: float
+    deps: List[str] = field(default_factory=list)
+    skip: str | None = None  # why the task is already satisfied
+    guess: bool = False  # count or inputs unknown until the run lists sessions
+
+    @property
+    def key(self) -> str:
+        return f"{self.subject}/{self.kind}/{self.name}"
+
+
+@dataclass
+class Plan:
+    tasks: List[Task]
+    costs: CostModel
+
+    def subject_cost(self, subject: str) -> float:
+        """Seconds of work the plan leaves for one subject."""
+        return sum(t.cost for t in self.tasks if t.subject == subject and not t.skip)
+
+    def serial_time(self) -> float:
+        return sum(t.cost for t in self.tasks if not t.skip)
+
+    def wall_time(self, limits: Dict[str, int]) -> float:
+        """Simulate the plan with at most ``limits[resource]`` tasks per resource.
+
+        Ready tasks start in plan order whenever their resource has a free slot;
+        resources missing from ``limits`` are unbounded.
+        """
+        done = {t.key for t in self.tasks if t.skip}
+        pending = [t for t in self.tasks if not t.skip]
+        free = {name: max(1, int(n)) for name, n in limits.items()}
+        running: list = []  # heap of (finish time, order, task)
+        now = 0.0
+        order = 0
+        while pending or running:
+            for task in list(pending):
+                resource = RESOURCES[task.kind]
+                if free.get(resource, math.inf) < 1:
+                    continue
+                if not all(dep in done for dep in task.deps):
+                    continue
+                pending.remove(task)
+                if resource in free:
+                    free[resource] -= 1
+                heapq.heappush(running, (now + task.cost, order, task))
+                order += 1
+            if not running:
+                break  # dependencies that can never finish
+            now, _, task = heapq.heappop(running)
+            done.add(task.key)
+            if RESOURCES[task.kind] in free:
+                free[RESOURCES[task.kind]] += 1
+        return now
+
+
+def stage_limits(jobs: int = 1) -> Dict[str, int]:
+    """Resource caps of a run: the ``concurrency`` stage limits plus ``--jobs``."""
+    limits = {
+        name: int(get_preference(f"concurrency.{name}", default))
+        for name, default in DEFAULT_STAGE_LIMITS.items()
+    }
+    limits["jobs"] = max(1, jobs)
+    return limits
+
+
+def _mirrored_dates(subjects) -> Dict[str, set]:
+    """``{subject: dates with a page}`` from the local Notion mirror, if present."""
+    path = get_app_dir() / "notion_mirror.sqlite3"
+    if not path.exists():
+        return {}
+    from .mirror import get_mirror  # type: ignore
+
+    mirror = get_mirror()
+    sources = {}
+    for row in sorted(mirror.summaries(), key=lambda r: r["synced_at"]):
+        sources[row["label"]] = row["data_source_id"]
+    return {
+        subject: set(mirror.titles(sources[subject]))
+        for subject in subjects
+        if subject in sources
+    }
+
+
+def build_plan(
+    subjects,
+    patterns: List[str],
+    sessions_back: int,
+    input_loc: str,
+    output_loc: str,
+    journal=None,
+    costs: CostModel | None = None,
+    notion_only=False,
+    overwrite=False,
+    refresh_catalog=False,
+    force_render=False,
+) -> Plan:
+    """Expand a run into tasks, marking those local state shows are already done."""
+    costs = costs or CostModel.from_traces()
+    in_notion = _mirrored_dates(subjects)
+    tasks: List[Task] = []
+    renders = []
+    backed_up = 0  # subjects whose PNGs the run's backup will copy
+    for subject in subjects:
+        rendered = journal.get(subject, "render") if journal is not None else {}
+        deps: List[str] = []
+        dates = list(patterns)
+        if not notion_only:
+            skip = "journaled" if rendered else None
+            catalog = load_catalog(subject)
+            stale = refresh_catalog or needs_refresh(catalog, patterns)
+            listing = Task(
+                "list_sessions",
+                subject,
+                "labdata sessions",
+                costs.cost("list_sessions"),
+                skip=skip or (None if stale else "catalog fresh"),
+            )
+            tasks.append(listing)
+            needed: List[str] = []
+            fresh = 0
+            if catalog["sessions"]:
+                dates = []
+                records = load_records(subject)
+                for p in patterns:
+                    selected = select_sessions(catalog["sessions"], p, sessions_back)
+                    if selected:
+                        dates.append(p)
+                    needed.extend(s for s in selected if s not in needed)
+                    inputs = input_fingerprint(input_loc, subject, selected)
+                    if (
+                        selected
+                        and not force_render
+                        and not stale_reason(
+                            subject,
+                            p,
+                            sessions_back,
+                            inputs,
+                            f"{output_loc}/{subject}",
+                            records,
+                        )
+                    ):
+                        fresh += 1
+            downloads = []
+            if catalog["sessions"] or skip:
+                have = downloaded_sessions(subject, input_loc, needed)
+                for sess in sorted(needed, reverse=True):
+                    downloads.append(
+                        Task(
+                            "download",
+                            subject,
+                            sess,
+                            costs.cost("download"),
+                            [listing.key],
+                            skip=skip or ("downloaded" if sess in have else None),
+                            guess=stale,
+                        )
+                    )
+            else:
+                # Nothing known yet: consecutive dates share most of their sessions
+                for i in range(len(patterns) + sessions_back):
+                    downloads.append(
+                        Task(
+                            "download",
+                            subject,
+                            f"session {i + 1}",
+                            costs.cost("download"),
+                            [listing.key],
+                            guess=True,
+                        )
+                    )
+            tasks.extend(downloads)
+            if not dates:
+                skip = skip or "no sessions"
+            elif fresh == len(dates):
+                skip = skip or "up to date"
+            render = Task(
+                "render",
+                subject,
+                ", ".join(dates) or "-",
+                costs.cost("render") * (len(dates) - fresh),
+                [listing.key] + [t.key for t in downloads],
+                skip=skip,
+                guess=stale,
+            )
+            tasks.append(render)
+            renders.append(render)
+            deps = [render.key]
+            if rendered.get("status"):
+                dates = []  # the interrupted run found nothing to publish
+        else:
+            index = get_output_index(f"{output_loc}/{subject}")
+            names = index.files(patterns)
+            dates = sorted(
+                {file_date(f) or f.replace("_summary.png", "") for f in names}
+            )
+        published = journal.done(subject, "publish") if journal is not None else False
+        resolve = Task(
+            "resolve",
+            subject,
+            "Notion lookups",
+            costs.cost("resolve"),
+            deps,
+            skip="journaled" if published else None if dates else "nothing to publish",
+        )
+        tasks.append(resolve)
+        for date in dates:
+            skip = "journaled" if published else None
+            if not skip and not overwrite and date in in_notion.get(subject, ()):
+                skip = "in Notion"
+            upload = Task(
+                "upload", subject, date, costs.cost("upload"), [resolve.key], skip=skip
+            )
+            insert = Task(
+                "insert", subject, date, costs.cost("insert"), [upload.key], skip=skip
+            )
+            tasks.extend([upload, insert])
+        # Like the executor: every selected PNG is backed up, rendered or not
+        if dates and not (journal is not None and journal.done(subject, "backup")):
+            backed_up += 1
+    tasks.append(
+        Task(
+            "backup",
+            None,
+            "rclone copy",
+            costs.cost("backup"),
+            [t.key for t in renders],
+            skip=None if backed_up else "nothing to back up",
+        )
+    )
+    return Plan(tasks, costs)
+
+
+def _duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    minutes, seconds = divmod(round(seconds), 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
+
+
+def print_plan(plan: Plan, limits: Dict[str, int]):
+    """Print the plan per subject and step with skipped counts and costs."""
+    rows: Dict[tuple, list] = {}
+    for task in plan.tasks:
+        row = rows.setdefault((task.subject or "-", task.kind), [0, 0, 0.0, False, {}])
+        if task.skip:
+            row[1] += 1
+            row[4][task.skip] = row[4].get(task.skip, 0) + 1
+        else:
+            row[0] += 1
+            row[2] += task.cost
+            row[3] = row[3] or task.guess
+    width = max(len("Subject"), *(len(subject) for subject, _ in rows))
+    print("\n🗺️ Plan")
+    print(f"{'Subject':<{width}}  {'Step':<13}  {'Run':>4}  {'Skip':>4}  {'Est s':>8}")
+    for (subject, kind), (run, skipped, cost, guess, reasons) in rows.items():
+        why = ", ".join(f"{n} {reason}" for reason, n in reasons.items())
+        print(
+            f"{subject:<{width}}  {kind:<13}  {run:>4}  {skipped:>4}  "
+            f"{cost:>8.1f}{'~' if guess else ' '} {why}".rstrip()
+        )
+    sources = ", ".join(f"{kind} {plan.costs.source(kind)}" for kind in DEFAULT_COSTS)
+    print(f"Costs: {sources}")
+    if any(t.guess and not t.skip for t in plan.tasks):
+        print("~ estimated: sessions are not known until labdata lists them")
+    caps = ", ".join(f"{name} {n}" for name, n in limits.items())
+    print(
+        f"⏱️ Estimated wall time: {_duration(plan.wall_time(limits))} "
+        f"({_duration(plan.serial_time())} of work; limits: {caps})"
+    )
@@ -0,0 +1,181 @@
+"""Optional lossless recompression of summary PNGs before upload.
+
+MATLAB writes PNGs with fast, light compression. With Pillow installed
+(``pip install -e ".[png]"``) each PNG about to be uploaded is re-encoded with
+maximum compression, converted to a palette image when that is exact, and
+optionally downscaled to a maximum width. The work runs in a process pool.
+Results are cached in ``~/.notion_performance_summaries/png_cache/`` by content
+hash, so each PNG is only recompressed once; the ``png.cache_keep`` most
+recently used entries (default 500) are kept. Originals in output_loc are never
+modified.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable
+
+from .ledger import file_sha256  # type: ignore
+from .preferences import get_app_dir, get_preference  # type: ignore
+
+try:
+    from PIL import Image  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+# Bump when the encoding settings change so stale cache entries are ignored
+CACHE_VERSION = 1
+
+
+def _to_exact_palette(img):
+    """Return a palette copy of an RGB image if it has <= 256 colors and converts exactly."""
+    if img.mode != "RGB" or img.getcolors(256) is None:
+        return img
+    converted = img.convert("P", palette=Image.Palette.ADAPTIVE, colors=256)
+    if converted.convert("RGB").tobytes() != img.tobytes():
+        return img
+    return converted
+
+
+def recompress_png(src: str, dst: str, max_width: int | None = None) -> int:
+    """Write a recompressed copy of ``src`` to ``dst``; return its size in bytes."""
+    with Image.open(src) as img:
+        img.load()
+        if max_width and img.width > max_width:
+            height = max(1, round(img.height * max_width / img.width))
+            img = img.resize((max_width, height), Image.Resampling.LANCZOS)
+        img = _to_exact_palette(img)
+        tmp = f"{dst}.{os.getpid()}.tmp"
+        img.save(tmp, format="PNG", optimize=True)
+    os.replace(tmp, dst)
+    return os.path.getsize(dst)
+
+
+class PngOptimizer:
+    """Recompresses PNGs in a process pool and tracks the bytes saved."""
+
+    def __init__(
+        self,
+        max_width: int | None = None,
+        workers: int | None = None,
+        cache_keep: int = 500,
+    ):
+        self.max_width = max_width
+        self.workers = workers
+        self.cache_keep = cache_keep
+        self.cache_dir = get_app_dir() / "png_cache"
+        self.files = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: the pipeline runs threads, which fork does not copy safely
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _cache_path(self, digest: str) -> str:
+        width = f"_w{self.max_width}" if self.max_width else ""
+        return str(self.cache_dir / f"{digest}{width}.v{CACHE_VERSION}.png")
+
+    def optimize(
+        self, paths: Iterable[str], digests: Dict[str, str] | None = None
+    ) -> Dict[str, str]:
+        """Return ``{original path: path to upload}`` for the given PNGs.
+
+        ``digests`` maps paths to SHA-256 hashes the caller already computed,
+        so those files are not read again. The original is kept when
+        recompression fails or does not make the file smaller.
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        digests = digests or {}
+        pending = {}
+        cached = {}
+        for path in paths:
+            dst = self._cache_path(digests.get(path) or file_sha256(path))
+            if os.path.exists(dst):
+                os.utime(dst)  # mark as recently used for _prune_cache
+                cached[path] = dst
+            else:
+                pending[path] = (
+                    dst,
+                    self._get_pool().submit(recompress_png, path, dst, self.max_width),
+                )
+
+        upload_paths = {}
+        for path, (dst, future) in pending.items():
+            try:
+                future.result()
+                cached[path] = dst
+            except Exception as e:
+                print(f"⚠️ Could not recompress {os.path.basename(path)}: {e}")
+                upload_paths[path] = path
+        for path, dst in cached.items():
+            before, after = os.path.getsize(path), os.path.getsize(dst)
+            keep = after < before
+            upload_paths[path] = dst if keep else path
+            with self._lock:
+                self.files += 1
+                self.bytes_before += before
+                self.bytes_after += after if keep else before
+        return upload_paths
+
+    def print_summary(self):
+        """Print how many bytes recompression saved in this run."""
+        if not self.files:
+            return
+        saved = self.bytes_before - self.bytes_after
+        percent = 100 * saved / self.bytes_before if self.bytes_before else 0.0
+        print(
+            f"🗜️ Recompressed {self.files} PNGs: {self.bytes_before / 1e6:.1f} MB -> "
+            f"{self.bytes_after / 1e6:.1f} MB (saved {saved / 1e6:.1f} MB, {percent:.0f}%)"
+        )
+
+    def _prune_cache(self):
+        """Delete all but the ``cache_keep`` most recently used cache entries."""
+        if not self.cache_dir.is_dir():
+            return
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                continue  # removed by another run meanwhile
+        entries.sort()
+        for _, path in entries[: max(0, len(entries) - self.cache_keep)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+        self._prune_cache()
+
+
+def make_png_optimizer(enabled=False, max_width=None) -> PngOptimizer | None:
+    """Build a PngOptimizer from CLI flags and ``png.*`` preferences, if enabled."""
+    max_width = max_width or get_preference("png.max_width")
+    if not (enabled or max_width or get_preference("png.optimize", False)):
+        return None
+    if Image is None:
+        print(
+            '⚠️ Pillow is not installed (pip install -e ".[png]"); uploading PNGs as is'
+        )
+        return None
+    workers = get_preference("png.workers")
+    return PngOptimizer(
+        max_width=int(max_width) if max_width else None,
+        workers=int(workers) if workers else None,
+        cache_keep=int(get_preference("png.cache_keep", 500)),
+    )
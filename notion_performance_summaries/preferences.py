@@ -13,12 +13,18 @@ DEFAULT_PREFERENCES = {
     },
     "subjects": [],
     "notion": {"version": "2025-09-03"},
+    "cache": {"ttl_hours": 168},
 }
 
 
+def get_app_dir() -> Path:
+    """Return the per-user directory holding preferences and local state."""
+    return Path.home() / ".notion_performance_summaries"
+
+
 def get_preferences_path() -> Path:
     """Return the path to the preferences.json file in your home directory."""
-    return Path.home() / ".notion_performance_summaries" / "preferences.json"
+    return get_app_dir() / "preferences.json"
 
 
 def create_default_preferences(preferences_path: Path) -> Dict[str, Any]:
@@ -76,18 +82,36 @@ def load_preferences(preferences_path: Path | None = None) -> Dict[str, Any]:
         return create_default_preferences(preferences_path)
 
 
-# Load preferences on module import
+# Parsed preferences, re-read only when the file's mtime changes
 _preferences: Dict[str, Any] | None = None
+_preferences_path: Path | None = None
+_preferences_mtime: int | None = None
+
+
+def _mtime(path: Path) -> int | None:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _current_preferences() -> Dict[str, Any]:
+    """Return the parsed preferences, reloading them if the file changed on disk."""
+    global _preferences, _preferences_path, _preferences_mtime
+    path = _preferences_path or get_preferences_path()
+    mtime = _mtime(path)
+    if _preferences is None or (mtime is not None and mtime != _preferences_mtime):
+        _preferences = load_preferences(path)
+        _preferences_path = path
+        # load_preferences may have rewritten the file with missing defaults
+        _preferences_mtime = _mtime(path)
+    return _preferences
 
 
 def get_preference(key_path: str, default=None):
     """Get a preference value using dot notation (e.g., 'paths.input_loc')."""
-    global _preferences
-    if _preferences is None:
-        _preferences = load_preferences()
-
     keys = key_path.split(".")
-    value = _preferences
+    value = _current_preferences()
 
     for key in keys:
         if isinstance(value, dict) and key in value:
@@ -103,9 +127,7 @@ def validate_preferences():
     errors = []
 
     # Ensure preferences are loaded
-    global _preferences
-    if _preferences is None:
-        _preferences = load_preferences()
+    _current_preferences()
 
     # Check required paths
     required_paths = ["paths.input_loc", "paths.output_loc", "paths.remote"]
@@ -127,6 +149,9 @@ def validate_preferences():
 
 def reload_preferences(path: Path | None = None):
     """Reload preferences from file, optionally from a specific path."""
-    global _preferences
+    global _preferences, _preferences_path, _preferences_mtime
+    path = path or get_preferences_path()
     _preferences = load_preferences(preferences_path=path)
+    _preferences_path = path
+    _preferences_mtime = _mtime(path)
     return _preferences
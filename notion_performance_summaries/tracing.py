@@ -0,0 +1,161 @@
+"""Lightweight span tracing for pipeline stages, commands and Notion calls.
+
+Spans are written as JSON lines to
+``~/.notion_performance_summaries/traces/<run>.jsonl`` through a buffered file
+and kept in memory as (name, subject, seconds) tuples for the ``--profile``
+summary. Recording a span costs a couple of clock reads and one buffered write,
+so tracing stays on in production.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .concurrency import current_subject  # type: ignore
+from .preferences import get_app_dir, get_preference  # type: ignore
+
+
+class Tracer:
+    """Collects spans for one run and optionally appends them to a file."""
+
+    def __init__(self, path: Path | None = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self.spans: List[Tuple[str, str | None, float]] = []
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8", buffering=64 * 1024)
+
+    def record(self, name: str, start: float, seconds: float, tags: dict):
+        subject = tags.get("subject") or current_subject()
+        with self._lock:
+            self.spans.append((name, subject, seconds))
+            if self._file is not None:
+                entry = {
+                    "name": name,
+                    "start": round(start, 6),
+                    "seconds": round(seconds, 6),
+                    "thread": threading.current_thread().name,
+                    **tags,
+                }
+                if subject:
+                    entry["subject"] = subject
+                self._file.write(json.dumps(entry, default=str) + "\n")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_tracer = Tracer()
+
+
+@contextmanager
+def span(name: str, **tags):
+    """Time a block as a span; the yielded dict can be used to add tags (e.g. bytes)."""
+    start = time.time()
+    t0 = time.perf_counter()
+    try:
+        yield tags
+    except BaseException as e:
+        tags["error"] = type(e).__name__
+        raise
+    finally:
+        _tracer.record(name, start, time.perf_counter() - t0, tags)
+
+
+def record_span(name: str, start: float, seconds: float, **tags):
+    """Record a span measured by the caller (e.g. a background process)."""
+    _tracer.record(name, start, seconds, tags)
+
+
+def start_trace(run_name: str, write: bool = True) -> Path | None:
+    """Begin a new run: reset in-memory spans and open a fresh trace file.
+
+    ``write=False`` keeps spans in memory only (dry runs, whose near-zero spans
+    would skew the planner's cost estimates).
+    """
+    global _tracer
+    _tracer.close()
+    path = None
+    if write and get_preference("tracing.enabled", True):
+        trace_dir = get_app_dir() / "traces"
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        path = trace_dir / f"{stamp}_{run_name}.jsonl"
+        _prune(trace_dir, int(get_preference("tracing.keep", 50)))
+    _tracer = Tracer(path)
+    return path
+
+
+def finish_trace():
+    """Flush and close the current trace file."""
+    _tracer.close()
+
+
+def _prune(trace_dir: Path, keep: int):
+    """Delete all but the newest ``keep - 1`` trace files."""
+    if not trace_dir.is_dir():
+        return
+    files = sorted(trace_dir.glob("*.jsonl"))
+    for old in files[: max(0, len(files) - keep + 1)]:
+        old.unlink(missing_ok=True)
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = max(
+        0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1)
+    )
+    return sorted_values[index]
+
+
+def print_profile():
+    """Print per-span and per-subject timing tables for the current run."""
+    spans = list(_tracer.spans)
+    if not spans:
+        return
+    by_name: Dict[str, List[float]] = {}
+    by_subject: Dict[str, Dict[str, float]] = {}
+    for name, subject, seconds in spans:
+        by_name.setdefault(name, []).append(seconds)
+        if subject and name.startswith("stage."):
+            stages = by_subject.setdefault(subject, {})
+            stages[name] = stages.get(name, 0.0) + seconds
+
+    width = max(len("Span"), *(len(name) for name in by_name))
+    print("\n⏱️ Profile by span")
+    print(
+        f"{'Span':<{width}}  {'Count':>6}  {'Total s':>8}  {'p50 s':>7}  {'p95 s':>7}"
+    )
+    for name in sorted(by_name, key=lambda n: -sum(by_name[n])):
+        values = sorted(by_name[name])
+        print(
+            f"{name:<{width}}  {len(values):>6}  {sum(values):>8.2f}  "
+            f"{_percentile(values, 0.5):>7.2f}  {_percentile(values, 0.95):>7.2f}"
+        )
+
+    if by_subject:
+        stage_names = sorted({n for stages in by_subject.values() for n in stages})
+        columns = [n.removeprefix("stage.") for n in stage_names]
+        widths = [max(9, len(c)) for c in columns]
+        width = max(len("Subject"), *(len(s) for s in by_subject))
+        print("\n⏱️ Profile by subject (seconds)")
+        print(
+            f"{'Subject':<{width}}  "
+            + "  ".join(f"{c:>{w}}" for c, w in zip(columns, widths))
+            + f"  {'total':>9}"
+        )
+        for subject in sorted(by_subject):
+            stages = by_subject[subject]
+            print(
+                f"{subject:<{width}}  "
+                + "  ".join(
+                    f"{stages.get(n, 0.0):>{w}.2f}" for n, w in zip(stage_names, widths)
+                )
+                + f"  {sum(stages.values()):>9.2f}"
+            )
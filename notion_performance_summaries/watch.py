@@ -0,0 +1,209 @@
+"""Watch mode: re-run the pipeline when new session data lands in input_loc.
+
+Monitors ``<input_loc>/<subject>/<session>/chipmunk`` for ``.mat`` files, using
+inotify when the optional ``inotify_simple`` package is installed and a
+scandir-based poller otherwise. Bursts of writes are debounced per
+(subject, date) before the pipeline runs for just that subject and date, in
+the same process so caches, HTTP connections and MATLAB workers stay warm.
+"""
+
+import os
+import time
+from typing import Callable, Dict, Iterable, Set, Tuple
+
+from .catalog import SESSION_RE  # type: ignore
+from .data_processing import DOWNLOAD_MARKER  # type: ignore
+
+try:
+    import inotify_simple  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    inotify_simple = None
+
+SessionKey = Tuple[str, str]  # (subject, session ID)
+
+
+def _chipmunk_signature(chipmunk_dir: str) -> Tuple[int, float] | None:
+    """(number of .mat files, newest .mat mtime) for a chipmunk folder."""
+    count, newest = 0, 0.0
+    try:
+        with os.scandir(chipmunk_dir) as entries:
+            for e in entries:
+                if e.name.endswith(".mat"):
+                    count += 1
+                    newest = max(newest, e.stat().st_mtime)
+    except FileNotFoundError:
+        return None
+    return (count, newest) if count else None
+
+
+def already_processed(input_loc: str, subject: str, session: str) -> bool:
+    """True if our own download marker is newer than every .mat in the session.
+
+    Sessions fetched by the pipeline itself (labdata get for sessions_back)
+    must not trigger another run.
+    """
+    chipmunk = f"{input_loc}/{subject}/{session}/chipmunk"
+    signature = _chipmunk_signature(chipmunk)
+    try:
+        marker_mtime = os.stat(f"{chipmunk}/{DOWNLOAD_MARKER}").st_mtime
+    except FileNotFoundError:
+        return False
+    return signature is not None and marker_mtime >= signature[1]
+
+
+class PollingWatcher:
+    """Detects new/changed chipmunk folders by periodically scanning them."""
+
+    def __init__(self, input_loc: str, subjects: Iterable[str]):
+        self.input_loc = input_loc
+        self.subjects = list(subjects)
+        self._dir_mtimes: Dict[SessionKey, float] = {}
+        self._signatures: Dict[SessionKey, Tuple[int, float] | None] = {}
+        self._scan()
+
+    def _scan(self) -> Set[SessionKey]:
+        changed = set()
+        for subject in self.subjects:
+            try:
+                with os.scandir(f"{self.input_loc}/{subject}") as entries:
+                    sessions = [e.name for e in entries if e.is_dir()]
+            except FileNotFoundError:
+                continue
+            for session in sessions:
+                key = (subject, session)
+                chipmunk = f"{self.input_loc}/{subject}/{session}/chipmunk"
+                try:
+                    dir_mtime = os.stat(chipmunk).st_mtime
+                except FileNotFoundError:
+                    continue
+                # Only list folders whose directory entry changed (or that are new)
+                if self._dir_mtimes.get(key) == dir_mtime and key in self._signatures:
+                    continue
+                self._dir_mtimes[key] = dir_mtime
+                signature = _chipmunk_signature(chipmunk)
+                if signature != self._signatures.get(key):
+                    changed.add(key)
+                self._signatures[key] = signature
+        return changed
+
+    def poll(self, timeout: float) -> Set[SessionKey]:
+        time.sleep(timeout)
+        return self._scan()
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """inotify-based watcher for subject, session and chipmunk folders.
+
+    Existing session and chipmunk folders are watched from startup, so a
+    chipmunk/ created later in an old session is still seen.
+    """
+
+    def __init__(self, input_loc: str, subjects: Iterable[str]):
+        flags = inotify_simple.flags
+        self.input_loc = input_loc
+        self._dir_mask = flags.CREATE | flags.MOVED_TO | flags.ONLYDIR
+        self._file_mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE
+        self._inotify = inotify_simple.INotify()
+        self._paths: Dict[int, str] = {}
+        for subject in subjects:
+            path = f"{input_loc}/{subject}"
+            if not os.path.isdir(path):
+                continue
+            self._add(path, self._dir_mask)
+            with os.scandir(path) as entries:
+                sessions = [e.path for e in entries if e.is_dir()]
+            for session in sessions:
+                self._add(session, self._dir_mask)
+                if os.path.isdir(f"{session}/chipmunk"):
+                    self._add(f"{session}/chipmunk", self._file_mask)
+
+    def _add(self, path: str, mask):
+        try:
+            self._paths[self._inotify.add_watch(path, mask)] = path
+        except OSError as e:
+            print(f"⚠️ Cannot watch {path}: {e}")
+
+    def _key(self, path: str) -> SessionKey | None:
+        parts = os.path.relpath(path, self.input_loc).split(os.sep)
+        return (parts[0], parts[1]) if len(parts) >= 2 else None
+
+    def poll(self, timeout: float) -> Set[SessionKey]:
+        changed = set()
+        for event in self._inotify.read(timeout=int(timeout * 1000)):
+            parent = self._paths.get(event.wd)
+            if parent is None or not event.name:
+                continue
+            path = os.path.join(parent, event.name)
+            depth = len(os.path.relpath(path, self.input_loc).split(os.sep))
+            if depth == 2 and os.path.isdir(path):  # new session folder
+                self._add(path, self._dir_mask)
+                if os.path.isdir(f"{path}/chipmunk"):
+                    # Moved in or filled before the watch existed: .mat files
+                    # already written would never be reported
+                    self._add(f"{path}/chipmunk", self._file_mask)
+                    changed.add(self._key(path))
+            elif depth == 3 and event.name == "chipmunk":
+                self._add(path, self._file_mask)
+                changed.add(self._key(path))
+            elif depth == 4 and event.name.endswith(".mat"):
+                changed.add(self._key(path))
+        changed.discard(None)
+        return changed  # type: ignore[return-value]
+
+    def close(self):
+        self._inotify.close()
+
+
+def make_watcher(input_loc: str, subjects: Iterable[str], use_inotify=True):
+    """Return an inotify watcher when available, otherwise a polling one."""
+    if use_inotify and inotify_simple is not None:
+        print("👀 Watching for new sessions (inotify)")
+        return InotifyWatcher(input_loc, subjects)
+    print("👀 Watching for new sessions (polling)")
+    return PollingWatcher(input_loc, subjects)
+
+
+def watch(
+    input_loc: str,
+    subjects: Iterable[str],
+    run: Callable[[str, str], None],
+    debounce: float = 30.0,
+    poll_interval: float = 10.0,
+    use_inotify: bool = True,
+):
+    """Block forever, calling ``run(subject, date)`` after each debounced burst."""
+    watcher = make_watcher(input_loc, subjects, use_inotify=use_inotify)
+    pending: Dict[SessionKey, float] = {}
+    try:
+        while True:
+            wait = poll_interval
+            if pending:
+                wait = min(
+                    wait, max(0.1, debounce - (time.time() - min(pending.values())))
+                )
+            for key in watcher.poll(wait):
+                pending[key] = time.time()
+
+            now = time.time()
+            ready = {key for key, seen in pending.items() if now - seen >= debounce}
+            dates = set()
+            for subject, session in ready:
+                del pending[(subject, session)]
+                if not SESSION_RE.fullmatch(session):
+                    continue
+                if already_processed(input_loc, subject, session):
+                    continue
+                dates.add((subject, session[:8]))
+            for subject, date in sorted(dates):
+                print(f"\n🔔 New data for {subject} on {date}")
+                try:
+                    run(subject, date)
+                except Exception as e:
+                    print(f"❌ Pipeline failed for {subject} {date}: {e}")
+    except KeyboardInterrupt:
+        print("\n👋 Stopping watch mode")
+    finally:
+        watcher.close()
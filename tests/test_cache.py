@@ -0,0 +1,31 @@
+import json
+
+from notion_performance_summaries.cache import JsonCache
+
+
+def test_cache_persists_across_instances(tmp_path):
+    """Test that values written by one cache instance are read by another."""
+    path = tmp_path / "cache.json"
+    JsonCache(path, ttl=60).set("subjects", "SUB01", {"perf_db_id": "db1"})
+
+    assert JsonCache(path, ttl=60).get("subjects", "SUB01") == {"perf_db_id": "db1"}
+
+
+def test_cache_expires_entries(tmp_path):
+    """Test that entries older than the TTL are treated as missing."""
+    path = tmp_path / "cache.json"
+    path.write_text(json.dumps({"data_sources": {"db1": {"value": "ds1", "ts": 0}}}))
+    cache = JsonCache(path, ttl=60)
+
+    assert cache.get("data_sources", "db1") is None
+    assert cache.items("data_sources") == []
+
+
+def test_cache_delete(tmp_path):
+    """Test that deleted entries are removed from disk."""
+    path = tmp_path / "cache.json"
+    cache = JsonCache(path, ttl=60)
+    cache.set("data_sources", "db1", "ds1")
+    cache.delete("data_sources", "db1")
+
+    assert JsonCache(path, ttl=60).get("data_sources", "db1") is None
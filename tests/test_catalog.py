@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from notion_performance_summaries import catalog, preferences
+from notion_performance_summaries.catalog import (
+    get_sessions,
+    load_catalog,
+    merge_sessions,
+    needs_refresh,
+    select_sessions,
+)
+
+SESSIONS = ["20250818_101010", "20250819_101010", "20250820_090000", "20250820_150000"]
+
+
+@pytest.fixture(autouse=True)
+def app_dir(tmp_path, monkeypatch):
+    prefs_file = tmp_path / "preferences.json"
+    prefs_file.write_text(json.dumps({"catalog": {"max_age_hours": 24}}))
+    preferences.reload_preferences(path=prefs_file)
+    monkeypatch.setattr(catalog, "get_app_dir", lambda: tmp_path)
+
+
+def test_select_sessions_matches_newest_session_and_goes_back():
+    """Test that selection mirrors the old descending linear scan."""
+    assert select_sessions(SESSIONS, "20250820", 1) == [
+        "20250820_150000",
+        "20250820_090000",
+    ]
+    assert select_sessions(SESSIONS, "20250819", 5) == [
+        "20250819_101010",
+        "20250818_101010",
+    ]
+    assert select_sessions(SESSIONS, "20250821", 1) == []
+    assert select_sessions(SESSIONS, "20250817", 1) == []
+
+
+def test_merge_sessions_keeps_sorted_and_unique():
+    """Test that incremental merges only add unseen sessions in order."""
+    sessions = SESSIONS[:2]
+    assert merge_sessions(sessions, [SESSIONS[3], SESSIONS[0], SESSIONS[2]]) == 2
+    assert sessions == SESSIONS
+
+
+def test_needs_refresh_only_for_frontier_or_stale_catalogs():
+    """Test that historical dates are answered from a fresh catalog."""
+    now = 1_000_000.0
+    fresh = {"fetched_at": now - 3600, "sessions": SESSIONS}
+    assert not needs_refresh(fresh, ["20250819"], now=now)
+    assert needs_refresh(fresh, ["20250820"], now=now)
+    assert needs_refresh(fresh, ["20250821"], now=now)
+    assert needs_refresh({"fetched_at": 0.0, "sessions": SESSIONS}, ["20250819"], now)
+
+
+def test_get_sessions_fetches_once_then_uses_catalog():
+    """Test that a second lookup for a past date does not call labdata."""
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return "\n".join(SESSIONS)
+
+    assert get_sessions("SUB01", ["20250819"], fetch) == SESSIONS
+    assert get_sessions("SUB01", ["20250819"], fetch) == SESSIONS
+    assert len(calls) == 1
+    get_sessions("SUB01", ["20250819"], fetch, force_refresh=True)
+    assert len(calls) == 2
+
+
+def test_forced_refresh_drops_sessions_gone_upstream():
+    """Test that --refresh-catalog rebuilds the catalog instead of merging."""
+    get_sessions("SUB01", ["20250819"], lambda: "\n".join(SESSIONS))
+
+    rebuilt = get_sessions(
+        "SUB01", ["20250819"], lambda: "\n".join(SESSIONS[1:]), force_refresh=True
+    )
+
+    assert rebuilt == SESSIONS[1:]
+    assert load_catalog("SUB01")["sessions"] == SESSIONS[1:]
@@ -0,0 +1,69 @@
+import io
+import threading
+import time
+
+import pytest
+
+from notion_performance_summaries.concurrency import (
+    _SubjectPrefixWriter,
+    run_pipeline,
+    subject_context,
+)
+
+
+def test_prefix_writer_tags_complete_lines():
+    """Test that lines written inside a subject context are prefixed once."""
+    stream = io.StringIO()
+    writer = _SubjectPrefixWriter(stream)
+
+    with subject_context("SUB01"):
+        writer.write("⏳ Processing")
+        writer.write(" SUB01\nsecond line\n")
+    writer.write("untagged\n")
+
+    assert stream.getvalue() == (
+        "[SUB01] ⏳ Processing SUB01\n[SUB01] second line\nuntagged\n"
+    )
+
+
+def test_pipeline_consumes_while_producing():
+    """Test that items are consumed before the last one is produced."""
+    events = []
+    lock = threading.Lock()
+
+    def produce(item):
+        time.sleep(0.05)
+        with lock:
+            events.append(("produced", item))
+        return None if item == "B" else item.lower()
+
+    def consume(item, result):
+        with lock:
+            events.append(("consumed", item, result))
+
+    run_pipeline(
+        ["A", "B", "C"], produce, consume, on_produced=lambda: events.append("done")
+    )
+
+    assert events.index(("consumed", "A", "a")) < events.index(("produced", "C"))
+    assert ("consumed", "B", None) not in events
+    assert ("consumed", "C", "c") in events
+    assert "done" in events
+
+
+def test_pipeline_backpressure_and_errors():
+    """Test that producers wait for a full queue and a consumer error stops the run."""
+    produced = []
+    release = threading.Event()
+
+    def consume(item, result):
+        release.wait(5)
+        raise RuntimeError(f"boom {item}")
+
+    with pytest.raises(RuntimeError, match="boom 0"):
+        timer = threading.Timer(0.3, release.set)
+        timer.start()
+        run_pipeline(range(10), lambda i: produced.append(i) or i, consume)
+
+    # One item being consumed, one queued and one waiting in the producer
+    assert produced == [0, 1, 2]
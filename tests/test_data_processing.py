@@ -0,0 +1,178 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from notion_performance_summaries import catalog, data_processing, preferences
+from notion_performance_summaries.concurrency import run_pipeline
+from notion_performance_summaries.data_processing import (
+    DOWNLOAD_MARKER,
+    downloaded_sessions,
+    ensure_sessions,
+)
+
+SESSIONS = "20250818_101010\n20250819_101010\n20250820_090000\n20250820_150000\n"
+
+
+@pytest.fixture(autouse=True)
+def prefs(tmp_path, monkeypatch):
+    prefs_file = tmp_path / "preferences.json"
+    prefs_file.write_text(json.dumps({"labdata": {"download_retries": 1}}))
+    preferences.reload_preferences(path=prefs_file)
+    monkeypatch.setattr(catalog, "get_app_dir", lambda: tmp_path / "app")
+
+
+@pytest.fixture
+def fake_labdata(monkeypatch):
+    """Replace labdata calls: list SESSIONS, record gets, fail listed sessions once."""
+    calls = []
+    flaky = set()
+
+    def run_cmd(cmd, dry_run=False, timeout=None, on_line=None, **kwargs):
+        if cmd[1] == "sessions":
+            for line in SESSIONS.splitlines():
+                on_line(line)
+            return SESSIONS
+        sess = cmd[4]
+        calls.append(sess)
+        if sess in flaky:
+            flaky.discard(sess)
+            raise subprocess.CalledProcessError(1, cmd)
+        return ""
+
+    monkeypatch.setattr(data_processing, "run_cmd", run_cmd)
+    return calls, flaky
+
+
+def test_partial_download_is_not_treated_as_complete(tmp_path, fake_labdata):
+    """Test that only sessions with a completion marker are skipped."""
+    calls, _ = fake_labdata
+    done = tmp_path / "SUB01" / "20250819_101010" / "chipmunk"
+    done.mkdir(parents=True)
+    (done / "a.mat").write_bytes(b"")
+    (done / DOWNLOAD_MARKER).write_text("")
+    partial = tmp_path / "SUB01" / "20250818_101010" / "chipmunk"
+    partial.mkdir(parents=True)
+    (partial / "a.mat").write_bytes(b"")
+
+    sessions = ensure_sessions("SUB01", "20250820", 2, str(tmp_path))
+
+    assert sessions == ["20250820_150000", "20250820_090000", "20250819_101010"]
+    assert sorted(calls) == ["20250820_090000", "20250820_150000"]
+    assert downloaded_sessions(
+        "SUB01", str(tmp_path), ["20250818_101010", "20250819_101010"]
+    ) == {"20250819_101010"}
+
+
+def test_failed_download_is_retried_and_marked(tmp_path, fake_labdata):
+    """Test that a failing labdata get is retried and then marked complete."""
+    calls, flaky = fake_labdata
+    flaky.add("20250820_150000")
+
+    ensure_sessions("SUB01", "20250820", 0, str(tmp_path))
+
+    assert calls == ["20250820_150000", "20250820_150000"]
+    assert downloaded_sessions("SUB01", str(tmp_path), calls) == {"20250820_150000"}
+
+
+def test_multiple_dates_share_one_download_set(tmp_path, fake_labdata):
+    """Test that overlapping sessions for several dates are downloaded once."""
+    calls, _ = fake_labdata
+
+    sessions = ensure_sessions("SUB01", ["20250819", "20250820"], 1, str(tmp_path))
+
+    assert sessions == [
+        "20250820_150000",
+        "20250820_090000",
+        "20250819_101010",
+        "20250818_101010",
+    ]
+    assert sorted(calls) == sorted(sessions)
+
+
+def test_run_cmd_streams_lines_and_bounds_output(tmp_path):
+    """Test that every line reaches the callback while only the tail is kept."""
+    prefs_file = tmp_path / "preferences.json"
+    prefs_file.write_text(json.dumps({"commands": {"max_output_bytes": 100}}))
+    preferences.reload_preferences(path=prefs_file)
+    seen = []
+    script = "for i in range(1000): print(f'line {i}')"
+
+    out = data_processing.run_cmd([sys.executable, "-c", script], on_line=seen.append)
+
+    assert len(seen) == 1000 and seen[-1] == "line 999"
+    assert out.endswith("line 999") and len(out) <= 100
+
+
+def test_run_cmd_kills_idle_command_and_its_children(tmp_path):
+    """Test that an idle command is killed with the processes it started."""
+    pid_file = tmp_path / "child.pid"
+    script = (
+        "import subprocess, sys, time\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+        f"open({str(pid_file)!r}, 'w').write(str(child.pid))\n"
+        "print('started', flush=True)\n"
+        "time.sleep(60)\n"
+    )
+    start = time.monotonic()
+
+    with pytest.raises(data_processing.CommandIdle):
+        data_processing.run_cmd([sys.executable, "-c", script], idle_timeout=0.5)
+
+    assert time.monotonic() - start < 10
+    child = int(pid_file.read_text())
+    deadline = time.monotonic() + 5
+    while _running(child) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not _running(child)
+
+
+def _running(pid):
+    """True if ``pid`` is alive and not a zombie waiting to be reaped."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def test_interrupted_pipeline_kills_running_commands(tmp_path):
+    """Test that Ctrl-C during a pipeline stops commands running on its threads."""
+    pid_file = tmp_path / "child.pid"
+    script = (
+        "import subprocess, sys, time\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+        f"open({str(pid_file)!r}, 'w').write(str(child.pid))\n"
+        "time.sleep(60)\n"
+    )
+
+    def interrupt():
+        while not pid_file.exists() or not pid_file.read_text():
+            time.sleep(0.05)
+        os.kill(os.getpid(), signal.SIGINT)
+
+    threading.Thread(target=interrupt, daemon=True).start()
+    start = time.monotonic()
+    with pytest.raises(KeyboardInterrupt):
+        run_pipeline(
+            [1],
+            lambda _: data_processing.run_cmd([sys.executable, "-c", script]),
+            lambda *_: None,
+            on_interrupt=data_processing.kill_running_commands,
+        )
+
+    assert time.monotonic() - start < 20
+    child = int(pid_file.read_text())
+    deadline = time.monotonic() + 5
+    while _running(child) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not _running(child)
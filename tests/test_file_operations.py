@@ -0,0 +1,178 @@
+import os
+import subprocess
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from notion_performance_summaries import file_operations
+from notion_performance_summaries.file_operations import BackupBatch
+
+
+class FakeResponse:
+    def __init__(self, data=None):
+        self._data = data or {}
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeClient:
+    """Records file upload calls with the bytes each send carried."""
+
+    def __init__(self):
+        self.calls = []
+
+    def post(self, path, json=None, files=None, data=None, **kwargs):
+        body = None
+        if files is not None:
+            content = files["file"][1]
+            body = content.read() if hasattr(content, "read") else bytes(content)
+        self.calls.append((path, json, data, body))
+        return FakeResponse({"id": "up1"} if path == "/file_uploads" else {})
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeClient()
+    monkeypatch.setattr(file_operations, "get_client", lambda: fake)
+    monkeypatch.setattr(file_operations, "get_preference", lambda key, default: default)
+    monkeypatch.setattr(file_operations, "SINGLE_PART_LIMIT", 20)
+    monkeypatch.setattr(file_operations, "PART_SIZE", 10)
+    return fake
+
+
+def test_large_file_is_sent_in_numbered_parts(tmp_path, client):
+    """Test that a file over the limit is split into PART_SIZE parts and completed."""
+    png = tmp_path / "big.png"
+    content = bytes(range(25))
+    png.write_bytes(content)
+
+    assert file_operations.upload_to_notion_and_get_file_id(str(png)) == "up1"
+
+    create, *sends, complete = client.calls
+    assert create[0] == "/file_uploads"
+    assert create[1]["mode"] == "multi_part"
+    assert create[1]["number_of_parts"] == 3
+    sends.sort(key=lambda call: int(call[2]["part_number"]))
+    assert [call[0] for call in sends] == ["/file_uploads/up1/send"] * 3
+    assert [call[2] for call in sends] == [
+        {"part_number": "1"},
+        {"part_number": "2"},
+        {"part_number": "3"},
+    ]
+    assert [len(call[3]) for call in sends] == [10, 10, 5]
+    assert b"".join(call[3] for call in sends) == content
+    assert complete[0] == "/file_uploads/up1/complete"
+
+
+def test_file_at_the_limit_is_sent_in_one_part(tmp_path, client):
+    """Test that files up to SINGLE_PART_LIMIT keep the single-part flow."""
+    png = tmp_path / "small.png"
+    png.write_bytes(b"x" * 20)
+
+    file_operations.upload_to_notion_and_get_file_id(str(png))
+
+    assert [call[0] for call in client.calls] == [
+        "/file_uploads",
+        "/file_uploads/up1/send",
+    ]
+    assert client.calls[0][1]["mode"] == "single_part"
+    assert client.calls[1][2] is None
+    assert client.calls[1][3] == b"x" * 20
+
+
+@pytest.fixture
+def rclone(monkeypatch):
+    """Replace run_cmd: record rclone calls with their manifest, fail or hang if asked."""
+    calls = []
+    state = {"fail": False, "running": threading.Event()}
+    state["running"].set()
+
+    def run_cmd(cmd, dry_run=False, on_line=None, **kwargs):
+        manifest = cmd[cmd.index("--files-from") + 1]
+        with open(manifest, encoding="utf-8") as f:
+            calls.append((cmd, dry_run, f.read()))
+        state["running"].wait()
+        if state["fail"] and not dry_run:
+            raise subprocess.CalledProcessError(1, cmd, "", "permission denied")
+        return ""
+
+    monkeypatch.setattr(file_operations, "run_cmd", run_cmd)
+    monkeypatch.setattr(file_operations, "get_preference", lambda key, default: default)
+    monkeypatch.setattr(
+        file_operations,
+        "get_settings",
+        lambda: SimpleNamespace(output_loc="/data/out", remote="gdrive:summaries"),
+    )
+    return calls, state
+
+
+def test_backup_batch_copies_manifest_of_run_files(rclone):
+    """Test that one rclone call gets the run's files relative to output_loc."""
+    calls, _ = rclone
+    backup = BackupBatch()
+    backup.add("S2", "S2_20250820_summary.png")
+    backup.add("S1", "S1_20250820_summary.png")
+
+    backup.start()
+    assert backup.wait()
+
+    ((cmd, dry_run, manifest),) = calls
+    assert manifest == "S1/S1_20250820_summary.png\nS2/S2_20250820_summary.png\n"
+    assert cmd[:2] == ["rclone", "copy"]
+    assert cmd[cmd.index("--transfers") + 1] == "8"
+    assert cmd[cmd.index("--checkers") + 1] == "16"
+    assert cmd[-3:] == ["/data/out", "gdrive:summaries", "--ignore-existing"]
+    assert not dry_run
+    assert not os.path.exists(cmd[cmd.index("--files-from") + 1])
+    assert "--ignore-existing" not in BackupBatch(overwrite=True).command("m")
+
+
+def test_failed_backup_reports_and_cleans_up(rclone, capsys):
+    """Test that a failing rclone makes wait() False and removes the manifest."""
+    calls, state = rclone
+    state["fail"] = True
+    backup = BackupBatch()
+    backup.add("S1", "S1_20250820_summary.png")
+
+    backup.start()
+    assert not backup.wait()
+
+    cmd = calls[0][0]
+    assert not os.path.exists(cmd[cmd.index("--files-from") + 1])
+    assert "permission denied" in capsys.readouterr().out
+
+
+def test_manifest_outlives_an_interrupted_wait(rclone):
+    """Test that the manifest is kept until rclone has actually finished."""
+    calls, state = rclone
+    state["running"].clear()
+    backup = BackupBatch()
+    backup.add("S1", "S1_20250820_summary.png")
+
+    backup.start()
+    backup.join(timeout=0.1)  # e.g. main giving up after Ctrl-C
+    manifest = calls[0][0][calls[0][0].index("--files-from") + 1]
+    assert os.path.exists(manifest)
+
+    state["running"].set()
+    backup.join()
+    assert not os.path.exists(manifest)
+
+
+def test_dry_run_backup_only_prints(rclone, capsys):
+    """Test that a dry run passes dry_run to run_cmd and lists the files."""
+    calls, state = rclone
+    state["fail"] = True
+    backup = BackupBatch(dry_run=True)
+    backup.add("S1", "S1_20250820_summary.png")
+
+    backup.start()
+    assert backup.wait()
+
+    assert calls[0][1] is True
+    assert "would back up S1/S1_20250820_summary.png" in capsys.readouterr().out
@@ -0,0 +1,102 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from notion_performance_summaries import (
+    freshness,
+    notion_summaries,
+    output_index,
+    preferences,
+)
+from notion_performance_summaries.freshness import (
+    input_fingerprint,
+    output_fingerprint,
+    record_render,
+    stale_reason,
+)
+
+
+@pytest.fixture(autouse=True)
+def app_dir(tmp_path, monkeypatch):
+    prefs_file = tmp_path / "preferences.json"
+    prefs_file.write_text("{}")
+    preferences.reload_preferences(path=prefs_file)
+    monkeypatch.setattr(freshness, "get_app_dir", lambda: tmp_path / "app")
+    monkeypatch.setattr(output_index, "get_app_dir", lambda: tmp_path / "app")
+    output_index._indexes.clear()
+    return tmp_path
+
+
+def make_session(input_loc, sess):
+    chipmunk = input_loc / "S1" / sess / "chipmunk"
+    chipmunk.mkdir(parents=True)
+    (chipmunk / f"S1_{sess}_chipmunk.mat").write_bytes(b"mat")
+    return chipmunk
+
+
+def test_stale_reason_tracks_inputs_and_outputs(tmp_path):
+    """Test that a render goes stale when inputs or recorded PNGs change."""
+    input_loc, out = tmp_path / "in", tmp_path / "out"
+    chipmunk = make_session(input_loc, "20250820_100000")
+    out.mkdir()
+    (out / "S1_20250820_summary.png").write_bytes(b"png")
+    inputs = input_fingerprint(str(input_loc), "S1", ["20250820_100000"])
+
+    assert stale_reason("S1", "20250820", 3, inputs, str(out)) == "never rendered"
+    outputs = output_fingerprint(str(out), ["S1_20250820_summary.png"])
+    record_render("S1", "20250820", 3, inputs, outputs)
+    assert stale_reason("S1", "20250820", 3, inputs, str(out)) is None
+    assert stale_reason("S1", "20250820", 4, inputs, str(out)) == "never rendered"
+
+    (chipmunk / "S1_20250820_chipmunk.mat").write_bytes(b"more data")
+    changed = input_fingerprint(str(input_loc), "S1", ["20250820_100000"])
+    assert stale_reason("S1", "20250820", 3, changed, str(out)) == "inputs changed"
+
+    os.remove(out / "S1_20250820_summary.png")
+    assert stale_reason("S1", "20250820", 3, inputs, str(out)) == (
+        "outputs missing or modified"
+    )
+
+
+def test_render_subject_skips_matlab_for_fresh_dates(tmp_path, monkeypatch):
+    """Test that MATLAB only re-renders stale dates unless forced."""
+    input_loc, out = tmp_path / "in", tmp_path / "out"
+    sessions = ["20250820_100000", "20250819_100000"]
+    for sess in sessions:
+        make_session(input_loc, sess)
+    calls = []
+
+    def fake_matlab(subject, *args, **kwargs):
+        patterns = args[-1]
+        calls.append(list(patterns))
+        os.makedirs(out / subject, exist_ok=True)
+        for p in patterns:
+            (out / subject / f"{subject}_{p}_summary.png").write_bytes(b"png")
+
+    monkeypatch.setattr(
+        notion_summaries, "get_settings", lambda: SimpleNamespace(output_loc=str(out))
+    )
+    monkeypatch.setattr(notion_summaries, "ensure_sessions", lambda *a, **k: sessions)
+    monkeypatch.setattr(notion_summaries, "run_matlab", fake_matlab)
+
+    def render(force_render=False):
+        return notion_summaries.render_subject(
+            "S1",
+            ["20250819", "20250820"],
+            0,
+            str(input_loc),
+            force_render=force_render,
+        )
+
+    assert render() == (None, ["S1_20250819_summary.png", "S1_20250820_summary.png"])
+    assert render() == (None, [])
+    (input_loc / "S1" / sessions[0] / "chipmunk" / "extra.mat").write_bytes(b"new")
+    render()
+    render(force_render=True)
+
+    assert calls == [
+        ["20250819", "20250820"],
+        ["20250820"],
+        ["20250819", "20250820"],
+    ]
@@ -0,0 +1,37 @@
+import json
+
+from notion_performance_summaries.journal import RunJournal, run_key
+
+
+def test_resume_drops_torn_line_and_compacts(tmp_path):
+    """Test that a crash mid-write loses only that entry and duplicates collapse."""
+    path = tmp_path / "20250820_9.jsonl"
+    journal = RunJournal(path)
+    journal.record("SUB01", "render", sync=True, status=None, files=["a.png"])
+    journal.record("SUB01", "upload", "a.png", page_id="p1")
+    journal.record("SUB01", "upload", "a.png", page_id="p2")
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"subject": "SUB01", "stage": "pub')
+
+    resumed = RunJournal(path, resume=True)
+    assert resumed.done("SUB01", "render")
+    assert resumed.get("SUB01", "upload", "a.png")["page_id"] == "p2"
+    assert not resumed.done("SUB01", "publish")
+    resumed.record("SUB01", "publish", sync=True, status="ok", uploaded=1)
+    resumed.close()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [entry["stage"] for entry in lines] == ["render", "upload", "publish"]
+
+
+def test_new_run_starts_empty(tmp_path):
+    """Test that opening without resume discards the previous run's steps."""
+    path = tmp_path / "20250820_9.jsonl"
+    journal = RunJournal(path)
+    journal.record("SUB01", "render", sync=True, status=None, files=[])
+    journal.close()
+
+    assert not RunJournal(path).done("SUB01", "render")
+    assert run_key(["20250820"], 9) == "20250820_9"
+    assert run_key(["20250814", "20250820"], 9).startswith("20250814-20250820_")
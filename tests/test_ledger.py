@@ -0,0 +1,30 @@
+import hashlib
+
+from notion_performance_summaries.ledger import UploadLedger, file_sha256
+
+
+def test_file_sha256_matches_hashlib(tmp_path):
+    """Test that the mmap-based digest matches a plain hashlib digest."""
+    png = tmp_path / "summary.png"
+    data = b"\x89PNG" + bytes(range(256)) * 1000
+    png.write_bytes(data)
+
+    assert file_sha256(png) == hashlib.sha256(data).hexdigest()
+    empty = tmp_path / "empty.png"
+    empty.write_bytes(b"")
+    assert file_sha256(empty) == hashlib.sha256(b"").hexdigest()
+
+
+def test_ledger_is_current_requires_same_hash_and_page(tmp_path):
+    """Test that only identical content on the same page counts as current."""
+    ledger = UploadLedger(tmp_path / "uploads.sqlite3")
+    ledger.record("SUB01", "20250820", "abc", "upload1", "page1")
+
+    assert ledger.is_current("SUB01", "20250820", "abc", "page1")
+    assert not ledger.is_current("SUB01", "20250820", "def", "page1")
+    assert not ledger.is_current("SUB01", "20250820", "abc", "page2")
+    assert not ledger.is_current("SUB02", "20250820", "abc", "page1")
+    ledger.close()
+
+    reopened = UploadLedger(tmp_path / "uploads.sqlite3")
+    assert reopened.lookup("SUB01", "20250820")["file_upload_id"] == "upload1"
@@ -0,0 +1,76 @@
+import json
+import os
+
+import pytest
+
+from notion_performance_summaries import preferences
+from notion_performance_summaries.locks import (
+    RunLocks,
+    parse_shard,
+    shard_of,
+    shard_subjects,
+)
+
+
+@pytest.fixture(autouse=True)
+def prefs(tmp_path):
+    prefs_file = tmp_path / "preferences.json"
+    prefs_file.write_text(json.dumps({"locks": {"stale_minutes": 1}}))
+    preferences.reload_preferences(path=prefs_file)
+
+
+def test_shards_partition_subjects():
+    """Test that every subject lands in exactly one shard, the same one every time."""
+    subjects = [f"GRB{i:03d}" for i in range(40)]
+    shards = [shard_subjects(subjects, (i, 3)) for i in (1, 2, 3)]
+
+    assert sorted(sum(shards, [])) == subjects
+    assert all(shards)
+    assert shard_of("GRB036", 3) == shard_of("GRB036", 3)
+    assert parse_shard("2/3") == (2, 3)
+    for spec in ("0/3", "4/3", "1", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+
+def test_locks_exclude_other_hosts_until_stale(tmp_path):
+    """Test that held dates are skipped and stale or released locks are taken over."""
+    lock_dir = str(tmp_path / ".locks")
+    mine, other = RunLocks(lock_dir), RunLocks(lock_dir)
+    other.owner = {"host": "otherhost", "pid": 1}
+
+    assert mine.acquire_all("S1", ["20250819", "20250820"]) == ["20250819", "20250820"]
+    assert other.acquire_all("S1", ["20250820", "20250821"]) == ["20250821"]
+
+    # A crashed host stops refreshing its lock's mtime
+    os.utime(mine.path("S1", "20250820"), (0, 0))
+    assert other.acquire("S1", "20250820") is None
+    with open(mine.path("S1", "20250820"), encoding="utf-8") as f:
+        assert json.load(f)["host"] == "otherhost"
+
+    # Releasing a lock another host reclaimed leaves it in place
+    mine.close()
+    assert os.path.exists(mine.path("S1", "20250820"))
+    assert not os.path.exists(mine.path("S1", "20250819"))
+    other.close()
+    assert os.listdir(lock_dir) == []
+
+
+def test_done_markers_stop_a_second_host_repeating_a_date(tmp_path):
+    """Test that a host taking a released lock sees the first host's done marker."""
+    lock_dir = str(tmp_path / ".locks")
+    first, second = RunLocks(lock_dir), RunLocks(lock_dir)
+    first.owner = {"host": "hosta", "pid": 1}
+    sessions = ["20250820_100000", "20250819_100000"]
+
+    assert first.acquire_all("S1", ["20250820"]) == ["20250820"]
+    first.mark_done("S1", "20250820", 1, sessions)
+    first.release("S1", ["20250820"])
+
+    assert second.acquire_all("S1", ["20250820"]) == ["20250820"]
+    assert second.finished("S1", "20250820", 1, sessions) == "hosta (pid 1)"
+    # New data for the date, or another sessions_back, must still be processed
+    assert second.finished("S1", "20250820", 1, ["20250820_150000"] + sessions) is None
+    assert second.finished("S1", "20250820", 2, sessions) is None
+    assert first.finished("S1", "20250820", 1, sessions) is None
+    second.close()
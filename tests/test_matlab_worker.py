@@ -0,0 +1,77 @@
+import sys
+import textwrap
+
+import pytest
+
+from notion_performance_summaries.matlab_worker import (
+    MatlabJobError,
+    MatlabWorkerDied,
+    MatlabWorkerPool,
+)
+
+FAKE_MATLAB = textwrap.dedent(
+    """\
+    import re, sys, time
+    for line in sys.stdin:
+        if line.strip() == "exit":
+            break
+        if "die()" in line:
+            sys.exit(1)
+        if "chatter()" in line:
+            while True:
+                print("still plotting...", flush=True)
+                time.sleep(0.05)
+        job = re.search(r"DONE__ (\\d+)", line).group(1)
+        if "error(" in line:
+            print(f"__JOB_FAILED__ {job} boom", flush=True)
+        else:
+            print("plotting...", flush=True)
+            print(f"__JOB_DONE__ {job}", flush=True)
+    """
+)
+
+
+@pytest.fixture
+def fake_matlab(tmp_path):
+    script = tmp_path / "fake_matlab.py"
+    script.write_text(FAKE_MATLAB)
+    launcher = tmp_path / "matlab"
+    launcher.write_text(f'#!/bin/sh\nexec {sys.executable} {script} "$@"\n')
+    launcher.chmod(0o755)
+    return str(launcher)
+
+
+def test_worker_pool_runs_jobs_and_reports_errors(fake_matlab):
+    """Test that jobs complete, MATLAB errors surface, and the worker is reused."""
+    pool = MatlabWorkerPool(size=1, matlab=fake_matlab, startup_timeout=10)
+    try:
+        assert pool.run("batchCopyPlot({'SUB01'})") == "plotting..."
+        with pytest.raises(MatlabJobError, match="boom"):
+            pool.run("error('x')")
+        assert pool.run("batchCopyPlot({'SUB02'})") == "plotting..."
+        assert pool._started == 1
+    finally:
+        pool.close()
+
+
+def test_worker_pool_reports_dead_worker(fake_matlab):
+    """Test that a crashed MATLAB raises MatlabWorkerDied and is replaced."""
+    pool = MatlabWorkerPool(size=1, matlab=fake_matlab, startup_timeout=10)
+    try:
+        with pytest.raises(MatlabWorkerDied):
+            pool.run("die()")
+        assert pool.run("batchCopyPlot({'SUB01'})") == "plotting..."
+    finally:
+        pool.close()
+
+
+def test_job_timeout_is_a_deadline_not_an_idle_limit(fake_matlab):
+    """Test that a hung job is killed even while it keeps printing."""
+    pool = MatlabWorkerPool(
+        size=1, matlab=fake_matlab, startup_timeout=10, job_timeout=0.5
+    )
+    try:
+        with pytest.raises(MatlabWorkerDied, match="timed out"):
+            pool.run("chatter()")
+    finally:
+        pool.close()
@@ -0,0 +1,175 @@
+import pytest
+
+from notion_performance_summaries import notion_api
+from notion_performance_summaries.mirror import NotionMirror
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data or {}
+        self.text = ""
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise notion_api.requests.exceptions.HTTPError(response=self)
+
+
+class FakeClient:
+    """Answers PATCH /pages/{id} with ``patch_status`` and POST /pages with a new page
+    (or ``post_status`` if that is an error).
+
+    Data source queries return ``pages`` (id, title, last_edited_time) filtered
+    by last_edited_time, two per response.
+    """
+
+    def __init__(self, patch_status=200, pages=(), post_status=200):
+        self.patch_status = patch_status
+        self.post_status = post_status
+        self.pages = list(pages)
+        self.calls = []
+
+    def patch(self, path, json=None):
+        self.calls.append(("PATCH", path, json))
+        status = 200 if json.get("archived") else self.patch_status
+        return FakeResponse(status, {"id": path.split("/")[-1]})
+
+    def post(self, path, json=None, params=None):
+        self.calls.append(("POST", path, json))
+        if path.endswith("/query"):
+            return FakeResponse(200, self.query(json))
+        return FakeResponse(self.post_status, {"id": "new-page"})
+
+    def query(self, body):
+        since = body.get("filter", {}).get("last_edited_time", {}).get("on_or_after")
+        pages = [p for p in self.pages if since is None or p[2] >= since]
+        start = int(body.get("start_cursor") or 0)
+        more = start + 2 < len(pages)
+        results = [
+            {
+                "id": page_id,
+                "last_edited_time": edited,
+                "properties": {"Session ID": {"title": [{"plain_text": title}]}},
+            }
+            for page_id, title, edited in pages[start : start + 2]
+        ]
+        return {"results": results, "has_more": more, "next_cursor": str(start + 2)}
+
+
+@pytest.fixture(autouse=True)
+def mirror(tmp_path, monkeypatch):
+    mirror = NotionMirror(tmp_path / "mirror.sqlite3")
+    monkeypatch.setattr(notion_api, "get_mirror", lambda: mirror)
+    yield mirror
+    mirror.close()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def make(patch_status=200, pages=(), post_status=200):
+        fake = FakeClient(patch_status, pages, post_status)
+        monkeypatch.setattr(notion_api, "get_client", lambda: fake)
+        monkeypatch.setattr(notion_api, "get_data_source_id", lambda db: "ds-" + db)
+        monkeypatch.setitem(notion_api._SUMMARY_INDEX, "db1", {"20250820": "old-page"})
+        return fake
+
+    return make
+
+
+def test_overwrite_updates_files_in_place(client):
+    """Test that overwriting sends one PATCH of Files & media and keeps the page."""
+    fake = client(200)
+
+    page_id = notion_api.insert_summary(
+        "db1", "SUB01", notion_file_id="f1", session_name="20250820", overwrite=True
+    )
+
+    assert page_id == "old-page"
+    assert fake.calls == [
+        (
+            "PATCH",
+            "/pages/old-page",
+            {
+                "properties": {
+                    "Files & media": {
+                        "files": [{"type": "file_upload", "file_upload": {"id": "f1"}}]
+                    }
+                }
+            },
+        )
+    ]
+
+
+def test_overwrite_replaces_page_when_schema_differs(client):
+    """Test that a rejected in-place update creates a new page, then archives the old."""
+    fake = client(400)
+
+    page_id = notion_api.insert_summary(
+        "db1", "SUB01", notion_file_id="f1", session_name="20250820", overwrite=True
+    )
+
+    assert page_id == "new-page"
+    assert [(method, path) for method, path, _ in fake.calls] == [
+        ("PATCH", "/pages/old-page"),
+        ("POST", "/pages"),
+        ("PATCH", "/pages/old-page"),
+    ]
+    assert fake.calls[2][2] == {"archived": True}
+    assert notion_api._SUMMARY_INDEX["db1"]["20250820"] == "new-page"
+
+
+def test_failed_replacement_keeps_existing_page(client):
+    """Test that the old page is not archived when its replacement cannot be created."""
+    fake = client(400, post_status=400)
+
+    assert (
+        notion_api.insert_summary(
+            "db1", "SUB01", notion_file_id="f1", session_name="20250820", overwrite=True
+        )
+        is None
+    )
+    assert [(method, path) for method, path, _ in fake.calls] == [
+        ("PATCH", "/pages/old-page"),
+        ("POST", "/pages"),
+    ]
+    assert notion_api._SUMMARY_INDEX["db1"]["20250820"] == "old-page"
+
+
+def test_summary_index_syncs_mirror_incrementally(client, mirror):
+    """Test that the second load only asks for pages edited since the first."""
+    fake = client(
+        pages=[
+            ("p1", "20250818", "2025-08-18T10:00:00.000Z"),
+            ("p2", "20250819", "2025-08-19T10:00:00.000Z"),
+            ("p3", "20250820", "2025-08-20T10:00:00.000Z"),
+        ]
+    )
+    notion_api._SUMMARY_INDEX.pop("db2", None)
+
+    index = notion_api.load_summary_index("db2", "SUB01")
+    assert index == {"20250818": "p1", "20250819": "p2", "20250820": "p3"}
+    assert len(fake.calls) == 2  # two pages of results
+
+    fake.calls.clear()
+    fake.pages.append(("p4", "20250821", "2025-08-21T10:00:00.000Z"))
+    index = notion_api.load_summary_index("db2", "SUB01")
+    assert index["20250821"] == "p4" and len(index) == 4
+    assert fake.calls[0][2]["filter"]["last_edited_time"] == {
+        "on_or_after": "2025-08-20T10:00:00.000Z"
+    }
+    assert mirror.summaries()[0]["label"] == "SUB01"
+
+
+def test_created_and_archived_pages_are_written_through(client, mirror):
+    """Test that pages this process creates or archives update the mirror."""
+    client(400)
+    mirror.upsert("ds-db1", "old-page", "20250820")
+
+    notion_api.insert_summary(
+        "db1", "SUB01", notion_file_id="f1", session_name="20250820", overwrite=True
+    )
+
+    assert mirror.titles("ds-db1") == {"20250820": "new-page"}
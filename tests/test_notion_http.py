@@ -0,0 +1,89 @@
+import pytest
+import requests
+
+from notion_performance_summaries import notion_http
+from notion_performance_summaries.notion_http import NotionClient, endpoint_key
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeSession(requests.Session):
+    def __init__(self, statuses):
+        super().__init__()
+        self.statuses = list(statuses)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url))
+        status, headers = self.statuses.pop(0)
+        return FakeResponse(status, headers)
+
+
+def test_endpoint_key_collapses_ids():
+    """Test that object IDs are grouped under a single endpoint name."""
+    url = "https://api.notion.com/v1/blocks/0123456789abcdef0123456789abcdef/children"
+    assert endpoint_key("get", url) == "GET /blocks/{id}/children"
+
+
+def test_client_retries_and_honors_retry_after(monkeypatch):
+    """Test that 429/502 responses are retried, waiting Retry-After seconds."""
+    sleeps = []
+    monkeypatch.setattr(notion_http.time, "sleep", sleeps.append)
+    session = FakeSession([(429, {"Retry-After": "2"}), (502, {}), (200, {})])
+    client = NotionClient({}, rate=1000, backoff=0.5, session=session)
+
+    response = client.post("/data_sources/ds/query", json={})
+
+    assert response.status_code == 200
+    assert session.calls[0] == (
+        "POST",
+        "https://api.notion.com/v1/data_sources/ds/query",
+    )
+    assert sleeps[0] == 2.0
+    assert 0.25 <= sleeps[1] <= 1.0
+    stats = client.stats()["POST /data_sources/ds/query"]
+    assert stats["calls"] == 3
+    assert stats["retries"] == 2
+
+
+def test_client_returns_last_response_when_retries_exhausted(monkeypatch):
+    """Test that the final failing response is handed back to the caller."""
+    monkeypatch.setattr(notion_http.time, "sleep", lambda s: None)
+    session = FakeSession([(503, {}), (503, {})])
+    client = NotionClient({}, rate=1000, max_retries=1, session=session)
+
+    assert client.get("/users").status_code == 503
+    assert client.stats()["GET /users"]["errors"] == 2
+
+
+def test_creating_posts_are_not_retried_once_they_may_have_applied(monkeypatch):
+    """Test that POST /pages retries 429 and connect errors but not 5xx or read timeouts."""
+    monkeypatch.setattr(notion_http.time, "sleep", lambda s: None)
+    session = FakeSession([(429, {}), (502, {})])
+    client = NotionClient({}, rate=1000, session=session)
+
+    assert client.post("/pages", json={}).status_code == 502
+    assert len(session.calls) == 2
+
+    attempts = []
+
+    def fail(error):
+        def request(method, url, **kwargs):
+            attempts.append(error)
+            if len(attempts) > 1:
+                return FakeResponse(200)
+            raise error
+
+        return request
+
+    session.request = fail(requests.ConnectionError("refused"))
+    assert client.post("/pages", json={}).status_code == 200
+    attempts.clear()
+    session.request = fail(requests.ReadTimeout("read timed out"))
+    with pytest.raises(requests.ReadTimeout):
+        client.post("/pages", json={})
+    assert len(attempts) == 1
@@ -0,0 +1,143 @@
+from types import SimpleNamespace
+
+import pytest
+
+from notion_performance_summaries import (
+    file_operations,
+    ledger,
+    notion_api,
+    notion_summaries,
+    preferences,
+)
+from notion_performance_summaries.journal import RunJournal
+from notion_performance_summaries.mirror import NotionMirror
+from notion_performance_summaries.notion_summaries import (
+    expand_dates,
+    parse_arguments,
+    print_mirror_status,
+    publish_subject,
+    watch_cli,
+)
+
+
+def test_expand_dates_ranges_and_lists():
+    """Test that ranges cross month ends and lists are merged and sorted."""
+    assert expand_dates("20250830..20250902") == [
+        "20250830",
+        "20250831",
+        "20250901",
+        "20250902",
+    ]
+    assert expand_dates("20250820, 20250814 20250820") == ["20250814", "20250820"]
+    with pytest.raises(ValueError):
+        expand_dates("20250820..20250801")
+
+
+def test_dates_file_is_merged_with_pattern(tmp_path):
+    """Test that --dates-file dates are added to the positional pattern."""
+    dates_file = tmp_path / "dates.txt"
+    dates_file.write_text("# backfill\n20250801..20250802\n20250805  # retry\n")
+
+    args = parse_arguments(["20250820", "9", "--dates-file", str(dates_file)])
+    assert args.dates == ["20250801", "20250802", "20250805", "20250820"]
+    assert parse_arguments(["9", "--dates-file", str(dates_file)]).sessions_back == 9
+
+
+def test_missing_sessions_back_is_reported(capsys):
+    """Test that a lone date pattern reports sessions_back as the missing argument."""
+    with pytest.raises(SystemExit):
+        parse_arguments(["20250820"])
+    assert "required: sessions_back" in capsys.readouterr().err
+
+
+def test_shard_argument_is_validated():
+    """Test that --shard is parsed to (i, n) and rejects shards out of range."""
+    assert parse_arguments(["20250820", "9", "--shard", "2/3"]).shard == (2, 3)
+    assert parse_arguments(["20250820", "9"]).shard is None
+    with pytest.raises(SystemExit):
+        parse_arguments(["20250820", "9", "--shard", "4/3"])
+
+
+def test_mirror_status_lists_every_configured_subject(tmp_path, capsys):
+    """Test that status reports mirrored subjects and marks unsynced ones."""
+    mirror = NotionMirror(tmp_path / "mirror.sqlite3")
+    mirror.apply(
+        "ds1",
+        [("p1", "20250819", None, False), ("p2", "20250820", None, False)],
+        cursor="2025-08-20T10:00:00.000Z",
+        label="SUB01",
+        full=True,
+    )
+
+    print_mirror_status(["SUB01", "SUB02"], mirror, date="20250819")
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[1].split() == ["Subject", "Summaries", "Latest", "Synced", "20250819"]
+    assert lines[2].split()[:3] == ["SUB01", "2", "20250820"]
+    assert lines[2].split()[-1] == "yes"
+    assert lines[3].split() == ["SUB02", "-", "-", "never", "-"]
+    mirror.close()
+
+
+def test_failed_page_creation_fails_the_publish(tmp_path, monkeypatch):
+    """Test that a PNG without a page is not counted and fails the subject."""
+    (tmp_path / "preferences.json").write_text("{}")
+    preferences.reload_preferences(path=tmp_path / "preferences.json")
+    (tmp_path / "S1").mkdir()
+    for date in ("20250819", "20250820"):
+        (tmp_path / "S1" / f"S1_{date}_summary.png").write_bytes(date.encode())
+    monkeypatch.setattr(
+        notion_summaries,
+        "get_settings",
+        lambda: SimpleNamespace(output_loc=str(tmp_path)),
+    )
+    monkeypatch.setattr(notion_summaries, "prepare_perf_db", lambda s: "db")
+    monkeypatch.setattr(
+        ledger, "get_upload_ledger", lambda: ledger.UploadLedger(tmp_path / "l.db")
+    )
+    monkeypatch.setattr(file_operations, "upload_to_drive", lambda *a, **k: "fu")
+    monkeypatch.setattr(notion_api, "find_existing_summary", lambda db, s: None)
+    monkeypatch.setattr(
+        notion_api,
+        "insert_summary",
+        lambda *a, session_name, **k: None if session_name == "20250820" else "p1",
+    )
+    journal = RunJournal(tmp_path / "run.jsonl")
+    pngs = [
+        ("S1_20250819_summary.png", "20250819"),
+        ("S1_20250820_summary.png", "20250820"),
+    ]
+
+    status, uploaded = publish_subject("S1", pngs, journal=journal)
+
+    assert status == "failed: 1 page(s) not created"
+    assert uploaded == 1
+    assert journal.done("S1", "upload", "S1_20250819_summary.png")
+    assert not journal.done("S1", "upload", "S1_20250820_summary.png")
+    journal.close()
+
+
+def test_watch_runs_refresh_the_catalog(monkeypatch):
+    """Test that a watch-triggered run lists sessions again for the new data."""
+    runs = []
+    monkeypatch.setattr(
+        notion_summaries, "get_preference", lambda key, default=None: "/in"
+    )
+    monkeypatch.setattr(
+        notion_summaries, "get_settings", lambda: SimpleNamespace(subjects=["S1"])
+    )
+    monkeypatch.setattr(
+        notion_summaries,
+        "watch",
+        lambda loc, subjects, run, **kw: run("S1", "20250820"),
+    )
+    monkeypatch.setattr(
+        notion_summaries, "main", lambda *args, **kwargs: runs.append((args, kwargs))
+    )
+
+    watch_cli(["9"])
+
+    ((args, kwargs),) = runs
+    assert args == ("20250820", 9)
+    assert kwargs["subjects"] == ["S1"]
+    assert kwargs["refresh_catalog"] is True
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from notion_performance_summaries import output_index
+from notion_performance_summaries.output_index import OutputIndex
+
+
+@pytest.fixture(autouse=True)
+def app_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(output_index, "get_app_dir", lambda: tmp_path / "app")
+
+
+def make_folder(tmp_path, names):
+    folder = tmp_path / "SUB01"
+    folder.mkdir()
+    for name in names:
+        (folder / name).write_bytes(b"png")
+    # Age the folder so its mtime is trusted on the next refresh
+    os.utime(folder, (1_000_000, 1_000_000))
+    return folder
+
+
+def test_files_by_date_include_undated_pngs(tmp_path):
+    """Test that lookups return the requested dates plus undated PNGs only."""
+    folder = make_folder(
+        tmp_path,
+        ["SUB01_20250819_summary.png", "SUB01_20250820_summary.png", "notes.txt"]
+        + ["overview.png"],
+    )
+    index = OutputIndex(str(folder))
+
+    assert sorted(index.files(["20250820"])) == [
+        "SUB01_20250820_summary.png",
+        "overview.png",
+    ]
+    assert index.files(["20250101"]).keys() == {"overview.png"}
+
+
+def test_refresh_lists_folder_only_when_its_mtime_changes(tmp_path):
+    """Test that unchanged folders are not listed again, even by a new process."""
+    folder = make_folder(tmp_path, ["SUB01_20250820_summary.png"])
+    index = OutputIndex(str(folder))
+    index.files(["20250820"])
+    index.files(["20250820"])
+    assert index.scans == 1
+
+    # A fresh index (next run) is loaded from disk without listing the folder
+    reloaded = OutputIndex(str(folder))
+    assert reloaded.files(["20250820"]) and reloaded.scans == 0
+
+    (folder / "SUB01_20250821_summary.png").write_bytes(b"png")
+    os.utime(folder, (2_000_000, 2_000_000))
+    assert "SUB01_20250821_summary.png" in reloaded.files(["20250821"])
+    assert reloaded.scans == 1
+
+
+def test_overwritten_png_reports_new_mtime(tmp_path):
+    """Test that a PNG rewritten in place shows its new mtime without a rescan."""
+    folder = make_folder(tmp_path, ["SUB01_20250820_summary.png"])
+    index = OutputIndex(str(folder))
+    png = folder / "SUB01_20250820_summary.png"
+    os.utime(png, (1_000, 1_000))
+    before = index.files(["20250820"])
+
+    os.utime(png, (5_000, 5_000))
+    assert index.files(["20250820"]) != before
+    assert index.scans == 1
@@ -0,0 +1,142 @@
+import json
+import time
+
+import pytest
+
+from notion_performance_summaries import (
+    catalog,
+    freshness,
+    output_index,
+    planner,
+    preferences,
+)
+from notion_performance_summaries.catalog import save_catalog
+from notion_performance_summaries.data_processing import DOWNLOAD_MARKER
+from notion_performance_summaries.freshness import (
+    input_fingerprint,
+    output_fingerprint,
+    record_render,
+)
+from notion_performance_summaries.journal import RunJournal
+from notion_performance_summaries.planner import CostModel, Plan, Task, build_plan
+
+
+@pytest.fixture(autouse=True)
+def app_dir(tmp_path, monkeypatch):
+    prefs_file = tmp_path / "preferences.json"
+    prefs_file.write_text(json.dumps({"catalog": {"max_age_hours": 24}}))
+    preferences.reload_preferences(path=prefs_file)
+    monkeypatch.setattr(catalog, "get_app_dir", lambda: tmp_path)
+    monkeypatch.setattr(planner, "get_app_dir", lambda: tmp_path)
+    monkeypatch.setattr(freshness, "get_app_dir", lambda: tmp_path)
+    monkeypatch.setattr(output_index, "get_app_dir", lambda: tmp_path)
+    output_index._indexes.clear()
+    return tmp_path
+
+
+def test_cost_model_uses_trace_medians(app_dir):
+    """Test that costs come from traced spans, with MATLAB time split per date."""
+    traces = app_dir / "traces"
+    traces.mkdir()
+    spans = [
+        {"name": "stage.matlab", "seconds": 90.0, "pattern": "20250819,20250820"},
+        {"name": "stage.matlab", "seconds": 40.0, "pattern": "20250820"},
+        {"name": "stage.matlab", "seconds": 50.0, "pattern": "20250821"},
+        {"name": "stage.download", "seconds": 5.0, "error": "TimeoutExpired"},
+        {"name": "cmd.labdata", "seconds": 7.0, "cmd": "labdata sessions S1 --files"},
+        {"name": "cmd.labdata", "seconds": 99.0, "cmd": "labdata get S1 -s x"},
+    ]
+    (traces / "run.jsonl").write_text("".join(json.dumps(s) + "\n" for s in spans))
+
+    costs = CostModel.from_traces()
+    assert costs.cost("render") == 45.0
+    assert costs.cost("list_sessions") == 7.0
+    assert costs.cost("download") == planner.DEFAULT_COSTS["download"]
+
+
+def test_plan_skips_satisfied_tasks(app_dir):
+    """Test that fresh catalogs, downloaded sessions and journaled steps are skipped."""
+    sessions = ["20250819_100000", "20250820_100000"]
+    save_catalog("S1", {"fetched_at": time.time(), "sessions": sessions})
+    (app_dir / "in" / "S1" / sessions[0] / "chipmunk").mkdir(parents=True)
+    (app_dir / "in" / "S1" / sessions[0] / "chipmunk" / DOWNLOAD_MARKER).touch()
+    journal = RunJournal()
+    journal.record("S2", "render", status=None, files=[])
+    journal.record("S2", "publish", status="ok", uploaded=1)
+
+    plan = build_plan(
+        ["S1", "S2"],
+        ["20250819"],
+        0,
+        str(app_dir / "in"),
+        str(app_dir / "out"),
+        journal=journal,
+        costs=CostModel(),
+    )
+    status = {(t.subject, t.kind, t.name): t.skip for t in plan.tasks}
+
+    assert status[("S1", "list_sessions", "labdata sessions")] == "catalog fresh"
+    assert status[("S1", "download", sessions[0])] == "downloaded"
+    assert status[("S1", "render", "20250819")] is None
+    assert status[("S1", "upload", "20250819")] is None
+    assert status[("S2", "render", "20250819")] == "journaled"
+    assert status[("S2", "resolve", "Notion lookups")] == "journaled"
+    assert plan.subject_cost("S2") == 0
+
+    chipmunk = app_dir / "in" / "S1" / sessions[0] / "chipmunk"
+    (chipmunk / "S1.mat").write_bytes(b"mat")
+    (app_dir / "out" / "S1").mkdir(parents=True)
+    (app_dir / "out" / "S1" / "S1_20250819.png").write_bytes(b"png")
+    record_render(
+        "S1",
+        "20250819",
+        0,
+        input_fingerprint(str(app_dir / "in"), "S1", sessions[:1]),
+        output_fingerprint(str(app_dir / "out" / "S1"), ["S1_20250819.png"]),
+    )
+    plan = build_plan(
+        ["S1"],
+        ["20250819"],
+        0,
+        str(app_dir / "in"),
+        str(app_dir / "out"),
+        costs=CostModel(),
+    )
+    render = next(t for t in plan.tasks if t.kind == "render")
+    assert render.skip == "up to date"
+
+
+def test_notion_only_plan_backs_up_selected_pngs(app_dir):
+    """Test that --notion-only plans the backup of the PNGs it will publish."""
+
+    def backup_skip():
+        plan = build_plan(
+            ["S1"],
+            ["20250819"],
+            0,
+            str(app_dir / "in"),
+            str(app_dir / "out"),
+            costs=CostModel(),
+            notion_only=True,
+        )
+        return next(t for t in plan.tasks if t.kind == "backup").skip
+
+    assert backup_skip() == "nothing to back up"
+    (app_dir / "out" / "S1").mkdir(parents=True)
+    (app_dir / "out" / "S1" / "S1_20250819_summary.png").write_bytes(b"png")
+    assert backup_skip() is None
+
+
+def test_wall_time_respects_resource_limits():
+    """Test that tasks sharing a resource queue while independent ones overlap."""
+    tasks = [
+        Task("render", "S1", "d", 10.0),
+        Task("render", "S2", "d", 10.0),
+        Task("download", "S3", "a", 4.0),
+        Task("upload", "S1", "d", 1.0, deps=["S1/render/d"]),
+    ]
+    plan = Plan(tasks, CostModel())
+
+    assert plan.wall_time({"matlab": 1, "notion": 1, "download": 1}) == 20.0
+    assert plan.wall_time({"matlab": 2, "notion": 1, "download": 1}) == 11.0
+    assert plan.serial_time() == 25.0
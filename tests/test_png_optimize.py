@@ -0,0 +1,65 @@
+import pytest
+
+from notion_performance_summaries import png_optimize
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def optimizer(tmp_path, monkeypatch):
+    monkeypatch.setattr(png_optimize, "get_app_dir", lambda: tmp_path / "app")
+    opt = png_optimize.PngOptimizer(workers=1)
+    yield opt
+    opt.close()
+
+
+def _plot_png(path, width=400, height=300):
+    """An RGB figure with few colors, saved without compression like a raw export."""
+    img = Image.new("RGB", (width, height), "white")
+    for x in range(width):
+        img.putpixel((x, (x * 3) % height), (0, 114, 189))
+    img.save(path, format="PNG", compress_level=0)
+    return img
+
+
+def test_recompression_is_lossless_smaller_and_cached(tmp_path, optimizer):
+    """Test that pixels survive, bytes shrink, and a second run reuses the cache."""
+    src = tmp_path / "SUB01_20250820_summary.png"
+    original = _plot_png(src)
+
+    upload = optimizer.optimize([str(src)])[str(src)]
+    assert upload != str(src)
+    with Image.open(upload) as out:
+        assert out.convert("RGB").tobytes() == original.tobytes()
+    assert optimizer.bytes_after < optimizer.bytes_before
+
+    optimizer._pool = None
+    optimizer._get_pool = lambda: pytest.fail("cached PNG was recompressed again")
+    assert optimizer.optimize([str(src)])[str(src)] == upload
+    assert optimizer.files == 2
+
+
+def test_known_digest_is_reused_and_cache_is_pruned(tmp_path, optimizer, monkeypatch):
+    """Test that a caller's hash skips rehashing and close() keeps cache_keep entries."""
+    monkeypatch.setattr(
+        png_optimize, "file_sha256", lambda path: pytest.fail("PNG hashed again")
+    )
+    optimizer.cache_keep = 1
+    for i in range(3):
+        src = tmp_path / f"SUB01_2025082{i}_summary.png"
+        _plot_png(src, width=400 + i)
+        optimizer.optimize([str(src)], digests={str(src): f"digest{i}"})
+
+    optimizer.close()
+    assert [p.name for p in optimizer.cache_dir.iterdir()] == ["digest2.v1.png"]
+
+
+def test_max_width_downscales(tmp_path):
+    """Test that wide figures are downscaled and keep their aspect ratio."""
+    src = tmp_path / "wide.png"
+    _plot_png(src, width=800, height=200)
+
+    out = tmp_path / "out.png"
+    png_optimize.recompress_png(str(src), str(out), max_width=400)
+    with Image.open(out) as img:
+        assert img.size == (400, 100)
@@ -52,3 +52,41 @@ def test_validate_preferences_missing_key(tmp_path):
         KeyError, match="Missing required preference: 'paths.output_loc'"
     ):
         validate_preferences()
+
+
+def test_preferences_reload_when_file_changes(tmp_path):
+    """Test that edits to preferences.json are picked up via its mtime."""
+    import os
+
+    prefs_file = tmp_path / "preferences.json"
+    prefs_file.write_text(json.dumps({"subjects": ["SUB01"]}))
+
+    from notion_performance_summaries import preferences
+
+    preferences.reload_preferences(path=prefs_file)
+    assert get_preference("subjects") == ["SUB01"]
+
+    prefs = json.loads(prefs_file.read_text())
+    prefs["subjects"] = ["SUB01", "SUB02"]
+    prefs_file.write_text(json.dumps(prefs))
+    stat = prefs_file.stat()
+    os.utime(prefs_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert get_preference("subjects") == ["SUB01", "SUB02"]
+
+
+def test_config_import_is_lazy(tmp_path, monkeypatch):
+    """Test that importing config neither validates preferences nor needs env vars."""
+    import importlib
+
+    from notion_performance_summaries import config, preferences
+
+    prefs_file = tmp_path / "preferences.json"
+    prefs_file.write_text(json.dumps({"subjects": []}))
+    preferences.reload_preferences(path=prefs_file)
+    monkeypatch.delenv("NOTION_TOKEN", raising=False)
+    monkeypatch.setattr(config, "_settings", None)
+
+    importlib.reload(config)
+    with pytest.raises(KeyError):
+        config.get_settings()
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from notion_performance_summaries import preferences, tracing
+from notion_performance_summaries.concurrency import subject_context
+
+
+@pytest.fixture
+def app_dir(tmp_path, monkeypatch):
+    prefs = tmp_path / "preferences.json"
+    prefs.write_text(json.dumps({"tracing": {"keep": 2}}))
+    preferences.reload_preferences(path=prefs)
+    monkeypatch.setattr(tracing, "get_app_dir", lambda: tmp_path)
+    yield tmp_path
+    tracing.finish_trace()
+
+
+def test_spans_are_written_with_subject_and_tags(app_dir):
+    """Test that spans land in the trace file tagged with the current subject."""
+    path = tracing.start_trace("20250820_9")
+    with subject_context("SUB01"):
+        with tracing.span("stage.upload", session="20250820_120000") as tags:
+            tags["bytes"] = 42
+    with pytest.raises(ValueError):
+        with tracing.span("cmd.matlab"):
+            raise ValueError("boom")
+    tracing.finish_trace()
+
+    upload, failed = [json.loads(line) for line in path.read_text().splitlines()]
+    assert upload["name"] == "stage.upload"
+    assert upload["subject"] == "SUB01"
+    assert upload["bytes"] == 42
+    assert upload["seconds"] >= 0
+    assert failed["error"] == "ValueError"
+    assert tracing._tracer.spans[0][:2] == ("stage.upload", "SUB01")
+
+
+def test_old_traces_are_pruned(app_dir):
+    """Test that only the newest tracing.keep trace files are kept."""
+    traces = app_dir / "traces"
+    traces.mkdir()
+    for name in ("20250101_000000_a.jsonl", "20250102_000000_b.jsonl"):
+        (traces / name).write_text("")
+    path = tracing.start_trace("c")
+    with tracing.span("stage.matlab"):
+        pass
+    tracing.finish_trace()
+
+    assert sorted(p.name for p in traces.iterdir()) == [
+        "20250102_000000_b.jsonl",
+        path.name,
+    ]
+
+
+def test_dry_run_traces_stay_in_memory(app_dir):
+    """Test that write=False records spans without creating a trace file."""
+    assert tracing.start_trace("dry", write=False) is None
+    with tracing.span("stage.matlab"):
+        pass
+    tracing.finish_trace()
+
+    assert not (app_dir / "traces").exists()
+    assert tracing._tracer.spans[0][0] == "stage.matlab"
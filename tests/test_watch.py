@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from notion_performance_summaries.data_processing import DOWNLOAD_MARKER
+from notion_performance_summaries.watch import (
+    InotifyWatcher,
+    PollingWatcher,
+    already_processed,
+)
+
+
+def _write_mat(tmp_path, session, name="a.mat"):
+    chipmunk = tmp_path / "SUB01" / session / "chipmunk"
+    chipmunk.mkdir(parents=True, exist_ok=True)
+    (chipmunk / name).write_bytes(b"data")
+    return chipmunk
+
+
+def test_polling_watcher_reports_new_and_changed_sessions(tmp_path):
+    """Test that only sessions gaining .mat files after startup are reported."""
+    _write_mat(tmp_path, "20250819_101010")
+    watcher = PollingWatcher(str(tmp_path), ["SUB01", "SUB02"])
+
+    assert watcher.poll(0) == set()
+    _write_mat(tmp_path, "20250820_090000")
+    assert watcher.poll(0) == {("SUB01", "20250820_090000")}
+    _write_mat(tmp_path, "20250820_090000", "b.mat")
+    assert watcher.poll(0) == {("SUB01", "20250820_090000")}
+    assert watcher.poll(0) == set()
+
+
+def test_sessions_downloaded_by_pipeline_are_already_processed(tmp_path):
+    """Test that our own completion marker suppresses a re-run."""
+    chipmunk = _write_mat(tmp_path, "20250820_090000")
+    assert not already_processed(str(tmp_path), "SUB01", "20250820_090000")
+
+    (chipmunk / DOWNLOAD_MARKER).write_text("")
+    assert already_processed(str(tmp_path), "SUB01", "20250820_090000")
+
+
+def test_inotify_watcher_sees_moved_sessions_and_new_chipmunk_dirs(tmp_path):
+    """Test that moved-in sessions and chipmunk/ in old sessions are reported."""
+    pytest.importorskip("inotify_simple")
+    (tmp_path / "SUB01" / "20250819_101010").mkdir(parents=True)
+    staging = tmp_path / "staging"
+    _write_mat(staging, "20250820_090000")
+    watcher = InotifyWatcher(str(tmp_path), ["SUB01"])
+    try:
+        assert watcher.poll(0) == set()
+        os.rename(
+            staging / "SUB01" / "20250820_090000",
+            tmp_path / "SUB01" / "20250820_090000",
+        )
+        assert watcher.poll(0.5) == {("SUB01", "20250820_090000")}
+        _write_mat(tmp_path, "20250819_101010")
+        assert watcher.poll(0.5) == {("SUB01", "20250819_101010")}
+    finally:
+        watcher.close()